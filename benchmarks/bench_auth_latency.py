@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+"""Log in through FBAuthDialog against the local fake Facebook server many
+times and report p50/p99 time-to-form-ready and time-to-token.
+
+Usage: python bench_auth_latency.py [--runs N] [--delay SECONDS] [--cache]
+"""
+
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PySide.QtCore import QElapsedTimer
+from PySide.QtCore import QEventLoop
+from PySide.QtCore import QTimer
+from PySide.QtGui  import QApplication
+
+from pyside_facebook import FBAuthDialog
+
+from tests.fake_facebook import FakeFacebookServer
+from tests.fake_facebook import FakeFacebookUser
+
+
+# seconds a single login may take before the run is counted as failed
+RUN_TIMEOUT = 30
+
+
+def percentile(values, p):
+    """
+    Return the nearest-rank percentile of a list of values.
+    """
+
+    values = sorted(values)
+    rank = max(int(round(p / 100.0 * len(values))) - 1, 0)
+
+    return values[rank]
+
+
+def run_once(server, use_shared_cache):
+    """
+    Log in once and return (ms to form ready, ms to token) or None if the
+    login didn't finish in time.
+    """
+
+    times = {}
+    timer = QElapsedTimer()
+    loop = QEventLoop()
+
+    dialog = FBAuthDialog(use_shared_cache=use_shared_cache)
+    dialog.set_oauth_params(**server.oauth_params())
+
+    FakeFacebookUser(dialog)
+
+    def slot_authFormReady(state):
+        times["form_ready"] = timer.elapsed()
+
+    def slot_permsAuthorizedAccessToken(access_token, expires_in, state):
+        times["token"] = timer.elapsed()
+        loop.quit()
+
+    dialog.signal_authFormReady.connect(slot_authFormReady)
+    dialog.signal_permsAuthorizedAccessToken.connect(
+            slot_permsAuthorizedAccessToken)
+
+    QTimer.singleShot(RUN_TIMEOUT * 1000, loop.quit)
+
+    timer.start()
+    dialog.start_auth()
+
+    loop.exec_()
+
+    dialog.deleteLater()
+
+    if "token" not in times:
+        return None
+
+    return times["form_ready"], times["token"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0,
+            help="seconds the server waits before answering each request")
+    parser.add_argument("--cache", action="store_true",
+            help="use the shared FBNetworkCache")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+
+    server = FakeFacebookServer(delay=args.delay)
+    server.start()
+
+    form_ready = []
+    token = []
+    failed = 0
+
+    for _ in xrange(args.runs):
+        result = run_once(server, args.cache)
+
+        if result is None:
+            failed += 1
+            continue
+
+        form_ready.append(result[0])
+        token.append(result[1])
+
+    server.stop()
+
+    print "runs: %d (%d failed)" % (args.runs, failed)
+
+    if token:
+        print "time-to-form-ready ms: p50 %d  p99 %d" % (
+                percentile(form_ready, 50), percentile(form_ready, 99))
+        print "time-to-token ms:      p50 %d  p99 %d" % (
+                percentile(token, 50), percentile(token, 99))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+#
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+"""Import pyside_facebook in fresh interpreters and report the median import
+time and peak RSS of each way it's used, and whether QtWebKit was loaded.
+
+"everything" imports all submodules, which is what importing the single
+module pyside_facebook.py used to cost.
+
+Usage: python bench_import.py [runs]
+"""
+
+
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+STATEMENTS = (
+    ("python", "pass"),
+    ("package", "import pyside_facebook"),
+    ("oauth", "from pyside_facebook import build_oauth_url, FBTokenStore"),
+    ("graph", "from pyside_facebook import FBGraphAPI"),
+    ("auth", "from pyside_facebook import FBAuthDialog"),
+    ("everything", "import pyside_facebook.auth, pyside_facebook.graph, "
+        "pyside_facebook.media"),
+)
+
+SCRIPT = """
+import resource, sys, time
+start = time.time()
+%s
+elapsed = time.time() - start
+print elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, \\
+    int("PySide.QtWebKit" in sys.modules)
+"""
+
+
+def median(values):
+    values = sorted(values)
+
+    return values[len(values) // 2]
+
+
+def run(statement, runs):
+    """
+    Return the median seconds and peak RSS (KB on linux) of `statement`,
+    and whether it imported QtWebKit.
+    """
+
+    times = []
+    rss = []
+
+    for _ in xrange(runs):
+        output = subprocess.check_output([sys.executable, "-c",
+                SCRIPT % statement], cwd=ROOT)
+
+        elapsed, maxrss, webkit = output.split()
+
+        times.append(float(elapsed))
+        rss.append(int(maxrss))
+
+    return median(times), median(rss), webkit == "1"
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print "%-12s %10s %10s %8s" % ("", "ms", "RSS KB", "QtWebKit")
+
+    for name, statement in STATEMENTS:
+        elapsed, rss, webkit = run(statement, runs)
+
+        print "%-12s %10.1f %10d %8s" % (name, elapsed * 1000, rss,
+                "yes" if webkit else "no")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+"""Build OAuth login links with a fresh state each, through
+FBAuthDialog.get_oauth_url, the module level get_oauth_url, build_oauth_url
+and a FBOAuthURLBuilder, and report URLs per second.
+
+Usage: python bench_oauth_url.py [count]
+"""
+
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PySide.QtGui import QApplication
+
+from pyside_facebook import FBAuthDialog
+from pyside_facebook import FBOAuthURLBuilder
+from pyside_facebook import FBStateRegistry
+from pyside_facebook import REDIRECT_URI
+from pyside_facebook import build_oauth_url
+from pyside_facebook import get_oauth_url
+
+
+APP_ID = "262499290528925"
+SCOPE = ["email", "user_photos", "publish_actions"]
+
+
+def bench(count, build):
+    """
+    Return URLs per second `build` makes, each with a new registered state.
+    """
+
+    registry = FBStateRegistry()
+
+    start = time.time()
+
+    for _ in xrange(count):
+        build(registry.issue())
+
+    elapsed = time.time() - start
+
+    return count / elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    dialog = FBAuthDialog()
+    builder = FBOAuthURLBuilder(APP_ID, REDIRECT_URI, SCOPE)
+
+    print "URLs built: %d" % count
+    print "URLs/sec (FBAuthDialog.get_oauth_url): %.0f" % bench(count,
+            lambda state: dialog.get_oauth_url(APP_ID, REDIRECT_URI, SCOPE,
+                state, "token", "popup").toEncoded())
+    print "URLs/sec (get_oauth_url):              %.0f" % bench(count,
+            lambda state: get_oauth_url(APP_ID, REDIRECT_URI, SCOPE, state,
+                "token", "popup").toEncoded())
+    print "URLs/sec (build_oauth_url):            %.0f" % bench(count,
+            lambda state: build_oauth_url(APP_ID, REDIRECT_URI, SCOPE,
+                state))
+    print "URLs/sec (FBOAuthURLBuilder.url):      %.0f" % bench(count,
+            builder.url)
+
+    # state registry alone, issuing and validating
+    registry = FBStateRegistry()
+
+    start = time.time()
+
+    for _ in xrange(count):
+        registry.validate(registry.issue())
+
+    print "states/sec (issue + validate):         %.0f" % (
+            count / (time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+"""Replay the top-level URLs recorded in `logs/login.txt` through
+FBURLRouter and report routes per second.
+
+Usage: python bench_url_router.py [rounds]
+"""
+
+
+import ast
+import os
+import re
+import sys
+import time
+import urllib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pyside_facebook import FBURLRouter
+from pyside_facebook import REDIRECT_URI
+
+
+LOG_PATH = os.path.join(os.path.dirname(__file__), "..", "logs", "login.txt")
+
+RE_URL = re.compile(r"QUrl\('([^']*)'\)")
+RE_ITEMS = re.compile(r"Query Items:\s+(\[.*?\])", re.DOTALL)
+
+# the log only covers the login form and permissions pages so the redirect
+# destinations are appended to exercise every route
+REDIRECT_URLS = [
+    REDIRECT_URI + "#access_token=TOKEN&expires_in=5183999&state=TESTLOGIN",
+    REDIRECT_URI + "?code=CODE&state=TESTLOGIN",
+    REDIRECT_URI + "?error_reason=user_denied&error=access_denied"
+        "&error_description=The+user+denied+your+request.&state=TESTLOGIN",
+]
+
+
+def load_urls(path=LOG_PATH):
+    """
+    Return the encoded URLs recorded in the login log.
+
+    The log prints URLs decoded, so each one is re-encoded from the query
+    items printed below it.
+    """
+
+    urls = []
+
+    with open(path) as f:
+        log = f.read()
+
+    for block in log.split("QUrl('")[1:]:
+        block = "QUrl('" + block
+
+        base = RE_URL.search(block).group(1).split("?", 1)[0]
+        items = RE_ITEMS.search(block)
+
+        if items:
+            items = [(str(k), str(v)) for k, v in
+                     ast.literal_eval(items.group(1))]
+
+        if items:
+            urls.append("%s?%s" % (base, urllib.urlencode(items)))
+        else:
+            urls.append(base)
+
+    return urls + REDIRECT_URLS
+
+
+def bench(urls, rounds, cache_size):
+    router = FBURLRouter(cache_size=cache_size)
+
+    start = time.time()
+
+    for _ in xrange(rounds):
+        for url in urls:
+            router.route(url)
+
+    elapsed = time.time() - start
+
+    return (rounds * len(urls)) / elapsed
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    urls = load_urls()
+
+    print "URLs replayed: %d x %d rounds" % (len(urls), rounds)
+    print "routes/sec (uncached): %.0f" % bench(urls, rounds, 0)
+    print "routes/sec (cached):   %.0f" % bench(urls, rounds, 64)
+
+
+if __name__ == '__main__':
+    main()
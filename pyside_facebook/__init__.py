@@ -0,0 +1,236 @@
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+
+"""
+A general purpose PySide library to interact with facebook's API.
+
+Everything is importable from the package as before, but each submodule is
+only imported the first time one of its names is used. Importing the
+package itself imports no Qt modules at all, and QtWebKit is only imported
+along with `auth` (FBAuthDialog and friends), so the Graph API client and
+the URL and token helpers work where QtWebKit isn't available:
+
+ - constants:  REDIRECT_URI, GRAPH_URL, ...
+ - exceptions: PySideFacebookException and its subclasses
+ - oauth:      get_oauth_url, build_oauth_url, FBURLRouter, FBTokenStore, ...
+ - network:    FBNetworkAccessManager, FBNetworkCache, FBCookieJar, ...
+ - futures:    FBFuture, FBAsyncioBridge
+ - auth:       FBAuthDialog, FBHeadlessAuth, FBAccountManager, ...
+ - graph:      FBGraphAPI, FBTokenManager, FBGraphUploader, ...
+ - media:      FBMediaFetcher
+"""
+
+import importlib
+import sys
+import types
+
+# -----------------------------------------------------------------------------
+# CONSTANTS
+# -----------------------------------------------------------------------------
+
+"""
+Names of each submodule that are importable from the package.
+"""
+
+SUBMODULES = {
+    "constants": (
+        "ACCOUNT_TOKEN_STORE_FILE_NAME",
+        "AUTH_FORM_LOAD_TIMEOUT",
+        "AUTH_HEADLESS_MAX_CONCURRENT",
+        "AUTH_HEADLESS_TIMEOUT",
+        "AUTH_MAX_RETRIES",
+        "AUTH_POOL_MAX_RETRY_DELAY",
+        "AUTH_POOL_RETRY_DELAY",
+        "AUTH_REDIRECT_TIMEOUT",
+        "AUTH_RETRY_DELAY",
+        "AUTH_STALL_TIMEOUT",
+        "AUTH_USER_TIMEOUT",
+        "CACHE_DIR_NAME",
+        "CACHE_MAX_SIZE",
+        "COOKIE_JAR_COMPACT_LINES",
+        "COOKIE_JAR_FILE_NAME",
+        "GRAPH_BATCH_MAX_SIZE",
+        "GRAPH_BATCH_WINDOW",
+        "GRAPH_CACHE_MAX_DISK_SIZE",
+        "GRAPH_CACHE_MAX_SIZE",
+        "GRAPH_CACHE_TTL",
+        "GRAPH_MAX_REQUESTS_PER_HOST",
+        "GRAPH_MAX_RETRIES",
+        "GRAPH_MAX_UPLOADS",
+        "GRAPH_PACING_INTERVAL",
+        "GRAPH_RATE_LIMIT_CODES",
+        "GRAPH_RETRY_DELAY",
+        "GRAPH_STREAM_MAX_BUFFER",
+        "GRAPH_THROTTLE_PAUSE",
+        "GRAPH_UPLOAD_CHUNKED_SIZE",
+        "GRAPH_URL",
+        "GRAPH_USAGE_MAX",
+        "GRAPH_USAGE_THROTTLE",
+        "GRAPH_VIDEO_URL",
+        "MEDIA_CACHE_MAX_AGE",
+        "MEDIA_CACHE_MAX_DISK_SIZE",
+        "MEDIA_CACHE_MAX_SIZE",
+        "MEDIA_MAX_DOWNLOADS",
+        "MEDIA_MAX_REDIRECTS",
+        "OAUTH_STATE_MAX_SIZE",
+        "OAUTH_STATE_TTL",
+        "OAUTH_URL",
+        "OAUTH_URL_BUILDER_CACHE_SIZE",
+        "PRECONNECT_HOSTS",
+        "REDIRECT_URI",
+        "RESOURCE_RULES_LEAN",
+        "STATIC_CACHE_DIR_NAME",
+        "STATIC_CACHE_HOSTS",
+        "STATIC_CACHE_MIME_TYPES",
+        "TOKEN_MIN_TTL",
+        "TOKEN_REFRESH_MARGIN",
+        "TOKEN_REFRESH_MAX_DELAY",
+        "TOKEN_REFRESH_RETRY_DELAY",
+        "TOKEN_SHORT_LIVED_MAX",
+        "TOKEN_STORE_FILE_NAME",
+    ),
+    "exceptions": (
+        "FBAuthCancelledException",
+        "FBAuthDialogException",
+        "FBAuthDialogInvalidParamException",
+        "FBAuthLoginFailedException",
+        "FBAuthTimeoutException",
+        "FBGraphAPICancelledException",
+        "FBGraphAPIDecodeException",
+        "FBGraphAPIErrorException",
+        "FBGraphAPIException",
+        "FBGraphAPINetworkException",
+        "FBGraphAPIOAuthException",
+        "FBGraphAPIRateLimitException",
+        "PySideFacebookException",
+    ),
+    "oauth": (
+        "FBOAuthURLBuilder",
+        "FBStateRegistry",
+        "FBTokenStore",
+        "FBURLRouter",
+        "build_oauth_url",
+        "get_oauth_url",
+    ),
+    "network": (
+        "FBCookieJar",
+        "FBNetworkAccessManager",
+        "FBNetworkCache",
+        "FBNullCookieJar",
+        "FBResourceRule",
+        "FBStaticCache",
+        "FBStubReply",
+    ),
+    "futures": (
+        "FBAsyncioBridge",
+        "FBFuture",
+    ),
+    "auth": (
+        "FBAccount",
+        "FBAccountManager",
+        "FBAccountNetworkAccessManager",
+        "FBAuthDialog",
+        "FBAuthDialogPool",
+        "FBAuthFuture",
+        "FBAuthResult",
+        "FBAuthTrace",
+        "FBAuthWatchdog",
+        "FBHeadlessAuth",
+        "FBHeadlessAuthBatch",
+        "FBWebPage",
+    ),
+    "graph": (
+        "FBGraphAPI",
+        "FBGraphCache",
+        "FBGraphPager",
+        "FBGraphRequest",
+        "FBGraphScheduler",
+        "FBGraphStreamRequest",
+        "FBGraphUploader",
+        "FBJSONStreamDecoder",
+        "FBTokenManager",
+        "FBUpload",
+    ),
+    "media": (
+        "FBImageDecodeTask",
+        "FBMediaFetcher",
+        "FBMediaRequest",
+    ),
+}
+
+
+# -----------------------------------------------------------------------------
+# CLASSES
+# -----------------------------------------------------------------------------
+
+class LazyModule(types.ModuleType):
+
+    """
+    The package module, which imports the submodule a name is defined in the
+    first time the name is looked up.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, module):
+        """
+        Instantiate LazyModule object.
+
+        @param module (module) The module replaced, its attributes are
+                               copied.
+        """
+
+        super(LazyModule, self).__init__(module.__name__, module.__doc__)
+
+        self.__dict__.update(module.__dict__)
+
+        # python 2 clears the globals of modules once they're collected,
+        # which the functions defined here still use
+        self._module = module
+
+        self._owners = {}
+
+        for submodule, names in SUBMODULES.iteritems():
+            for name in names:
+                self._owners[name] = submodule
+
+        self.__all__ = sorted(self._owners)
+
+    # -------------------------------------------------------------------------
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._owners))
+
+    # -------------------------------------------------------------------------
+
+    def __getattr__(self, name):
+        """
+        Import the submodule `name` is defined in and return it.
+        """
+
+        submodule = self._owners.get(name)
+
+        if submodule is None:
+            raise AttributeError("module %r has no attribute %r" % (
+                    self.__name__, name))
+
+        module = importlib.import_module("%s.%s" % (self.__name__,
+                submodule))
+
+        value = getattr(module, name)
+
+        # later lookups don't go through __getattr__
+        setattr(self, name, value)
+
+        return value
+
+
+sys.modules[__name__] = LazyModule(sys.modules[__name__])
@@ -0,0 +1,2652 @@
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+
+"""
+The OAuth Dialog widget and everything that drives it. This is the only
+module that imports QtWebKit.
+"""
+
+import json
+import os
+import re
+import sys
+import urlparse
+
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+
+from collections import OrderedDict
+from collections import deque
+from functools   import partial
+
+from PySide.QtCore    import QElapsedTimer
+from PySide.QtCore    import QObject
+from PySide.QtCore    import QTimer
+from PySide.QtCore    import SLOT
+from PySide.QtCore    import Signal
+from PySide.QtCore    import Slot
+from PySide.QtNetwork import QHostInfo
+from PySide.QtNetwork import QNetworkAccessManager
+from PySide.QtNetwork import QNetworkCookie
+from PySide.QtNetwork import QNetworkCookieJar
+from PySide.QtNetwork import QNetworkRequest
+from PySide.QtWebKit  import QWebPage
+from PySide.QtWebKit  import QWebSettings
+from PySide.QtWebKit  import QWebView
+
+from pyside_facebook.constants  import ACCOUNT_TOKEN_STORE_FILE_NAME
+from pyside_facebook.constants  import AUTH_FORM_LOAD_TIMEOUT
+from pyside_facebook.constants  import AUTH_HEADLESS_MAX_CONCURRENT
+from pyside_facebook.constants  import AUTH_HEADLESS_TIMEOUT
+from pyside_facebook.constants  import AUTH_MAX_RETRIES
+from pyside_facebook.constants  import AUTH_POOL_MAX_RETRY_DELAY
+from pyside_facebook.constants  import AUTH_POOL_RETRY_DELAY
+from pyside_facebook.constants  import AUTH_REDIRECT_TIMEOUT
+from pyside_facebook.constants  import AUTH_RETRY_DELAY
+from pyside_facebook.constants  import AUTH_STALL_TIMEOUT
+from pyside_facebook.constants  import AUTH_USER_TIMEOUT
+from pyside_facebook.constants  import OAUTH_URL
+from pyside_facebook.constants  import PRECONNECT_HOSTS
+from pyside_facebook.constants  import REDIRECT_URI
+from pyside_facebook.constants  import RESOURCE_RULES_LEAN
+from pyside_facebook.exceptions import FBAuthCancelledException
+from pyside_facebook.exceptions import FBAuthDialogException
+from pyside_facebook.exceptions import FBAuthDialogInvalidParamException
+from pyside_facebook.exceptions import FBAuthLoginFailedException
+from pyside_facebook.exceptions import FBAuthTimeoutException
+from pyside_facebook.futures    import FBFuture
+from pyside_facebook.network    import FBCookieJar
+from pyside_facebook.network    import FBNetworkAccessManager
+from pyside_facebook.network    import FBNetworkCache
+from pyside_facebook.network    import FBNullCookieJar
+from pyside_facebook.network    import FBStaticCache
+from pyside_facebook.oauth      import FBTokenStore
+from pyside_facebook.oauth      import FBURLRouter
+from pyside_facebook.oauth      import get_oauth_url
+
+
+# -----------------------------------------------------------------------------
+# CLASSES
+# -----------------------------------------------------------------------------
+
+class FBWebPage(QWebPage):
+
+    """
+    A QWebPage that never loads the OAuth redirect URI.
+
+    Navigations to the redirect URI (including the redirects that end the
+    OAuth Dialog) are cancelled and reported through
+    signal_redirectIntercepted instead, saving the round trip to the
+    redirect URI's server.
+    """
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when a navigation to the redirect URI was cancelled.
+
+    @param url (str) Encoded URL the page was about to navigate to.
+    """
+
+    signal_redirectIntercepted = Signal(str)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, redirect_uri=REDIRECT_URI):
+        """
+        Instantiate FBWebPage object.
+
+        @param [parent]       (QObject) Parent object that this object
+                                        belongs to.
+        @param [redirect_uri] (str)     Redirect URI to intercept.
+        """
+
+        super(FBWebPage, self).__init__(parent)
+
+        self.set_redirect_uri(redirect_uri)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def acceptNavigationRequest(self, frame, request, type):
+        """
+        Reimplemented from QWebPage.
+        """
+
+        url = request.url()
+
+        # the scheme is ignored, facebook may redirect to http or https
+        if (url.path() == self._redirect_path and
+                url.host().lower() == self._redirect_host):
+            self.signal_redirectIntercepted.emit(str(url.toEncoded()))
+
+            return False
+
+        return super(FBWebPage, self).acceptNavigationRequest(frame, request,
+                type)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def set_redirect_uri(self, redirect_uri):
+        """
+        Set the redirect URI navigations to are intercepted.
+
+        @param redirect_uri (str)
+        """
+
+        url = urlparse.urlsplit(redirect_uri)
+
+        self._redirect_host = url.hostname or ""
+        self._redirect_path = url.path
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthResult(object):
+
+    """
+    The outcome of an authentication started with
+    `FBAuthDialog.authenticate`.
+
+    Only the attributes relevant to the result's `kind` are set:
+     - KIND_TOKEN:  access_token, expires_in
+     - KIND_CODE:   code
+     - KIND_DENIED: error, reason, description
+     - KIND_ERROR:  message, error_code
+    """
+
+    KIND_TOKEN = "token"
+    KIND_CODE = "code"
+    KIND_DENIED = "denied"
+    KIND_ERROR = "error"
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, kind, state="", access_token=None, expires_in=0,
+            code=None, error=None, reason=None, description=None,
+            message=None, error_code=None):
+        self.kind = kind
+        self.state = state
+        self.access_token = access_token
+        self.expires_in = expires_in
+        self.code = code
+        self.error = error
+        self.reason = reason
+        self.description = description
+        self.message = message
+        self.error_code = error_code
+
+    # -------------------------------------------------------------------------
+
+    def __repr__(self):
+        return "<FBAuthResult kind=%s state=%r>" % (self.kind, self.state)
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthFuture(FBFuture):
+
+    """
+    The pending result of an authentication started with
+    `FBAuthDialog.authenticate`, resolved by the dialog's signals to a
+    FBAuthResult.
+
+    Fails with FBAuthTimeoutException when the authentication times out,
+    either after the future's own timeout or the dialog's watchdog deadlines,
+    and with FBAuthCancelledException when cancelled.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, dialog, timeout=None):
+        """
+        Instantiate FBAuthFuture object.
+
+        @param dialog    (FBAuthDialog) Dialog the authentication runs in.
+        @param [timeout] (float)        Seconds after which the
+                                        authentication is cancelled with a
+                                        FBAuthTimeoutException.
+        """
+
+        super(FBAuthFuture, self).__init__(dialog)
+
+        self._dialog = dialog
+
+        self._connections = [
+            (dialog.signal_permsAuthorizedAccessToken,
+                self._slot_permsAuthorizedAccessToken),
+            (dialog.signal_permsAuthorizedOAuthCode,
+                self._slot_permsAuthorizedOAuthCode),
+            (dialog.signal_permsNotAuthorized,
+                self._slot_permsNotAuthorized),
+            (dialog.signal_errorOAuthException,
+                self._slot_errorOAuthException),
+        ]
+
+        # FBHeadlessAuth has no watchdog, only the future's own timeout
+        if hasattr(dialog, "signal_userAuthTimeout"):
+            self._connections.append((dialog.signal_userAuthTimeout,
+                self._slot_userAuthTimeout))
+
+        for signal, slot in self._connections:
+            signal.connect(slot)
+
+        self._timer = None
+
+        if timeout is not None:
+            self._timer = QTimer(self)
+            self._timer.setSingleShot(True)
+            self._timer.timeout.connect(self._slot_timeout)
+            self._timer.start(int(timeout * 1000))
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _abort(self):
+        self._dialog.stop()
+
+    # -------------------------------------------------------------------------
+
+    def _cancelled_exception(self):
+        return FBAuthCancelledException("authentication cancelled")
+
+    # -------------------------------------------------------------------------
+
+    def _finish(self, result=None, exception=None):
+        if self._done:
+            return False
+
+        for signal, slot in self._connections:
+            signal.disconnect(slot)
+
+        if self._timer is not None:
+            self._timer.stop()
+
+        return super(FBAuthFuture, self)._finish(result, exception)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_errorOAuthException(self, message, code):
+        self._finish(FBAuthResult(FBAuthResult.KIND_ERROR, message=message,
+                error_code=code))
+
+    # -------------------------------------------------------------------------
+
+    def _slot_permsAuthorizedAccessToken(self, access_token, expires_in,
+            state):
+        self._finish(FBAuthResult(FBAuthResult.KIND_TOKEN, state,
+                access_token=access_token, expires_in=expires_in))
+
+    # -------------------------------------------------------------------------
+
+    def _slot_permsAuthorizedOAuthCode(self, oauth_code, state):
+        self._finish(FBAuthResult(FBAuthResult.KIND_CODE, state,
+                code=oauth_code))
+
+    # -------------------------------------------------------------------------
+
+    def _slot_permsNotAuthorized(self, error, reason, description, state):
+        self._finish(FBAuthResult(FBAuthResult.KIND_DENIED, state,
+                error=error, reason=reason, description=description))
+
+    # -------------------------------------------------------------------------
+
+    def _slot_timeout(self):
+        if self._done:
+            return
+
+        self._abort()
+
+        self._finish(exception=FBAuthTimeoutException(
+                "authentication timed out"))
+
+    # -------------------------------------------------------------------------
+
+    def _slot_userAuthTimeout(self, time_elapsed):
+        """
+        Slot for FBAuthDialog signal_userAuthTimeout. The watchdog has
+        already stopped the dialog.
+        """
+
+        self._finish(exception=FBAuthTimeoutException(
+                "authentication timed out after %d seconds" % time_elapsed))
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthWatchdog(QObject):
+
+    """
+    Enforces deadlines on each phase of a FBAuthDialog's authentication and
+    retries top-level loads that stall.
+
+    Phases:
+     - form_load:  From `start_auth` until the login form is ready.
+     - user_input: Until the user has logged in (restarted on each failed
+                   attempt) and, restarted once more, until they have
+                   answered the permissions page.
+     - redirect:   From the navigation that answers the permissions page
+                   until the token, code or error arrives.
+
+    A load is stalled when no reply (or the page) has made progress for
+    `stall_timeout` seconds. Stalled loads are stopped and loaded again after
+    `retry_delay` seconds, doubled for every retry. Loads stalled during the
+    user_input phase are form submissions and are never retried; they run
+    into the phase's deadline instead.
+
+    When a deadline passes or `max_retries` retries didn't help, the dialog
+    is stopped and signal_timeout is emitted.
+    """
+
+    PHASE_FORM_LOAD = "form_load"
+    PHASE_USER_INPUT = "user_input"
+    PHASE_REDIRECT = "redirect"
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when a phase times out.
+
+    @param time_elapsed (int) Seconds elapsed since `start_auth`.
+    @param phase        (str) Phase that timed out.
+    """
+
+    signal_timeout = Signal(int, str)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, dialog, form_load_timeout=AUTH_FORM_LOAD_TIMEOUT,
+            user_auth_timeout=AUTH_USER_TIMEOUT,
+            redirect_timeout=AUTH_REDIRECT_TIMEOUT,
+            stall_timeout=AUTH_STALL_TIMEOUT, retry_delay=AUTH_RETRY_DELAY,
+            max_retries=AUTH_MAX_RETRIES):
+        """
+        Instantiate FBAuthWatchdog object.
+
+        @param dialog              (FBAuthDialog) Dialog to watch.
+        @param [form_load_timeout] (float) Seconds, None for no limit.
+        @param [user_auth_timeout] (float) Seconds, None for no limit.
+        @param [redirect_timeout]  (float) Seconds, None for no limit.
+        @param [stall_timeout]     (float) Seconds, None to never retry.
+        @param [retry_delay]       (float) Seconds before the first retry.
+        @param [max_retries]       (int)   Retries before timing out.
+        """
+
+        super(FBAuthWatchdog, self).__init__(dialog)
+
+        self.form_load_timeout = form_load_timeout
+        self.user_auth_timeout = user_auth_timeout
+        self.redirect_timeout = redirect_timeout
+        self.stall_timeout = stall_timeout
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+
+        self.phase = None
+        self.retries = 0
+
+        self._dialog = dialog
+        self._nam = None
+        self._loading = False
+        self._retry_url = None
+
+        # True while the permissions page is shown, its answer starts the
+        # redirect phase
+        self._answer_pending = False
+
+        self._elapsed = QElapsedTimer()
+        self._progress = QElapsedTimer()
+
+        self._phase_timer = QTimer(self)
+        self._phase_timer.setSingleShot(True)
+        self._phase_timer.timeout.connect(self._slot_timeout)
+
+        self._stall_timer = QTimer(self)
+        self._stall_timer.setInterval(1000)
+        self._stall_timer.timeout.connect(self._slot_checkStall)
+
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setSingleShot(True)
+        self._retry_timer.timeout.connect(self._slot_retry)
+
+        # connect signals
+        page = dialog.page()
+        page.loadStarted.connect(self._slot_loadStarted)
+        page.loadProgress.connect(self._slot_progress)
+        page.loadFinished.connect(self._slot_loadFinished)
+
+        dialog.signal_authFormReady.connect(self._slot_userInput)
+        dialog.signal_authFail.connect(self._slot_userInput)
+        dialog.signal_authSuccess.connect(self._slot_authSuccess)
+
+        dialog.signal_permsAuthorizedAccessToken.connect(self.stop)
+        dialog.signal_permsAuthorizedOAuthCode.connect(self.stop)
+        dialog.signal_permsNotAuthorized.connect(self.stop)
+        dialog.signal_errorOAuthException.connect(self.stop)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _enter(self, phase, timeout):
+        """
+        Enter a phase and start its deadline.
+
+        @param phase   (str)
+        @param timeout (float/None) Seconds
+        """
+
+        self.phase = phase
+
+        self._phase_timer.stop()
+
+        if timeout is not None:
+            self._phase_timer.start(int(timeout * 1000))
+
+    # -------------------------------------------------------------------------
+
+    def _slot_authSuccess(self, state):
+        """
+        Slot for signal_authSuccess, emitted once the permissions page's URL
+        is committed. The user still has to answer it.
+        """
+
+        self._enter(self.PHASE_USER_INPUT, self.user_auth_timeout)
+
+        self._answer_pending = True
+
+    # -------------------------------------------------------------------------
+
+    def _slot_checkStall(self):
+        """
+        Retry the top-level load if no progress was made for too long.
+        """
+
+        if (not self._loading or self.stall_timeout is None or
+                self.phase in (None, self.PHASE_USER_INPUT)):
+            return
+
+        if self._progress.elapsed() < self.stall_timeout * 1000:
+            return
+
+        if self.retries >= self.max_retries:
+            self._slot_timeout()
+
+            return
+
+        delay = self.retry_delay * 2 ** self.retries
+        self.retries += 1
+
+        self._retry_url = self._dialog.page().mainFrame().requestedUrl()
+
+        # started first, so the failed load stopping causes is seen as retried
+        self._retry_timer.start(int(delay * 1000))
+        self._dialog.stop()
+
+    # -------------------------------------------------------------------------
+
+    def _slot_loadFinished(self, ok):
+        self._loading = False
+
+    # -------------------------------------------------------------------------
+
+    def _slot_loadStarted(self):
+        self._loading = True
+
+        self._progress.restart()
+
+        # the first navigation away from the permissions page answers it
+        if self._answer_pending:
+            self._answer_pending = False
+
+            self._enter(self.PHASE_REDIRECT, self.redirect_timeout)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_progress(self, *args):
+        """
+        Slot for the progress signals of the page and its replies.
+        """
+
+        self._progress.restart()
+
+    # -------------------------------------------------------------------------
+
+    def _slot_replyCreated(self, reply):
+        """
+        Slot for FBNetworkAccessManager signal_replyCreated.
+        """
+
+        # other pages may share the network access manager
+        page = FBNetworkAccessManager.originating_page(reply.request())
+
+        if page is not None and page is not self._dialog.page():
+            return
+
+        self._progress.restart()
+
+        reply.downloadProgress.connect(self._slot_progress)
+        reply.uploadProgress.connect(self._slot_progress)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_retry(self):
+        if self.phase is None:
+            return
+
+        self._progress.restart()
+
+        self._dialog.load(self._retry_url)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_timeout(self):
+        """
+        Stop the dialog and report the phase that timed out.
+        """
+
+        phase = self.phase
+        elapsed = self._elapsed.elapsed() / 1000
+
+        self.stop()
+        self._dialog.stop()
+
+        self.signal_timeout.emit(elapsed, phase)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_userInput(self, state):
+        self._enter(self.PHASE_USER_INPUT, self.user_auth_timeout)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def retrying(self):
+        """
+        Return whether a stalled load has been stopped and is about to be
+        loaded again.
+
+        @return (bool)
+        """
+
+        return self._retry_timer.isActive()
+
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        """
+        Start watching a new authentication.
+        """
+
+        # follow network access manager changes between authentications
+        nam = self._dialog.page().networkAccessManager()
+
+        if nam is not self._nam:
+            if self._nam is not None:
+                self._nam.signal_replyCreated.disconnect(
+                        self._slot_replyCreated)
+
+            self._nam = None
+
+            if isinstance(nam, FBNetworkAccessManager):
+                nam.signal_replyCreated.connect(self._slot_replyCreated)
+
+                self._nam = nam
+
+        self.retries = 0
+        self._answer_pending = False
+
+        self._retry_timer.stop()
+        self._elapsed.start()
+        self._progress.start()
+        self._stall_timer.start()
+
+        self._enter(self.PHASE_FORM_LOAD, self.form_load_timeout)
+
+    # -------------------------------------------------------------------------
+
+    def stop(self, *args):
+        """
+        Stop watching. Also connected to the dialog's final signals, whose
+        arguments are ignored.
+        """
+
+        self.phase = None
+        self._answer_pending = False
+
+        self._phase_timer.stop()
+        self._stall_timer.stop()
+        self._retry_timer.stop()
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthTrace(QObject):
+
+    """
+    Opt-in instrumentation of a FBAuthDialog. Records a monotonic timestamp
+    for each phase of the authentication and the timings, byte counts,
+    cache use and HTTP status of every network reply.
+
+    Each record is a dict (see `events`), emitted through signal_event,
+    passed to the optional callback and kept until `clear` is called so it
+    can be exported as JSON lines.
+
+    Reply timings are only complete when the dialog uses a
+    FBNetworkAccessManager; with any other manager replies are recorded when
+    they finish, without start times.
+    """
+
+    OPERATIONS = {
+        QNetworkAccessManager.HeadOperation: "HEAD",
+        QNetworkAccessManager.GetOperation: "GET",
+        QNetworkAccessManager.PutOperation: "PUT",
+        QNetworkAccessManager.PostOperation: "POST",
+        QNetworkAccessManager.DeleteOperation: "DELETE",
+    }
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted for every record.
+
+    @param event (dict)
+    """
+
+    signal_event = Signal(object)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, dialog, callback=None):
+        """
+        Instantiate FBAuthTrace object and start tracing the dialog.
+
+        @param dialog     (FBAuthDialog)
+        @param [callback] (callable) Called with each record.
+        """
+
+        super(FBAuthTrace, self).__init__(dialog)
+
+        self.callback = callback
+
+        self._events = []
+
+        # reply => record of replies in flight
+        self._replies = {}
+
+        self._clock = QElapsedTimer()
+        self._clock.start()
+
+        phases = (
+            (dialog.signal_authStarted, "start_auth"),
+            (dialog.signal_authFormReady, "form_ready"),
+            (dialog.signal_authFail, "auth_fail"),
+            (dialog.signal_authSuccess, "auth_success"),
+            (dialog.signal_permsAuthorizedAccessToken, "token"),
+            (dialog.signal_permsAuthorizedOAuthCode, "code"),
+            (dialog.signal_permsNotAuthorized, "not_authorized"),
+            (dialog.signal_errorOAuthException, "oauth_error"),
+            (dialog.signal_userAuthTimeout, "timeout"),
+        )
+
+        for signal, phase in phases:
+            signal.connect(self._phase_slot(phase))
+
+        self._page = dialog.page()
+
+        nam = self._page.networkAccessManager()
+
+        if isinstance(nam, FBNetworkAccessManager):
+            nam.signal_replyCreated.connect(self._slot_replyCreated)
+        else:
+            nam.finished.connect(self._slot_replyFinished)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _now(self):
+        """
+        Return milliseconds elapsed since the trace was created.
+
+        @return (int)
+        """
+
+        return self._clock.elapsed()
+
+    # -------------------------------------------------------------------------
+
+    def _phase_slot(self, phase):
+        """
+        Return a slot recording `phase` when called.
+        """
+
+        def slot(*args):
+            self._record({"event": "phase", "phase": phase, "t": self._now()})
+
+        return slot
+
+    # -------------------------------------------------------------------------
+
+    def _record(self, event):
+        self._events.append(event)
+
+        if self.callback is not None:
+            self.callback(event)
+
+        self.signal_event.emit(event)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_replyCreated(self, reply):
+        """
+        Slot for FBNetworkAccessManager signal_replyCreated.
+        """
+
+        # other pages may share the network access manager
+        page = FBNetworkAccessManager.originating_page(reply.request())
+
+        if page is not None and page is not self._page:
+            return
+
+        self._replies[reply] = {
+            "t": self._now(),
+            "ttfb_ms": None,
+            "bytes_received": 0,
+            "bytes_sent": 0,
+        }
+
+        reply.metaDataChanged.connect(self._slot_replyMetaDataChanged)
+        reply.downloadProgress.connect(self._slot_replyDownloadProgress)
+        reply.uploadProgress.connect(self._slot_replyUploadProgress)
+        reply.finished.connect(self._slot_replyFinished)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_replyDownloadProgress(self, received, total):
+        record = self._replies.get(self.sender())
+
+        if record is not None:
+            record["bytes_received"] = received
+
+    # -------------------------------------------------------------------------
+
+    def _slot_replyFinished(self, reply=None):
+        """
+        Slot for the finished signal of replies (or of the network access
+        manager, which passes the reply).
+        """
+
+        if reply is None:
+            reply = self.sender()
+
+        now = self._now()
+        record = self._replies.pop(reply, None)
+
+        event = {
+            "event": "reply",
+            "url": str(reply.url().toEncoded()),
+            "method": self.OPERATIONS.get(reply.operation(), "CUSTOM"),
+            "status": reply.attribute(
+                    QNetworkRequest.HttpStatusCodeAttribute),
+            "from_cache": bool(reply.attribute(
+                    QNetworkRequest.SourceIsFromCacheAttribute)),
+            "error": int(reply.error()),
+            "t": now,
+            "start_t": None,
+            "ttfb_ms": None,
+            "duration_ms": None,
+            "bytes_received": None,
+            "bytes_sent": None,
+        }
+
+        if record is not None:
+            event["start_t"] = record["t"]
+            event["duration_ms"] = now - record["t"]
+            event["ttfb_ms"] = record["ttfb_ms"]
+            event["bytes_received"] = record["bytes_received"]
+            event["bytes_sent"] = record["bytes_sent"]
+
+        self._record(event)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_replyMetaDataChanged(self):
+        record = self._replies.get(self.sender())
+
+        if record is not None and record["ttfb_ms"] is None:
+            record["ttfb_ms"] = self._now() - record["t"]
+
+    # -------------------------------------------------------------------------
+
+    def _slot_replyUploadProgress(self, sent, total):
+        record = self._replies.get(self.sender())
+
+        if record is not None:
+            record["bytes_sent"] = sent
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def clear(self):
+        """
+        Forget all records.
+        """
+
+        self._events = []
+
+    # -------------------------------------------------------------------------
+
+    def events(self):
+        """
+        Return all records in the order they were made.
+
+        Phase records: event ("phase"), phase, t
+        Reply records: event ("reply"), url, method, status, from_cache,
+                       error, t, start_t, ttfb_ms, duration_ms,
+                       bytes_received, bytes_sent
+
+        All times are milliseconds since the trace was created.
+
+        @return (list) dicts
+        """
+
+        return list(self._events)
+
+    # -------------------------------------------------------------------------
+
+    def export_jsonl(self, f):
+        """
+        Write all records as JSON lines.
+
+        @param f (str/file) Path or file object to write to.
+        """
+
+        if isinstance(f, basestring):
+            with open(f, "a") as f:
+                return self.export_jsonl(f)
+
+        for event in self._events:
+            f.write(json.dumps(event) + "\n")
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthDialog(QWebView):
+
+    """
+    A QWebView extended to load Facebook's OAuth Dialog allowing a user to
+    login and grant permissions to your facebook app and finally return the
+    user's token or OAuth code.
+    """
+
+    # code of signal_errorOAuthException for a redirect whose state wasn't
+    # issued by the dialog's state registry
+    ERROR_STATE_MISMATCH = -1
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when a user authentication fails. This is when a user submits the
+    bad login details, once the login form shown again has loaded.
+
+    @param state (str) The state value originally set in request.
+    """
+
+    signal_authFail = Signal(str)
+
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when a user authentication succesfully before authorizing
+    permissions.
+
+    @param state (str) The state value originally set in request.
+    """
+
+    signal_authSuccess = Signal(str)
+
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when the auth form has loaded and is ready to be displayed.
+
+    @param state (str) The state value originally set in request.
+    """
+
+    signal_authFormReady = Signal(str)
+
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when `start_auth` starts an authentication, before the OAuth
+    Dialog is loaded or a stored token is emitted.
+
+    @param state (str) The state value set in request.
+    """
+
+    signal_authStarted = Signal(str)
+
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when an OAuthExeption is encountered.
+
+    NOTE: This is can happen for a multitude of reasons. For example if your
+          App ID is invalid you wil receive an OAuthEception code 101. You
+          should read the message for details on the cause of the exception.
+
+    @param message (str) A string explaining the exception.
+    @param code    (int) OAuthException code
+    """
+
+    signal_errorOAuthException = Signal(str, int)
+
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when a user authenticates, authorizes the requested permissions
+    AND the `response_type` was set to: token
+
+    @param access_token (str) Authenticated user's facebook access token.
+    @param expires_in   (int) Number of seconds until token expires.
+    @param state        (str) The state value originally set in request.
+    """
+
+    signal_permsAuthorizedAccessToken = Signal(str, int, str)
+
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when a user authenticates, authorizes the requested permissions
+    AND the `response_type` was set to: code
+
+    @param oauth_code (str) OAuth code generated by facebook.
+    @param state      (str) The state value originally set in request.
+    """
+
+    signal_permsAuthorizedOAuthCode = Signal(str, str)
+
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when a the requested permissions are NOT authorized by the user.
+    This happens when a user clicks "cancel" at any time before authorizing
+    the permissions.
+
+    @param error       (str) Error code (example: access_denied)
+    @param reason      (str) Reason code (example: user_denied)
+    @param description (str) A string explaining the error.
+    @param state       (str) The state value originally set in request.
+    """
+
+    signal_permsNotAuthorized = Signal(str, str, str, str)
+
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when a user doesn't authenticate within the amount of time
+    specified in `watchdog.user_auth_timeout`, or when the OAuth Dialog
+    doesn't load in time (see FBAuthWatchdog).
+
+    @param time_elapsed (int) Number of seconds elapsed to cause the timeout.
+    """
+
+    signal_userAuthTimeout = Signal(int)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, app_id=None, network_access_manager=None,
+            use_shared_cache=True, token_store=None, cookie_jar=None,
+            state_registry=None):
+        """
+        Instantiate FBAuthDialog object.
+
+        @param [parent]                 (QWidget) Parent object that this
+                                                  widget belongs to.
+        @param [app_id]                 (str)     Facebook App ID
+        @param [network_access_manager] (QNetworkAccessManager) Manager all
+                        of the dialog's requests go through. Defaults to a
+                        FBNetworkAccessManager without any rules.
+        @param [use_shared_cache]       (bool)    Cache web content in the
+                        process-wide FBNetworkCache.
+        @param [token_store]            (FBTokenStore) Store access tokens
+                        are saved to and reused from by `start_auth`.
+        @param [cookie_jar]             (QNetworkCookieJar) Cookie jar to use
+                        instead of an empty in-memory one (example:
+                        FBCookieJar). The dialog takes ownership of it.
+        @param [state_registry]         (FBStateRegistry) Registry issuing
+                        the state of each `start_auth` and validating the
+                        state of each redirect.
+        """
+
+        super(FBAuthDialog, self).__init__(parent)
+
+        # set default oauth params
+        self.set_oauth_params(app_id=app_id)
+
+        # setting the page makes DOM elements render correctly
+        self.setPage(FBWebPage(self))
+
+        self.set_network_access_manager(network_access_manager or
+                FBNetworkAccessManager())
+
+        if use_shared_cache:
+            FBNetworkCache.shared().install(self._nam)
+
+        if cookie_jar is not None:
+            self._nam.setCookieJar(cookie_jar)
+
+        self._router = FBURLRouter()
+
+        self._token_store = token_store
+        self._state_registry = state_registry
+
+        # oauth params of the OAuth Dialog currently loaded
+        self._auth_params = None
+
+        # route of the URL being loaded, emitted once its page has loaded
+        # (see FBURLRouter.LOAD_SIGNALS)
+        self._load_route = None
+
+        # True once the login form of the current OAuth Dialog has loaded
+        self.form_ready = False
+
+        # deadlines and stall retries, configured through its attributes
+        self.watchdog = FBAuthWatchdog(self)
+
+        # connect signals
+        self.urlChanged.connect(self._slot_urlChanged)
+        self.signal_authFormReady.connect(self._slot_authFormReady)
+        self.watchdog.signal_timeout.connect(self._slot_watchdogTimeout)
+        self.loadFinished.connect(self._slot_loadFinished)
+        self.page().signal_redirectIntercepted.connect(
+                self._slot_redirectIntercepted)
+        self.signal_permsAuthorizedAccessToken.connect(
+                self._slot_permsAuthorizedAccessToken)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _slot_authFormReady(self, state):
+        """
+        Slot for signal_authFormReady.
+        """
+
+        self.form_ready = True
+
+    # -------------------------------------------------------------------------
+
+    def _slot_loadFinished(self, ok):
+        """
+        Slot for QWebView loadFinished signal. Emits the signal of a login
+        page that has loaded and detects OAuthException errors shown in place
+        of the OAuth Dialog.
+
+        @param ok (bool)
+        """
+
+        if self._load_route is not None:
+            # a stopped load may be retried, keep the route until then
+            if not ok:
+                return
+
+            signal_name, args = self._load_route
+            self._load_route = None
+
+            getattr(self, signal_name).emit(*args)
+
+            return
+
+        route = self._router.route_body(self.page().mainFrame().toPlainText())
+
+        if route is None:
+            return
+
+        signal_name, args = route
+
+        getattr(self, signal_name).emit(*args)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_permsAuthorizedAccessToken(self, access_token, expires_in,
+            state):
+        """
+        Slot for signal_permsAuthorizedAccessToken. Saves the token to the
+        token store.
+        """
+
+        if self._token_store is None or self._auth_params is None:
+            return
+
+        self._token_store.put(self._auth_params["app_id"],
+                self._auth_params["scope"], access_token, expires_in)
+
+        self._auth_params = None
+
+    # -------------------------------------------------------------------------
+
+    def _route(self, url):
+        """
+        Emit the signal the encoded URL routes to, if any.
+
+        @param url (str)
+        """
+
+        route = self._router.route(url)
+
+        if route is None:
+            return
+
+        signal_name, args = route
+
+        if signal_name in FBURLRouter.LOAD_SIGNALS:
+            self._load_route = route
+
+            return
+
+        # a redirect with a state that wasn't issued may be forged (CSRF)
+        if (self._state_registry is not None and
+                signal_name in FBURLRouter.REDIRECT_SIGNALS and
+                not self._state_registry.validate(args[-1])):
+            self.stop()
+
+            self.signal_errorOAuthException.emit(
+                    "state of the redirect was not issued or has expired",
+                    self.ERROR_STATE_MISMATCH)
+
+            return
+
+        getattr(self, signal_name).emit(*args)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_redirectIntercepted(self, url):
+        """
+        Slot for FBWebPage signal_redirectIntercepted.
+
+        @param url (str)
+        """
+
+        self._route(url)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_watchdogTimeout(self, time_elapsed, phase):
+        """
+        Slot for FBAuthWatchdog signal_timeout.
+        """
+
+        self.signal_userAuthTimeout.emit(time_elapsed)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_urlChanged(self, url):
+        """
+        Slot for QWebView urlChanged signal.
+
+        Only top-level navigations are routed; sub-resource replies (images,
+        CSS, JS) never reach the router.
+
+        @param url (QUrl)
+        """
+
+        self._load_route = None
+
+        self._route(str(url.toEncoded()))
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def authenticate(self, state=None, timeout=None):
+        """
+        Start authentication process and return a future resolved with its
+        outcome, as an alternative to connecting to the dialog's signals.
+
+        @param [state]   (str)   See `start_auth`.
+        @param [timeout] (float) Seconds after which the authentication is
+                                 cancelled.
+
+        @return (FBAuthFuture) Resolves to a FBAuthResult.
+        """
+
+        future = FBAuthFuture(self, timeout)
+
+        try:
+            self.start_auth(state)
+        except FBAuthDialogException:
+            future.cancel()
+
+            raise
+
+        return future
+
+    # -------------------------------------------------------------------------
+
+    def get_oauth_url(self, app_id, redirect_uri, scope, state, response_type,
+            display, oauth_url=OAUTH_URL):
+        """
+        Return encoded OAuth URL with request params formated as GET params.
+        See the module level `get_oauth_url`.
+
+        @return (QUrl)
+        """
+
+        return get_oauth_url(app_id, redirect_uri, scope, state,
+                response_type, display, oauth_url)
+
+    # -------------------------------------------------------------------------
+
+    def set_network_access_manager(self, network_access_manager):
+        """
+        Set the QNetworkAccessManager the dialog's requests go through.
+
+        NOTE: This must be done before `start_auth` is first called. Managers
+              without a parent are reparented to the dialog's page.
+
+        @param network_access_manager (QNetworkAccessManager)
+        """
+
+        if network_access_manager.parent() is None:
+            network_access_manager.setParent(self.page())
+
+        self.page().setNetworkAccessManager(network_access_manager)
+
+        self._nam = network_access_manager
+
+    # -------------------------------------------------------------------------
+
+    def set_oauth_params(self, app_id=None, redirect_uri=REDIRECT_URI,
+            scope=[], state=None, response_type="token", display="popup",
+            oauth_url=OAUTH_URL):
+        """
+        Set OAuth request params values.
+
+        Facebook OAuth Dialog Param References:
+         - https://developers.facebook.com/docs/reference/dialogs/oauth/
+
+        Facebook Permissions Reference
+         - https://developers.facebook.com/docs/authentication/permissions/
+
+        NOTE: The default redirect_uri is the one provided by facebook
+              specifically to allow desktop apps to login using OAuth 2.0
+              implementation without having to have a webserver running to
+              redirect users to after they have successfully authenticated.
+
+        @param [app_id]        (str/uni)
+        @param [redirect_uri]  (str/uni)
+        @param [scope]         (list)
+        @param [state]         (str/uni)
+        @param [response_type] (str/uni)
+        @param [display]       (str/uni)
+        @param [oauth_url]     (str/uni) URL of the OAuth Dialog, only
+                                         changed to point the dialog at a
+                                         stand-in server.
+        """
+
+        self.oauth_params = {
+            "app_id": app_id,
+            "redirect_uri": redirect_uri,
+            "scope": scope,
+            "state": state,
+            "response_type": response_type,
+            "display": display,
+            "oauth_url": oauth_url,
+        }
+
+    # -------------------------------------------------------------------------
+
+    def start_auth(self, state=None):
+        """
+        Start authentication process by opening OAuth Dialog.
+
+        If a token store is set and it holds a valid token granting the
+        requested scope, signal_permsAuthorizedAccessToken is emitted right
+        away and the OAuth Dialog is not opened.
+
+        If a state registry is set, the state is issued by it unless one is
+        given, which must have been issued by it as well. Redirects whose
+        state it doesn't validate emit signal_errorOAuthException with the
+        code ERROR_STATE_MISMATCH. Without a registry, callers must check
+        the state of the signals themselves.
+
+        @param [state] (str) If set, the value is passed in the OAuth request
+                             instead the value set for state using the
+                             `set_oauth_params` method.
+        """
+
+        oauth_params = self.oauth_params.copy()
+
+        if not state and self._state_registry is not None:
+            state = self._state_registry.issue()
+
+        if state:
+            oauth_params['state'] = state
+
+        oauth_url = self.get_oauth_url(**oauth_params)
+
+        self.signal_authStarted.emit(oauth_params["state"] or "")
+
+        if (self._token_store is not None and
+                oauth_params["response_type"] == "token"):
+            token = self._token_store.get(oauth_params["app_id"],
+                    oauth_params["scope"])
+
+            if token is not None:
+                access_token, expires_in = token
+
+                self._auth_params = None
+
+                # no redirect will use the state
+                if self._state_registry is not None:
+                    self._state_registry.validate(oauth_params["state"])
+
+                self.signal_permsAuthorizedAccessToken.emit(access_token,
+                        expires_in, oauth_params["state"] or "")
+
+                return
+
+        self._auth_params = oauth_params
+
+        redirect_uri = oauth_params["redirect_uri"]
+
+        if redirect_uri != self._router.redirect_uri:
+            self._router = FBURLRouter(redirect_uri)
+            self.page().set_redirect_uri(redirect_uri)
+
+        self.form_ready = False
+        self._load_route = None
+
+        self.watchdog.start()
+
+        self.load(oauth_url)
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthDialogPool(QObject):
+
+    """
+    Keeps hidden FBAuthDialog objects with the OAuth Dialog's login form
+    already loaded, so a dialog can be shown the moment a user asks to log in
+    instead of after WebKit has started up and loaded the form.
+
+    The pool refills itself in the background each time a dialog is handed
+    out, loading one dialog at a time so the GUI stays responsive. Dialogs
+    that fail to load the form (OAuthException, watchdog timeout or a failed
+    load that isn't retried) are deleted and loaded again after
+    `retry_delay` seconds, doubled for each failure in a row.
+
+    Memory is measured as the growth of the resident set size, read from
+    /proc, while each dialog loaded. Dialogs load one at a time so the growth
+    is mostly the dialog's own, but anything else the process allocates
+    meanwhile is counted too, so the figure is an estimate. Where there's
+    no /proc the peak resident set size is used instead, which only
+    grows, so dialogs may be counted as larger than they are. Where neither
+    can be read `max_memory` has no effect.
+    """
+
+    # file the resident set size is read from, in pages
+    STATM_PATH = "/proc/self/statm"
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when a pooled dialog has finished loading the login form.
+
+    @param ready_count (int) Number of dialogs now ready to be handed out.
+    """
+
+    signal_dialogReady = Signal(int)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, size=1, max_memory=None, preconnect=True,
+            retry_delay=AUTH_POOL_RETRY_DELAY,
+            max_retry_delay=AUTH_POOL_MAX_RETRY_DELAY, **oauth_params):
+        """
+        Instantiate FBAuthDialogPool object and start filling it.
+
+        @param [parent]          (QObject) Parent object that this object
+                                           belongs to.
+        @param [size]            (int)     Number of dialogs to keep loaded.
+        @param [max_memory]      (int)     If set, no more dialogs are
+                                           created once the pooled dialogs
+                                           have grown the process by this
+                                           many bytes.
+        @param [preconnect]      (bool)    Look up the OAuth Dialog's hosts
+                                           before the first dialog is
+                                           created.
+        @param [retry_delay]     (float)   Seconds before a dialog is loaded
+                                           again after one failed.
+        @param [max_retry_delay] (float)   Seconds the delay grows to at
+                                           most.
+        @param [oauth_params]    (kwargs)  Passed to each dialog's
+                                           `set_oauth_params` method.
+        """
+
+        super(FBAuthDialogPool, self).__init__(parent)
+
+        self.size = size
+        self.max_memory = max_memory
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.oauth_params = oauth_params
+
+        self._ready = []
+        self._loading = []
+
+        # dialog => bytes the process grew by while creating and loading it
+        self._memory = {}
+        self._rss_at_create = {}
+
+        self._fill_pending = False
+
+        # dialogs that failed to load in a row
+        self._failures = 0
+
+        if preconnect:
+            for host in PRECONNECT_HOSTS:
+                QHostInfo.lookupHost(host, self,
+                        SLOT("_slot_hostLookedUp(QHostInfo)"))
+
+        self._schedule_fill()
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _rss(self):
+        """
+        Return the resident set size of the process in bytes, or None when
+        it can't be determined.
+
+        @return (int/None)
+        """
+
+        if resource is None:
+            return None
+
+        try:
+            with open(self.STATM_PATH) as f:
+                return int(f.read().split()[1]) * resource.getpagesize()
+        except (IOError, IndexError, ValueError):
+            pass
+
+        # peak resident set size, in bytes on mac os and kilobytes elsewhere
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        return rss if sys.platform == "darwin" else rss * 1024
+
+    # -------------------------------------------------------------------------
+
+    def _fail(self, dialog):
+        """
+        Delete a pooled dialog that failed and load another one, backing off
+        while dialogs keep failing.
+
+        @param dialog (FBAuthDialog)
+        """
+
+        if dialog in self._loading:
+            self._loading.remove(dialog)
+        elif dialog in self._ready:
+            self._ready.remove(dialog)
+        else:
+            return
+
+        self._release(dialog)
+
+        dialog.deleteLater()
+
+        delay = min(self.retry_delay * 2 ** self._failures,
+                self.max_retry_delay)
+        self._failures += 1
+
+        self._schedule_fill(delay)
+
+    # -------------------------------------------------------------------------
+
+    def _fill(self):
+        """
+        Create one dialog if the pool isn't full and no other is loading. The
+        next is created once it's ready or has failed.
+        """
+
+        self._fill_pending = False
+
+        if self._loading or len(self._ready) >= self.size:
+            return
+
+        if (self.max_memory is not None and
+                self.memory_usage() >= self.max_memory):
+            return
+
+        dialog = FBAuthDialog()
+        dialog.set_oauth_params(**self.oauth_params)
+        dialog.signal_authFormReady.connect(self._slot_dialogFormReady)
+        dialog.signal_errorOAuthException.connect(self._slot_dialogFailed)
+        dialog.signal_userAuthTimeout.connect(self._slot_dialogFailed)
+        dialog.loadFinished.connect(self._slot_dialogLoadFinished)
+
+        self._loading.append(dialog)
+        self._rss_at_create[dialog] = self._rss()
+
+        dialog.start_auth()
+
+    # -------------------------------------------------------------------------
+
+    def _release(self, dialog):
+        """
+        Stop tracking a dialog.
+
+        @param dialog (FBAuthDialog)
+        """
+
+        dialog.signal_authFormReady.disconnect(self._slot_dialogFormReady)
+        dialog.signal_errorOAuthException.disconnect(self._slot_dialogFailed)
+        dialog.signal_userAuthTimeout.disconnect(self._slot_dialogFailed)
+        dialog.loadFinished.disconnect(self._slot_dialogLoadFinished)
+
+        self._memory.pop(dialog, None)
+        self._rss_at_create.pop(dialog, None)
+
+    # -------------------------------------------------------------------------
+
+    def _schedule_fill(self, delay=0):
+        """
+        Call `_fill` once control returns to the event loop, unless a call is
+        already scheduled.
+
+        @param [delay] (float) Seconds to wait first.
+        """
+
+        if not self._fill_pending:
+            self._fill_pending = True
+
+            QTimer.singleShot(int(delay * 1000), self._fill)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_dialogFailed(self, *args):
+        """
+        Slot for the failure signals of pooled dialogs.
+        """
+
+        self._fail(self.sender())
+
+    # -------------------------------------------------------------------------
+
+    def _slot_dialogFormReady(self, state):
+        """
+        Slot for the signal_authFormReady signal of dialogs loading.
+        """
+
+        dialog = self.sender()
+
+        if dialog not in self._loading:
+            return
+
+        self._loading.remove(dialog)
+        self._ready.append(dialog)
+
+        rss_at_create = self._rss_at_create.pop(dialog, None)
+        rss = self._rss()
+
+        if rss_at_create is not None and rss is not None:
+            self._memory[dialog] = max(rss - rss_at_create, 0)
+
+        self._failures = 0
+
+        self.signal_dialogReady.emit(len(self._ready))
+
+        self._schedule_fill()
+
+    # -------------------------------------------------------------------------
+
+    def _slot_dialogLoadFinished(self, ok):
+        """
+        Slot for the loadFinished signal of pooled dialogs. Loads stopped to
+        be retried by the dialog's watchdog don't count as failed.
+        """
+
+        dialog = self.sender()
+
+        if ok or dialog not in self._loading or dialog.watchdog.retrying():
+            return
+
+        self._fail(dialog)
+
+    # -------------------------------------------------------------------------
+
+    @Slot(QHostInfo)
+    def _slot_hostLookedUp(self, host_info):
+        """
+        Slot for QHostInfo lookups. Qt caches the results, which is all the
+        lookups are for.
+        """
+
+        pass
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def acquire(self, parent=None):
+        """
+        Hand out a dialog and refill the pool in the background.
+
+        Dialogs handed out have `form_ready` set when the login form has
+        already loaded, in which case signal_authFormReady will not be
+        emitted again. When no dialog is ready, the one closest to ready is
+        handed out (or a new one if the pool is empty) and
+        signal_authFormReady follows once its form has loaded.
+
+        @param [parent] (QWidget) Parent widget of the dialog.
+
+        @return (FBAuthDialog)
+        """
+
+        if self._ready or self._loading:
+            dialog = (self._ready or self._loading).pop(0)
+
+            self._release(dialog)
+        else:
+            dialog = FBAuthDialog()
+            dialog.set_oauth_params(**self.oauth_params)
+            dialog.start_auth()
+
+        if parent is not None:
+            dialog.setParent(parent)
+
+        self._schedule_fill()
+
+        return dialog
+
+    # -------------------------------------------------------------------------
+
+    def clear(self):
+        """
+        Delete every pooled dialog.
+        """
+
+        for dialog in self._ready + self._loading:
+            self._release(dialog)
+
+            dialog.deleteLater()
+
+        self._ready = []
+        self._loading = []
+
+    # -------------------------------------------------------------------------
+
+    def memory_usage(self):
+        """
+        Return the estimated number of bytes used by the pooled dialogs,
+        measured as the growth of the process while each one loaded.
+
+        @return (int)
+        """
+
+        return sum(self._memory.itervalues())
+
+    # -------------------------------------------------------------------------
+
+    def ready_count(self):
+        """
+        Return the number of dialogs ready to be handed out.
+
+        @return (int)
+        """
+
+        return len(self._ready)
+
+
+# -----------------------------------------------------------------------------
+
+class FBHeadlessAuth(QObject):
+
+    """
+    Runs the OAuth Dialog in an off-screen QWebPage and logs in with the
+    credentials it was given, for provisioning tokens of test users without
+    any windows.
+
+    The dialog is driven the same way FBAuthDialog drives it, with the URL
+    from `get_oauth_url` and the redirects routed by FBURLRouter, so the
+    signals are the same as FBAuthDialog's. As nothing is ever shown the
+    page is never painted, and images and plugins are turned off.
+
+    Unless a network access manager is given each flow gets its own, with an
+    in-memory cookie jar, so flows never share a logged in session.
+    """
+
+    # JavaScript run once the login form and the permissions page load,
+    # override to match a different page
+    LOGIN_SCRIPT = (
+        "document.getElementById('email').value = %(email)s;"
+        "document.getElementById('pass').value = %(password)s;"
+        "document.getElementById('login_form').submit();")
+    GRANT_SCRIPT = (
+        "var form = document.getElementById('allow_form');"
+        "if (form) { form.submit(); } else {"
+        "var button = document.getElementsByName('__CONFIRM__')[0];"
+        "if (button) { button.click(); } }")
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    See the FBAuthDialog signals of the same name.
+    """
+
+    signal_authFail = Signal(str)
+    signal_authSuccess = Signal(str)
+    signal_authFormReady = Signal(str)
+    signal_errorOAuthException = Signal(str, int)
+    signal_permsAuthorizedAccessToken = Signal(str, int, str)
+    signal_permsAuthorizedOAuthCode = Signal(str, str)
+    signal_permsNotAuthorized = Signal(str, str, str, str)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, app_id=None, email=None, password=None,
+            scope=None, response_type="token", redirect_uri=REDIRECT_URI,
+            oauth_url=OAUTH_URL, network_access_manager=None):
+        """
+        Instantiate FBHeadlessAuth object.
+
+        @param [parent]                 (QObject) Parent object that this
+                                                  object belongs to.
+        @param [app_id]                 (str)
+        @param [email]                  (str)     Email to log in with.
+        @param [password]               (str)     Password to log in with.
+        @param [scope]                  (list)
+        @param [response_type]          (str)
+        @param [redirect_uri]           (str)
+        @param [oauth_url]              (str)
+        @param [network_access_manager] (QNetworkAccessManager) Defaults to
+                        a FBNetworkAccessManager with RESOURCE_RULES_LEAN and
+                        its own cookie jar.
+        """
+
+        super(FBHeadlessAuth, self).__init__(parent)
+
+        self.app_id = app_id
+        self.email = email
+        self.password = password
+        self.scope = scope or []
+        self.response_type = response_type
+        self.redirect_uri = redirect_uri
+        self.oauth_url = oauth_url
+
+        self._page = FBWebPage(self, redirect_uri)
+
+        settings = self._page.settings()
+        settings.setAttribute(QWebSettings.AutoLoadImages, False)
+        settings.setAttribute(QWebSettings.PluginsEnabled, False)
+
+        if network_access_manager is None:
+            network_access_manager = FBNetworkAccessManager(
+                    rules=RESOURCE_RULES_LEAN)
+            network_access_manager.setCookieJar(QNetworkCookieJar())
+
+        if network_access_manager.parent() is None:
+            network_access_manager.setParent(self._page)
+
+        self._page.setNetworkAccessManager(network_access_manager)
+
+        self._router = FBURLRouter(redirect_uri)
+
+        # future of the running authentication, the script to run once the
+        # current page has finished loading, and the route emitted then
+        self._future = None
+        self._script = None
+        self._load_route = None
+
+        self._page.mainFrame().urlChanged.connect(self._slot_urlChanged)
+        self._page.loadFinished.connect(self._slot_loadFinished)
+        self._page.signal_redirectIntercepted.connect(self._route)
+
+        self.signal_authFormReady.connect(self._slot_authFormReady)
+        self.signal_authSuccess.connect(self._slot_authSuccess)
+        self.signal_authFail.connect(self._slot_authFail)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _route(self, url):
+        """
+        Emit the signal the encoded URL routes to, if any.
+
+        @param url (str)
+        """
+
+        route = self._router.route(url)
+
+        if route is None:
+            return
+
+        signal_name, args = route
+
+        if signal_name in FBURLRouter.LOAD_SIGNALS:
+            self._load_route = route
+
+            return
+
+        getattr(self, signal_name).emit(*args)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_authFail(self, state):
+        """
+        Slot for signal_authFail. There's no user to try again, so the
+        authentication fails.
+        """
+
+        self.stop()
+
+        if self._future is not None:
+            self._future._finish(exception=FBAuthLoginFailedException(
+                    "login failed for %s" % self.email))
+
+    # -------------------------------------------------------------------------
+
+    def _slot_authFormReady(self, state):
+        self._script = self.LOGIN_SCRIPT % {
+            "email": json.dumps(self.email),
+            "password": json.dumps(self.password),
+        }
+
+    # -------------------------------------------------------------------------
+
+    def _slot_authSuccess(self, state):
+        self._script = self.GRANT_SCRIPT
+
+    # -------------------------------------------------------------------------
+
+    def _slot_loadFinished(self, ok):
+        """
+        Slot for QWebPage loadFinished signal. Emits the signal of a login
+        page that has loaded, runs the pending script and detects
+        OAuthException errors shown in place of the OAuth Dialog.
+        """
+
+        if self._load_route is not None and ok:
+            signal_name, args = self._load_route
+            self._load_route = None
+
+            # sets the login script run below
+            getattr(self, signal_name).emit(*args)
+
+        # signal_authSuccess fires as soon as the permissions page's URL is
+        # committed, before the page has loaded, so scripts wait for the load
+        # to finish
+        script, self._script = self._script, None
+
+        frame = self._page.mainFrame()
+
+        if script:
+            frame.evaluateJavaScript(script)
+
+            return
+
+        route = self._router.route_body(frame.toPlainText())
+
+        if route is not None:
+            signal_name, args = route
+
+            getattr(self, signal_name).emit(*args)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_urlChanged(self, url):
+        self._load_route = None
+
+        self._route(str(url.toEncoded()))
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def authenticate(self, state=None, timeout=None):
+        """
+        Start authentication and return a future resolved with its outcome.
+
+        @param [state]   (str)
+        @param [timeout] (float) Seconds after which the authentication is
+                                 cancelled.
+
+        @return (FBAuthFuture) Resolves to a FBAuthResult, or fails with
+                               FBAuthLoginFailedException if the
+                               credentials are refused.
+        """
+
+        self._future = FBAuthFuture(self, timeout)
+
+        self.start_auth(state)
+
+        return self._future
+
+    # -------------------------------------------------------------------------
+
+    def network_access_manager(self):
+        return self._page.networkAccessManager()
+
+    # -------------------------------------------------------------------------
+
+    def start_auth(self, state=None):
+        """
+        Load the OAuth Dialog.
+
+        @param [state] (str)
+        """
+
+        self._script = None
+        self._load_route = None
+
+        self._page.mainFrame().load(get_oauth_url(self.app_id,
+                self.redirect_uri, self.scope, state, self.response_type,
+                "popup", self.oauth_url))
+
+    # -------------------------------------------------------------------------
+
+    def stop(self):
+        self._script = None
+        self._load_route = None
+
+        self._page.triggerAction(QWebPage.Stop)
+
+
+# -----------------------------------------------------------------------------
+
+class FBHeadlessAuthBatch(QObject):
+
+    """
+    Runs FBHeadlessAuth flows for many accounts, at most `max_concurrent` at
+    once, and reports the throughput of the batch.
+    """
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when the authentication of an account is done.
+
+    @param email  (str)
+    @param future (FBFuture) Resolved to a FBAuthResult or failed.
+    """
+
+    signal_authDone = Signal(str, object)
+
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when no authentications are queued or running anymore.
+    """
+
+    signal_idle = Signal()
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, app_id=None, scope=None,
+            response_type="token", redirect_uri=REDIRECT_URI,
+            oauth_url=OAUTH_URL, max_concurrent=AUTH_HEADLESS_MAX_CONCURRENT,
+            timeout=AUTH_HEADLESS_TIMEOUT):
+        """
+        Instantiate FBHeadlessAuthBatch object.
+
+        @param [parent]         (QObject)
+        @param [app_id]         (str)
+        @param [scope]          (list)
+        @param [response_type]  (str)
+        @param [redirect_uri]   (str)
+        @param [oauth_url]      (str)
+        @param [max_concurrent] (int)     Flows run at once.
+        @param [timeout]        (float)   Seconds each flow may take.
+        """
+
+        super(FBHeadlessAuthBatch, self).__init__(parent)
+
+        self.app_id = app_id
+        self.scope = scope
+        self.response_type = response_type
+        self.redirect_uri = redirect_uri
+        self.oauth_url = oauth_url
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+
+        # (email, password, state, future) waiting for a free slot
+        self._queue = deque()
+        self._running = 0
+
+        self._timer = QElapsedTimer()
+
+        self.reset_stats()
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _dispatch(self):
+        """
+        Start queued flows while fewer than `max_concurrent` run.
+        """
+
+        while self._queue and self._running < self.max_concurrent:
+            email, password, state, future = self._queue.popleft()
+
+            # cancelled while queued
+            if future.done():
+                continue
+
+            self._start(email, password, state, future)
+
+        if not self._queue and not self._running:
+            self.signal_idle.emit()
+
+    # -------------------------------------------------------------------------
+
+    def _flow_finished(self, email, future, flow, started, flow_future):
+        self._running -= 1
+
+        exception = flow_future.exception()
+        result = flow_future.result() if exception is None else None
+
+        if result is not None and result.kind in (FBAuthResult.KIND_TOKEN,
+                FBAuthResult.KIND_CODE):
+            self._stats["succeeded"] += 1
+        else:
+            self._stats["failed"] += 1
+
+        self._stats["duration"] += self._timer.elapsed() - started
+        self._stats["elapsed"] = self._timer.elapsed()
+
+        future._finish(result, exception)
+
+        self.signal_authDone.emit(email, future)
+
+        flow.deleteLater()
+
+        self._dispatch()
+
+    # -------------------------------------------------------------------------
+
+    def _start(self, email, password, state, future):
+        flow = FBHeadlessAuth(self, self.app_id, email, password, self.scope,
+                self.response_type, self.redirect_uri, self.oauth_url)
+
+        self._running += 1
+        self._stats["started"] += 1
+
+        if not self._timer.isValid():
+            self._timer.start()
+
+        flow_future = flow.authenticate(state, self.timeout)
+        flow_future.add_done_callback(partial(self._flow_finished, email,
+                future, flow, self._timer.elapsed()))
+
+        def cancel_flow(future):
+            if future.cancelled():
+                flow_future.cancel()
+
+        # cancelling the batch's future stops the flow
+        future.add_done_callback(cancel_flow)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def authenticate(self, email, password, state=None):
+        """
+        Queue the authentication of an account.
+
+        @param email     (str)
+        @param password  (str)
+        @param [state]   (str)
+
+        @return (FBFuture) Resolved to a FBAuthResult, see
+                           `FBHeadlessAuth.authenticate`.
+        """
+
+        future = FBFuture(self)
+
+        self._queue.append((email, password, state, future))
+
+        self._dispatch()
+
+        return future
+
+    # -------------------------------------------------------------------------
+
+    def authenticate_all(self, accounts):
+        """
+        Queue the authentication of many accounts.
+
+        @param accounts (list) (email, password) tuples.
+
+        @return (list) FBFuture for each account.
+        """
+
+        return [self.authenticate(email, password)
+                for email, password in accounts]
+
+    # -------------------------------------------------------------------------
+
+    def pending_count(self):
+        """
+        Return the number of queued and running flows.
+
+        @return (int)
+        """
+
+        return len(self._queue) + self._running
+
+    # -------------------------------------------------------------------------
+
+    def report(self):
+        """
+        Return the number of flows `started`, `succeeded` and `failed`, the
+        `elapsed` seconds since the first flow started, the flows completed
+        `per_minute` and their `mean_duration` in seconds.
+
+        @return (dict)
+        """
+
+        completed = self._stats["succeeded"] + self._stats["failed"]
+        elapsed = self._stats["elapsed"] / 1000.0
+
+        return {
+            "started": self._stats["started"],
+            "succeeded": self._stats["succeeded"],
+            "failed": self._stats["failed"],
+            "elapsed": elapsed,
+            "per_minute": completed * 60 / elapsed if elapsed else 0.0,
+            "mean_duration": (self._stats["duration"] / 1000.0 / completed
+                    if completed else 0.0),
+        }
+
+    # -------------------------------------------------------------------------
+
+    def reset_stats(self):
+        self._stats = {"started": 0, "succeeded": 0, "failed": 0,
+                "elapsed": 0, "duration": 0}
+
+        self._timer.invalidate()
+
+
+# -----------------------------------------------------------------------------
+
+class FBAccountNetworkAccessManager(FBNetworkAccessManager):
+
+    """
+    A FBNetworkAccessManager shared by the pages of many accounts, which
+    keeps each account's cookies in a jar of its own and accounts for each
+    account's requests.
+
+    Requests are matched to accounts by the page they were made for. Their
+    cookies are loaded from and saved to the account's jar by hand, so the
+    manager's own jar (a FBNullCookieJar) is only seen by scripts. Requests
+    carrying an account's cookies always go to the network, so no account
+    is answered from the cache with another's response.
+
+    NOTE: Cookies set or read by scripts through `document.cookie` go
+          through the manager's jar and are therefore dropped, as there's no
+          telling which account a script belongs to.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, rules=None):
+        super(FBAccountNetworkAccessManager, self).__init__(parent, rules)
+
+        self.setCookieJar(FBNullCookieJar())
+
+        # QWebPage => FBAccount
+        self._accounts = {}
+
+        # reply => [FBAccount, bytes received so far]
+        self._replies = {}
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def createRequest(self, operation, request, data=None):
+        """
+        Reimplemented from QNetworkAccessManager.
+        """
+
+        account = self._accounts.get(self.originating_page(request))
+
+        if account is None:
+            return super(FBAccountNetworkAccessManager, self).createRequest(
+                    operation, request, data)
+
+        request = QNetworkRequest(request)
+        request.setAttribute(QNetworkRequest.CookieLoadControlAttribute,
+                QNetworkRequest.Manual)
+        request.setAttribute(QNetworkRequest.CookieSaveControlAttribute,
+                QNetworkRequest.Manual)
+
+        cookies = account.cookie_jar.cookiesForUrl(request.url())
+
+        if cookies:
+            request.setRawHeader("Cookie", "; ".join(
+                    str(cookie.toRawForm(QNetworkCookie.NameAndValueOnly))
+                    for cookie in cookies))
+
+            request.setAttribute(QNetworkRequest.CacheLoadControlAttribute,
+                    QNetworkRequest.AlwaysNetwork)
+            request.setAttribute(QNetworkRequest.CacheSaveControlAttribute,
+                    False)
+
+        reply = super(FBAccountNetworkAccessManager, self).createRequest(
+                operation, request, data)
+
+        account.requests += 1
+        account.active_replies += 1
+        account.peak_replies = max(account.peak_replies,
+                account.active_replies)
+
+        if data is not None:
+            account.bytes_sent += max(data.size(), 0)
+
+        self._replies[reply] = [account, 0]
+
+        reply.metaDataChanged.connect(self._slot_accountReplyMetaDataChanged)
+        reply.downloadProgress.connect(
+                self._slot_accountReplyDownloadProgress)
+        reply.finished.connect(self._slot_accountReplyFinished)
+
+        return reply
+
+    # -------------------------------------------------------------------------
+
+    def _slot_accountReplyDownloadProgress(self, received, total):
+        record = self._replies.get(self.sender())
+
+        if record is None:
+            return
+
+        record[0].bytes_received += received - record[1]
+        record[1] = received
+
+    # -------------------------------------------------------------------------
+
+    def _slot_accountReplyFinished(self):
+        record = self._replies.pop(self.sender(), None)
+
+        if record is not None:
+            record[0].active_replies -= 1
+
+    # -------------------------------------------------------------------------
+
+    def _slot_accountReplyMetaDataChanged(self):
+        """
+        Save the cookies a reply sets to its account's jar.
+        """
+
+        reply = self.sender()
+        record = self._replies.get(reply)
+
+        if record is None:
+            return
+
+        # one line per cookie
+        header = reply.rawHeader("Set-Cookie")
+
+        if not header.isEmpty():
+            record[0].cookie_jar.setCookiesFromUrl(
+                    QNetworkCookie.parseCookies(header), reply.url())
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def add_page(self, page, account):
+        """
+        Route the requests of a page through an account's cookie jar.
+
+        @param page    (QWebPage)
+        @param account (FBAccount)
+        """
+
+        self._accounts[page] = account
+
+    # -------------------------------------------------------------------------
+
+    def remove_page(self, page):
+        self._accounts.pop(page, None)
+
+
+# -----------------------------------------------------------------------------
+
+class FBAccount(object):
+
+    """
+    An account of a FBAccountManager: its dialog, cookie jar, token and the
+    accounting of its requests.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, name, dialog, cookie_jar, token_store=None):
+        """
+        Instantiate FBAccount object.
+
+        @param name          (str)
+        @param dialog        (FBAuthDialog)
+        @param cookie_jar    (QNetworkCookieJar)
+        @param [token_store] (FBTokenStore)
+        """
+
+        self.name = name
+        self.dialog = dialog
+        self.cookie_jar = cookie_jar
+        self.token_store = token_store
+
+        # token the account was last authorized with
+        self.access_token = None
+        self.expires_in = 0
+
+        self.requests = 0
+        self.active_replies = 0
+        self.peak_replies = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+    # -------------------------------------------------------------------------
+
+    def __repr__(self):
+        return "<FBAccount name=%r>" % self.name
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def stats(self):
+        """
+        Return the account's `requests`, `active_replies`, `peak_replies`,
+        `bytes_received` and `bytes_sent`, the number of `cookies` and their
+        `cookie_bytes`, and the `page_bytes` of the page loaded.
+
+        `memory` adds up cookie and page bytes. WebKit shares its caches
+        between pages, so what's left can't be told apart by account.
+
+        @return (dict)
+        """
+
+        cookies = self.cookie_jar.allCookies()
+        cookie_bytes = sum(cookie.toRawForm(QNetworkCookie.Full).size()
+                for cookie in cookies)
+        page_bytes = self.dialog.page().totalBytes()
+
+        return {
+            "requests": self.requests,
+            "active_replies": self.active_replies,
+            "peak_replies": self.peak_replies,
+            "bytes_received": self.bytes_received,
+            "bytes_sent": self.bytes_sent,
+            "cookies": len(cookies),
+            "cookie_bytes": cookie_bytes,
+            "page_bytes": page_bytes,
+            "memory": cookie_bytes + page_bytes,
+        }
+
+
+# -----------------------------------------------------------------------------
+
+class FBAccountManager(QObject):
+
+    """
+    Keeps several Facebook accounts logged in at once.
+
+    Each account gets a FBAuthDialog of its own, but all dialogs share one
+    FBAccountNetworkAccessManager, and with it one connection pool and the
+    shared FBStaticCache, which only keeps static assets. Cookies and tokens
+    stay per account: each account has its own cookie jar and, when a
+    directory is given, its own cookie file and token store.
+    """
+
+    # account names, which name files, can't hold path separators or start
+    # with a dot
+    NAME_PATTERN = re.compile(r"^[\w@+-][\w.@+-]*\Z")
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when an account's dialog was authorized with a token.
+
+    @param name         (str)
+    @param access_token (str)
+    @param expires_in   (int)
+    """
+
+    signal_accountAuthorized = Signal(str, str, int)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, app_id=None, rules=None,
+            use_shared_cache=True, directory=None):
+        """
+        Instantiate FBAccountManager object.
+
+        @param [parent]           (QObject)
+        @param [app_id]           (str)     App ID of the accounts' dialogs.
+        @param [rules]            (list)    See FBNetworkAccessManager.
+        @param [use_shared_cache] (bool)    Cache static assets in the
+                                            process-wide FBStaticCache.
+        @param [directory]        (str)     Directory each account's
+                                            cookies and tokens are kept in,
+                                            None to keep them in memory.
+        """
+
+        super(FBAccountManager, self).__init__(parent)
+
+        self.app_id = app_id
+        self.directory = directory
+
+        self._nam = FBAccountNetworkAccessManager(self, rules)
+
+        if use_shared_cache:
+            FBStaticCache.shared().install(self._nam)
+
+        # name => FBAccount, in the order accounts were added
+        self._accounts = OrderedDict()
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _slot_permsAuthorizedAccessToken(self, access_token, expires_in,
+            state):
+        """
+        Slot for the signal_permsAuthorizedAccessToken signal of the
+        accounts' dialogs.
+        """
+
+        dialog = self.sender()
+
+        for account in self._accounts.itervalues():
+            if account.dialog is dialog:
+                break
+        else:
+            return
+
+        account.access_token = access_token
+        account.expires_in = expires_in
+
+        self.signal_accountAuthorized.emit(account.name, access_token,
+                expires_in)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def account(self, name):
+        """
+        @return (FBAccount/None)
+        """
+
+        return self._accounts.get(name)
+
+    # -------------------------------------------------------------------------
+
+    def accounts(self):
+        """
+        @return (list) FBAccount objects in the order they were added.
+        """
+
+        return self._accounts.values()
+
+    # -------------------------------------------------------------------------
+
+    def add_account(self, name, parent=None):
+        """
+        Add an account and create its dialog.
+
+        @param name     (str)     Unique name of the account, also used to
+                                  name its cookie and token files. Letters,
+                                  digits and `_.@+-`, not starting with a
+                                  dot.
+        @param [parent] (QWidget) Parent of the account's dialog.
+
+        @raise FBAuthDialogInvalidParamException If the name is invalid or
+                                                 taken.
+
+        @return (FBAccount)
+        """
+
+        if not isinstance(name, basestring) or not self.NAME_PATTERN.match(
+                name):
+            raise FBAuthDialogInvalidParamException(
+                    "invalid account name: %r" % (name,))
+
+        if name in self._accounts:
+            raise FBAuthDialogInvalidParamException(
+                    "account already exists: %s" % name)
+
+        token_store = None
+
+        if self.directory is None:
+            cookie_jar = QNetworkCookieJar(self)
+        else:
+            cookie_jar = FBCookieJar(self, name, self.directory)
+            token_store = FBTokenStore(os.path.join(self.directory,
+                    ACCOUNT_TOKEN_STORE_FILE_NAME % name))
+
+        dialog = FBAuthDialog(parent, self.app_id,
+                network_access_manager=self._nam, use_shared_cache=False,
+                token_store=token_store)
+
+        account = FBAccount(name, dialog, cookie_jar, token_store)
+
+        self._nam.add_page(dialog.page(), account)
+        self._accounts[name] = account
+
+        dialog.signal_permsAuthorizedAccessToken.connect(
+                self._slot_permsAuthorizedAccessToken)
+
+        return account
+
+    # -------------------------------------------------------------------------
+
+    def network_access_manager(self):
+        return self._nam
+
+    # -------------------------------------------------------------------------
+
+    def remove_account(self, name):
+        """
+        Remove an account, deleting its dialog. Its cookie and token files
+        are kept.
+
+        @param name (str)
+        """
+
+        account = self._accounts.pop(name, None)
+
+        if account is None:
+            return
+
+        self._nam.remove_page(account.dialog.page())
+
+        account.dialog.stop()
+        account.dialog.deleteLater()
+        account.cookie_jar.deleteLater()
+
+    # -------------------------------------------------------------------------
+
+    def stats(self):
+        """
+        Return the number of `accounts`, the `active_replies` of all
+        accounts, and the stats of each account by name (`per_account`, see
+        `FBAccount.stats`).
+
+        @return (dict)
+        """
+
+        per_account = dict((name, account.stats())
+                for name, account in self._accounts.iteritems())
+
+        return {
+            "accounts": len(per_account),
+            "active_replies": sum(stats["active_replies"]
+                    for stats in per_account.itervalues()),
+            "per_account": per_account,
+        }
@@ -0,0 +1,176 @@
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+
+"""
+Constants shared by the modules of the package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS
+# -----------------------------------------------------------------------------
+
+REDIRECT_URI = "http://www.facebook.com/connect/login_success.html"
+OAUTH_URL = "https://graph.facebook.com/oauth/authorize"
+
+# seconds a state issued by FBStateRegistry stays valid, the number of states
+# it holds at most, and the number of FBOAuthURLBuilder objects
+# `build_oauth_url` keeps
+OAUTH_STATE_TTL = 10 * 60
+OAUTH_STATE_MAX_SIZE = 100000
+OAUTH_URL_BUILDER_CACHE_SIZE = 64
+
+CACHE_DIR_NAME = "pyside-facebook"
+CACHE_MAX_SIZE = 50 * 1024 * 1024
+
+# folder, hosts and MIME types of the static assets FBStaticCache keeps, the
+# cache shared by the pages of all accounts of a FBAccountManager
+STATIC_CACHE_DIR_NAME = "pyside-facebook-static"
+STATIC_CACHE_HOSTS = ("*.fbcdn.net", "*.facebook.net", "*.akamaihd.net")
+STATIC_CACHE_MIME_TYPES = ("image/*", "text/css", "text/javascript",
+    "application/javascript", "application/x-javascript", "font/*",
+    "application/font-woff", "application/x-font-woff")
+
+COOKIE_JAR_FILE_NAME = "cookies-%s.txt"
+
+# cookie jar files are compacted once they hold more than this many lines and
+# twice as many lines as there are cookies in the jar
+COOKIE_JAR_COMPACT_LINES = 64
+
+TOKEN_STORE_FILE_NAME = "tokens.json"
+ACCOUNT_TOKEN_STORE_FILE_NAME = "tokens-%s.json"
+
+# seconds FBAuthWatchdog allows each phase of the OAuth Dialog to take, None
+# for no limit
+AUTH_FORM_LOAD_TIMEOUT = 30
+AUTH_USER_TIMEOUT = None
+AUTH_REDIRECT_TIMEOUT = 30
+
+# seconds without network progress before FBAuthWatchdog treats a load as
+# stalled, and seconds before the first retry (doubled for each retry after)
+AUTH_STALL_TIMEOUT = 10
+AUTH_RETRY_DELAY = 1
+AUTH_MAX_RETRIES = 3
+
+# OAuth Dialogs FBHeadlessAuthBatch runs at once, and seconds each may take
+AUTH_HEADLESS_MAX_CONCURRENT = 4
+AUTH_HEADLESS_TIMEOUT = 60
+
+# hosts the OAuth Dialog connects to, looked up ahead of time by
+# FBAuthDialogPool
+PRECONNECT_HOSTS = ("graph.facebook.com", "www.facebook.com")
+
+# seconds FBAuthDialogPool waits before loading a dialog again after one
+# failed to load (doubled for each failure in a row), and at most
+AUTH_POOL_RETRY_DELAY = 1
+AUTH_POOL_MAX_RETRY_DELAY = 300
+
+# cached tokens closer than this many seconds to expiring are not handed out
+TOKEN_MIN_TTL = 60
+
+# FBTokenManager refreshes tokens this many seconds before they expire, and
+# upgrades tokens that expire sooner than TOKEN_SHORT_LIVED_MAX right away.
+# A failed refresh is retried after TOKEN_REFRESH_RETRY_DELAY seconds,
+# doubled after every failure, until the token expires.
+# Its timer re-arms at most every TOKEN_REFRESH_MAX_DELAY seconds, as
+# QTimer intervals can't cover the 60 days long-lived tokens last.
+TOKEN_REFRESH_MARGIN = 10 * 60
+TOKEN_REFRESH_RETRY_DELAY = 30
+TOKEN_SHORT_LIVED_MAX = 24 * 60 * 60
+TOKEN_REFRESH_MAX_DELAY = 24 * 60 * 60
+
+GRAPH_URL = "https://graph.facebook.com"
+
+# requests FBGraphScheduler keeps in flight per host, the rest wait in a
+# queue
+GRAPH_MAX_REQUESTS_PER_HOST = 6
+
+# percent of its rate limits (as reported by the X-App-Usage and
+# X-Page-Usage headers) at which an app is slowed down, and at which it stops
+# sending requests until the limit resets
+GRAPH_USAGE_THROTTLE = 75
+GRAPH_USAGE_MAX = 95
+
+# seconds between request starts once usage reaches GRAPH_USAGE_MAX, and
+# seconds to pause when facebook doesn't say how long the limit lasts
+GRAPH_PACING_INTERVAL = 1
+GRAPH_THROTTLE_PAUSE = 60
+
+# attempts made at calls failing with a rate limit error, and seconds before
+# the first retry (doubled for each retry after, with random jitter)
+GRAPH_MAX_RETRIES = 3
+GRAPH_RETRY_DELAY = 2
+
+# host videos are uploaded to, files FBGraphUploader uploads at once, and
+# size from which videos are uploaded in chunks with the resumable protocol
+GRAPH_VIDEO_URL = "https://graph-video.facebook.com"
+GRAPH_MAX_UPLOADS = 2
+GRAPH_UPLOAD_CHUNKED_SIZE = 10 * 1024 * 1024
+
+# images FBMediaFetcher downloads at once, bytes of decoded images it keeps
+# in memory, bytes of downloaded files it keeps on disk, seconds before those
+# files are downloaded again, and redirects it follows (picture URLs
+# redirect to a CDN)
+MEDIA_MAX_DOWNLOADS = 6
+MEDIA_CACHE_MAX_SIZE = 32 * 1024 * 1024
+MEDIA_CACHE_MAX_DISK_SIZE = 128 * 1024 * 1024
+MEDIA_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+MEDIA_MAX_REDIRECTS = 5
+
+# Graph API error codes meaning the app, user or page is being throttled
+GRAPH_RATE_LIMIT_CODES = (4, 17, 32, 613)
+
+# operations the Graph API accepts in one batch request, and milliseconds
+# FBGraphAPI collects calls for when batching automatically
+GRAPH_BATCH_MAX_SIZE = 50
+GRAPH_BATCH_WINDOW = 10
+
+# bytes FBJSONStreamDecoder buffers while waiting for an item to complete
+GRAPH_STREAM_MAX_BUFFER = 1024 * 1024
+
+# bytes of response bodies FBGraphCache keeps in memory, bytes of response
+# files it keeps on disk, and seconds responses are fresh for unless a TTL is
+# set for their path
+GRAPH_CACHE_MAX_SIZE = 5 * 1024 * 1024
+GRAPH_CACHE_MAX_DISK_SIZE = 50 * 1024 * 1024
+GRAPH_CACHE_TTL = 60
+
+# resource rules that strip everything the OAuth Dialog doesn't need to log a
+# user in and redirect (see FBResourceRule for the meaning of each key)
+RESOURCE_RULES_LEAN = (
+    {
+        "name": "images",
+        "action": "stub",
+        "paths": ["*.png", "*.gif", "*.jpg", "*.jpeg", "*.ico"],
+    },
+    {
+        "name": "fonts",
+        "action": "block",
+        "paths": ["*.woff", "*.ttf", "*.eot", "*.otf"],
+    },
+    {
+        "name": "tracking",
+        "action": "stub",
+        "hosts": ["pixel.facebook.com", "*.google-analytics.com",
+                  "*.doubleclick.net"],
+    },
+    {
+        "name": "logging",
+        "action": "stub",
+        "hosts": ["*.facebook.com"],
+        "paths": ["/ajax/bz*", "/ajax/bnzai*", "/common/scribe_endpoint.php"],
+    },
+    {
+        # images and fonts served from paths without a file extension
+        "name": "media",
+        "action": "block",
+        "mime_types": ["image/*", "font/*", "application/font-*",
+                       "application/x-font-*"],
+    },
+)
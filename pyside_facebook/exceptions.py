@@ -0,0 +1,117 @@
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+
+"""
+Exceptions raised by the package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# EXCEPTIONS
+# -----------------------------------------------------------------------------
+
+class PySideFacebookException(Exception):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthDialogException(PySideFacebookException):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthDialogInvalidParamException(FBAuthDialogException):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthCancelledException(FBAuthDialogException):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthTimeoutException(FBAuthCancelledException):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBAuthLoginFailedException(FBAuthDialogException):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphAPIException(PySideFacebookException):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphAPICancelledException(FBGraphAPIException):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphAPINetworkException(FBGraphAPIException):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphAPIDecodeException(FBGraphAPIException):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphAPIErrorException(FBGraphAPIException):
+
+    """
+    An error object returned by the Graph API.
+    """
+
+    def __init__(self, message, code=None, type=None, subcode=None,
+            status=None):
+        super(FBGraphAPIErrorException, self).__init__(message)
+
+        self.message = message
+        self.code = code
+        self.type = type
+        self.subcode = subcode
+        self.status = status
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphAPIOAuthException(FBGraphAPIErrorException):
+
+    pass
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphAPIRateLimitException(FBGraphAPIErrorException):
+
+    pass
@@ -0,0 +1,439 @@
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+
+"""
+Futures resolved from the Qt event loop, and the asyncio bridge.
+"""
+
+import math
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+from PySide.QtCore import QAbstractEventDispatcher
+from PySide.QtCore import QEventLoop
+from PySide.QtCore import QObject
+from PySide.QtCore import QSocketNotifier
+from PySide.QtCore import QTimer
+from PySide.QtCore import Signal
+
+from pyside_facebook.exceptions import PySideFacebookException
+
+
+# -----------------------------------------------------------------------------
+# CLASSES
+# -----------------------------------------------------------------------------
+
+class FBFuture(QObject):
+
+    """
+    The pending result of an asynchronous operation, resolved from the Qt
+    event loop.
+
+    Mirrors the `concurrent.futures.Future` interface. `result` spins a local
+    Qt event loop until the future is done instead of blocking it, and
+    `to_asyncio` links the future to an asyncio (or trollius) future that can
+    be awaited in coroutines.
+    """
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when the future is done, failed or cancelled.
+
+    @param future (FBFuture)
+    """
+
+    signal_done = Signal(object)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None):
+        """
+        Instantiate FBFuture object.
+
+        @param [parent] (QObject) Parent object that this object belongs to.
+        """
+
+        super(FBFuture, self).__init__(parent)
+
+        self._done = False
+        self._cancelled = False
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _abort(self):
+        """
+        Stop the operation the future is waiting on. Called by `cancel`.
+        """
+
+        pass
+
+    # -------------------------------------------------------------------------
+
+    def _cancelled_exception(self):
+        """
+        Return the exception a cancelled future fails with.
+
+        @return (PySideFacebookException)
+        """
+
+        return PySideFacebookException("cancelled")
+
+    # -------------------------------------------------------------------------
+
+    def _finish(self, result=None, exception=None):
+        """
+        Resolve the future and run its callbacks.
+
+        @return (bool) False if the future was already done.
+        """
+
+        if self._done:
+            return False
+
+        self._done = True
+        self._result = result
+        self._exception = exception
+
+        callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            callback(self)
+
+        self.signal_done.emit(self)
+
+        return True
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def add_done_callback(self, callback):
+        """
+        Call `callback` with the future once it's done. Called right away if
+        the future is already done.
+
+        @param callback (callable)
+        """
+
+        if self._done:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    # -------------------------------------------------------------------------
+
+    def cancel(self):
+        """
+        Stop the operation and cancel the future.
+
+        @return (bool) False if the future was already done.
+        """
+
+        if self._done:
+            return False
+
+        self._abort()
+        self._cancelled = True
+
+        self._finish(exception=self._cancelled_exception())
+
+        return True
+
+    # -------------------------------------------------------------------------
+
+    def cancelled(self):
+        return self._cancelled
+
+    # -------------------------------------------------------------------------
+
+    def done(self):
+        return self._done
+
+    # -------------------------------------------------------------------------
+
+    def exception(self):
+        """
+        Return the exception the future failed with, waiting for it to be
+        done first.
+
+        @return (Exception/None)
+        """
+
+        self.wait()
+
+        return self._exception
+
+    # -------------------------------------------------------------------------
+
+    def result(self):
+        """
+        Return the result, waiting for the future to be done first.
+
+        @raise (Exception) The exception the future failed with.
+
+        @return (object)
+        """
+
+        self.wait()
+
+        if self._exception is not None:
+            raise self._exception
+
+        return self._result
+
+    # -------------------------------------------------------------------------
+
+    def to_asyncio(self, loop=None):
+        """
+        Return an asyncio future resolved along with this future. Cancelling
+        the asyncio future cancels this one.
+
+        NOTE: Qt's event loop must be running for the asyncio future to be
+              resolved. See FBAsyncioBridge for running both loops at once.
+
+        @param [loop] (asyncio.AbstractEventLoop) Defaults to the current
+                                                  event loop.
+
+        @return (asyncio.Future)
+        """
+
+        if asyncio is None:
+            raise PySideFacebookException(
+                "to_asyncio requires the asyncio or trollius module")
+
+        if loop is None:
+            loop = asyncio.get_event_loop()
+
+        future = asyncio.Future(loop=loop)
+
+        def copy_state(qt_future):
+            if future.done():
+                return
+
+            if qt_future.cancelled():
+                future.cancel()
+            elif qt_future._exception is not None:
+                future.set_exception(qt_future._exception)
+            else:
+                future.set_result(qt_future._result)
+
+        def cancel_qt_future(future):
+            if future.cancelled():
+                self.cancel()
+
+        future.add_done_callback(cancel_qt_future)
+        self.add_done_callback(copy_state)
+
+        return future
+
+    # -------------------------------------------------------------------------
+
+    def wait(self):
+        """
+        Spin a local Qt event loop until the future is done.
+        """
+
+        if self._done:
+            return
+
+        loop = QEventLoop()
+        self.signal_done.connect(loop.quit)
+
+        loop.exec_()
+
+
+# -----------------------------------------------------------------------------
+
+class FBAsyncioBridge(QObject):
+
+    """
+    Runs an asyncio (or trollius) event loop from inside the running Qt event
+    loop, so coroutines awaiting `FBAuthFuture.to_asyncio` futures make
+    progress while Qt dispatches the dialog's signals.
+
+    The asyncio loop is only run when it has something to do: a
+    QSocketNotifier watches each file descriptor registered with its
+    selector (including the self-pipe `call_soon_threadsafe` writes to), and
+    a single-shot QTimer is armed for its ready callbacks or next scheduled
+    one each time Qt is about to wait for events. An idle bridge doesn't wake
+    the process.
+
+    The trade-off is that this reads the loop's selector and callback queues,
+    which aren't part of the asyncio API, and that callbacks made ready by Qt
+    slots wait until Qt has no other events pending. Loops without a
+    selector (such as the proactor loop on Windows) are polled every
+    `interval` milliseconds instead.
+    """
+
+    # event masks of the selectors module
+    EVENT_READ = 1 << 0
+    EVENT_WRITE = 1 << 1
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, loop=None, interval=10):
+        """
+        Instantiate FBAsyncioBridge object.
+
+        @param [parent]   (QObject) Parent object that this object belongs to.
+        @param [loop]     (asyncio.AbstractEventLoop) Defaults to the current
+                                                      event loop.
+        @param [interval] (int)     Milliseconds between runs of loops that
+                                    have to be polled.
+        """
+
+        super(FBAsyncioBridge, self).__init__(parent)
+
+        if asyncio is None:
+            raise PySideFacebookException(
+                "FBAsyncioBridge requires the asyncio or trollius module")
+
+        self.loop = loop or asyncio.get_event_loop()
+        self.interval = interval
+
+        self._polled = not all(hasattr(self.loop, name)
+                for name in ("_selector", "_ready", "_scheduled"))
+
+        self._running = False
+
+        # (fd, QSocketNotifier type) => QSocketNotifier
+        self._notifiers = {}
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(not self._polled)
+        self._timer.timeout.connect(self._slot_tick)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _remove_notifier(self, notifier_key):
+        notifier = self._notifiers.pop(notifier_key)
+
+        notifier.setEnabled(False)
+        notifier.deleteLater()
+
+    # -------------------------------------------------------------------------
+
+    def _slot_arm(self):
+        """
+        Watch the loop's file descriptors and arm the timer for its next
+        callback. Also connected to the dispatcher's aboutToBlock signal.
+        """
+
+        if not self._running or self._polled:
+            return
+
+        self._sync_notifiers()
+
+        loop = self.loop
+
+        if loop._ready:
+            self._timer.start(0)
+        elif loop._scheduled:
+            delay = loop._scheduled[0]._when - loop.time()
+
+            # rounded up, a timer firing early would find nothing to run
+            self._timer.start(max(int(math.ceil(delay * 1000)), 0))
+        else:
+            self._timer.stop()
+
+    # -------------------------------------------------------------------------
+
+    def _slot_tick(self):
+        """
+        Run the callbacks the asyncio loop has ready and return.
+        """
+
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+
+        self._slot_arm()
+
+    # -------------------------------------------------------------------------
+
+    def _sync_notifiers(self):
+        """
+        Create and delete socket notifiers to match the file descriptors
+        registered with the loop's selector.
+        """
+
+        wanted = set()
+
+        for key in self.loop._selector.get_map().values():
+            if key.events & self.EVENT_READ:
+                wanted.add((key.fd, QSocketNotifier.Read))
+            if key.events & self.EVENT_WRITE:
+                wanted.add((key.fd, QSocketNotifier.Write))
+
+        for notifier_key in set(self._notifiers) - wanted:
+            self._remove_notifier(notifier_key)
+
+        for notifier_key in wanted - set(self._notifiers):
+            notifier = QSocketNotifier(notifier_key[0], notifier_key[1], self)
+            notifier.activated.connect(self._slot_tick)
+
+            self._notifiers[notifier_key] = notifier
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        if self._running:
+            return
+
+        self._running = True
+
+        if self._polled:
+            self._timer.start(self.interval)
+
+            return
+
+        QAbstractEventDispatcher.instance().aboutToBlock.connect(
+                self._slot_arm)
+
+        self._slot_arm()
+
+    # -------------------------------------------------------------------------
+
+    def stop(self):
+        if not self._running:
+            return
+
+        self._running = False
+
+        self._timer.stop()
+
+        if self._polled:
+            return
+
+        QAbstractEventDispatcher.instance().aboutToBlock.disconnect(
+                self._slot_arm)
+
+        for notifier_key in list(self._notifiers):
+            self._remove_notifier(notifier_key)
@@ -0,0 +1,3160 @@
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+
+"""
+The Graph API client: requests, batching, caching, paging, scheduling,
+uploads and token refresh.
+"""
+
+import errno
+import fnmatch
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import mimetypes
+import mmap
+import os
+import random
+import re
+import tempfile
+import time
+import urllib
+import urlparse
+
+from collections import OrderedDict
+from collections import deque
+from contextlib  import contextmanager
+from functools   import partial
+
+from PySide.QtCore    import QBuffer
+from PySide.QtCore    import QFile
+from PySide.QtCore    import QIODevice
+from PySide.QtCore    import QObject
+from PySide.QtCore    import QTimer
+from PySide.QtCore    import QUrl
+from PySide.QtCore    import Signal
+from PySide.QtNetwork import QHttpMultiPart
+from PySide.QtNetwork import QHttpPart
+from PySide.QtNetwork import QNetworkReply
+from PySide.QtNetwork import QNetworkRequest
+
+from pyside_facebook.constants  import GRAPH_BATCH_MAX_SIZE
+from pyside_facebook.constants  import GRAPH_CACHE_MAX_DISK_SIZE
+from pyside_facebook.constants  import GRAPH_CACHE_MAX_SIZE
+from pyside_facebook.constants  import GRAPH_CACHE_TTL
+from pyside_facebook.constants  import GRAPH_MAX_REQUESTS_PER_HOST
+from pyside_facebook.constants  import GRAPH_MAX_RETRIES
+from pyside_facebook.constants  import GRAPH_MAX_UPLOADS
+from pyside_facebook.constants  import GRAPH_PACING_INTERVAL
+from pyside_facebook.constants  import GRAPH_RATE_LIMIT_CODES
+from pyside_facebook.constants  import GRAPH_RETRY_DELAY
+from pyside_facebook.constants  import GRAPH_STREAM_MAX_BUFFER
+from pyside_facebook.constants  import GRAPH_THROTTLE_PAUSE
+from pyside_facebook.constants  import GRAPH_UPLOAD_CHUNKED_SIZE
+from pyside_facebook.constants  import GRAPH_URL
+from pyside_facebook.constants  import GRAPH_USAGE_MAX
+from pyside_facebook.constants  import GRAPH_USAGE_THROTTLE
+from pyside_facebook.constants  import GRAPH_VIDEO_URL
+from pyside_facebook.constants  import REDIRECT_URI
+from pyside_facebook.constants  import TOKEN_REFRESH_MARGIN
+from pyside_facebook.constants  import TOKEN_REFRESH_MAX_DELAY
+from pyside_facebook.constants  import TOKEN_REFRESH_RETRY_DELAY
+from pyside_facebook.constants  import TOKEN_SHORT_LIVED_MAX
+from pyside_facebook.exceptions import FBGraphAPICancelledException
+from pyside_facebook.exceptions import FBGraphAPIDecodeException
+from pyside_facebook.exceptions import FBGraphAPIErrorException
+from pyside_facebook.exceptions import FBGraphAPIException
+from pyside_facebook.exceptions import FBGraphAPINetworkException
+from pyside_facebook.exceptions import FBGraphAPIOAuthException
+from pyside_facebook.exceptions import FBGraphAPIRateLimitException
+from pyside_facebook.futures    import FBFuture
+from pyside_facebook.network    import FBNetworkAccessManager
+
+
+# -----------------------------------------------------------------------------
+# CLASSES
+# -----------------------------------------------------------------------------
+
+class FBJSONStreamDecoder(object):
+
+    """
+    Incremental decoder of Graph API responses, decoding the items of the
+    top level `data` array as soon as their bytes have arrived instead of
+    waiting for the whole response.
+
+    Only the item being received is buffered. Everything outside of the
+    `data` array (the envelope, such as `paging` or an `error` object) is
+    kept and returned by `close` as JSON text with an empty `data` array.
+    Items are expected to be objects or arrays, as they are in Graph API
+    edges.
+    """
+
+    # bytes that change the state of the scan outside of and inside strings
+    _RE_TOKEN = re.compile(r'["{}\[\]]')
+    _RE_STRING_TOKEN = re.compile(r'["\\]')
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, max_buffer=GRAPH_STREAM_MAX_BUFFER):
+        """
+        Instantiate FBJSONStreamDecoder object.
+
+        @param [max_buffer] (int) Bytes buffered before decoding fails with a
+                                  FBGraphAPIDecodeException, None for no
+                                  limit.
+        """
+
+        self.max_buffer = max_buffer
+
+        # bytes received but not decoded or dropped yet, and the position
+        # scanning continues from
+        self._buffer = ""
+        self._pos = 0
+
+        # envelope bytes up to and including the data array's "["
+        self._envelope = ""
+
+        self._depth = 0
+        self._in_string = False
+
+        # start of the last string opened, and the last string closed at the
+        # top level (the key of the value that follows it)
+        self._string_start = None
+        self._key = None
+
+        # states of the data array
+        self._in_data = False
+        self._data_done = False
+
+        self._item_start = None
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def close(self):
+        """
+        Finish decoding.
+
+        @raise FBGraphAPIDecodeException If the response ended early.
+
+        @return (str) The envelope as JSON text.
+        """
+
+        if self._depth or self._in_string:
+            raise FBGraphAPIDecodeException("truncated JSON response")
+
+        return self._envelope + self._buffer
+
+    # -------------------------------------------------------------------------
+
+    def feed(self, data):
+        """
+        Decode the next chunk of the response.
+
+        @param data (str)
+
+        @raise FBGraphAPIDecodeException If the response is not valid JSON or
+                                         an item outgrows `max_buffer`.
+
+        @return (list) Items completed by the chunk.
+        """
+
+        items = []
+
+        buf = self._buffer + data
+        pos = self._pos
+
+        while True:
+            if self._in_string:
+                match = self._RE_STRING_TOKEN.search(buf, pos)
+
+                if match is None:
+                    pos = len(buf)
+                    break
+
+                if match.group() == "\\":
+                    if match.end() == len(buf):
+                        # the escaped byte hasn't arrived yet
+                        pos = match.start()
+                        break
+
+                    pos = match.end() + 1
+                    continue
+
+                pos = match.end()
+
+                self._in_string = False
+
+                if self._depth == 1:
+                    self._key = buf[self._string_start:pos]
+
+                continue
+
+            match = self._RE_TOKEN.search(buf, pos)
+
+            if match is None:
+                pos = len(buf)
+                break
+
+            token = match.group()
+            start, pos = match.span()
+
+            if token == '"':
+                self._in_string = True
+                self._string_start = start
+
+            elif token in "{[":
+                self._depth += 1
+
+                if self._in_data:
+                    if self._depth == 3:
+                        self._item_start = start
+
+                elif (self._depth == 2 and token == "[" and
+                        self._key == '"data"' and not self._data_done):
+                    self._in_data = True
+
+                    self._envelope = buf[:pos]
+
+                    buf = buf[pos:]
+                    pos = 0
+
+            else:
+                self._depth -= 1
+
+                if self._depth < 0:
+                    raise FBGraphAPIDecodeException(
+                            "unbalanced JSON response")
+
+                if not self._in_data:
+                    continue
+
+                if self._depth == 2 and self._item_start is not None:
+                    try:
+                        items.append(json.loads(buf[self._item_start:pos]))
+                    except ValueError as e:
+                        raise FBGraphAPIDecodeException(
+                                "invalid JSON item: %s" % e)
+
+                    self._item_start = None
+
+                    buf = buf[pos:]
+                    pos = 0
+
+                elif self._depth == 1:
+                    # end of the data array, what's left is envelope
+                    self._in_data = False
+                    self._data_done = True
+
+                    buf = buf[start:]
+                    pos -= start
+
+        # between items only separators are left to drop
+        if self._in_data and self._item_start is None:
+            buf = buf[pos:]
+            pos = 0
+
+        self._buffer = buf
+        self._pos = pos
+
+        if self.max_buffer is not None and len(buf) > self.max_buffer:
+            raise FBGraphAPIDecodeException(
+                    "more than %d bytes buffered" % self.max_buffer)
+
+        return items
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphCache(object):
+
+    """
+    Cache of Graph API GET responses, keyed by the access token they were
+    made with, their path and their params (including the fields selected).
+
+    Responses are kept in a size-bounded LRU in memory and, when a directory
+    is given, in one file per response on disk, which outlives the process.
+    Files are bounded by size as well, the least recently written or read
+    being removed first.
+    Fresh responses are served without a request. Stale responses carrying an
+    ETag are revalidated with an If-None-Match request, answered with a 304
+    and no body when they haven't changed.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, max_size=GRAPH_CACHE_MAX_SIZE, directory=None,
+            default_ttl=GRAPH_CACHE_TTL, ttls=None,
+            max_disk_size=GRAPH_CACHE_MAX_DISK_SIZE):
+        """
+        Instantiate FBGraphCache object.
+
+        @param [max_size]      (int)  Bytes of response bodies kept in
+                                      memory.
+        @param [directory]     (str)  Folder responses are also cached in,
+                                      None to only cache in memory.
+        @param [default_ttl]   (int)  Seconds responses are fresh for.
+        @param [ttls]          (dict) Path wildcard => seconds responses of
+                                      matching paths are fresh for, the
+                                      longest matching wildcard winning
+                                      (example: {"me": 300,
+                                      "*/picture": 3600}).
+        @param [max_disk_size] (int)  Bytes of response files kept in the
+                                      directory.
+        """
+
+        self.max_size = max_size
+        self.max_disk_size = max_disk_size
+        self.directory = directory
+        self.default_ttl = default_ttl
+
+        # (wildcard, regex, ttl), longest wildcards first
+        self._ttls = sorted(((pattern, re.compile(fnmatch.translate(pattern)),
+                ttl) for pattern, ttl in (ttls or {}).iteritems()),
+                key=lambda t: -len(t[0]))
+
+        # key => (body, etag, expires_at) in least to most recently used
+        # order
+        self._entries = OrderedDict()
+        self._size = 0
+
+        # file path => size of the files in the directory in least to most
+        # recently used order, loaded from disk when first needed
+        self._disk = None
+        self._disk_size = 0
+
+        self.reset_stats()
+
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _evict(self):
+        """
+        Remove least recently used entries from memory until they fit within
+        the maximum size.
+        """
+
+        while self._size > self.max_size and self._entries:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted[0])
+
+    # -------------------------------------------------------------------------
+
+    def _evict_disk(self):
+        """
+        Remove least recently used files until they fit within the maximum
+        disk size.
+        """
+
+        while self._disk_size > self.max_disk_size and self._disk:
+            path, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+
+            try:
+                os.remove(path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+
+    # -------------------------------------------------------------------------
+
+    def _file_path(self, key):
+        return os.path.join(self.directory,
+                hashlib.sha1(key).hexdigest() + ".json")
+
+    # -------------------------------------------------------------------------
+
+    def _load_disk(self):
+        """
+        Build the index of the files already in the directory, ordered by the
+        time each was last written or read.
+        """
+
+        entries = []
+
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, path, stat.st_size))
+
+        entries.sort()
+
+        self._disk = OrderedDict((path, size) for _, path, size in entries)
+        self._disk_size = sum(self._disk.itervalues())
+
+    # -------------------------------------------------------------------------
+
+    def _touch_disk(self, path):
+        """
+        Mark a file as the most recently used and evict files if needed.
+
+        @param path (str)
+        """
+
+        if self._disk is None:
+            self._load_disk()
+
+        # keep the order across runs
+        os.utime(path, None)
+
+        size = os.path.getsize(path)
+
+        self._disk_size -= self._disk.pop(path, 0)
+        self._disk[path] = size
+        self._disk_size += size
+
+        self._evict_disk()
+
+    # -------------------------------------------------------------------------
+
+    def _get(self, key):
+        """
+        Return an entry from memory, or from disk when it isn't in memory.
+
+        @return (tuple/None) (body, etag, expires_at)
+        """
+
+        entry = self._entries.pop(key, None)
+
+        if entry is None and self.directory is not None:
+            path = self._file_path(key)
+
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+
+                if data["key"] == key:
+                    entry = (data["body"].encode("utf-8"), data["etag"],
+                            data["expires_at"])
+            except IOError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+            except (ValueError, KeyError):
+                # corrupt file, drop it
+                os.remove(path)
+
+                if self._disk is not None:
+                    self._disk_size -= self._disk.pop(path, 0)
+
+            if entry is not None:
+                self._touch_disk(path)
+
+                self._size += len(entry[0])
+
+        if entry is not None:
+            self._entries[key] = entry
+
+            # an entry read from disk may push others out of memory
+            self._evict()
+
+        return entry
+
+    # -------------------------------------------------------------------------
+
+    def _set(self, key, body, etag, expires_at):
+        """
+        Store an entry in memory and on disk.
+        """
+
+        old = self._entries.pop(key, None)
+
+        if old is not None:
+            self._size -= len(old[0])
+
+        self._entries[key] = (body, etag, expires_at)
+        self._size += len(body)
+
+        self._evict()
+
+        if self.directory is None:
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"key": key, "body": body.decode("utf-8"),
+                        "etag": etag, "expires_at": expires_at}, f)
+
+            path = self._file_path(key)
+
+            # rename can't replace an existing file on windows
+            if os.name == "nt" and os.path.exists(path):
+                os.remove(path)
+
+            os.rename(tmp_path, path)
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+            raise
+
+        self._touch_disk(path)
+
+    # -------------------------------------------------------------------------
+
+    def _ttl(self, path):
+        for pattern, regex, ttl in self._ttls:
+            if regex.match(path):
+                return ttl
+
+        return self.default_ttl
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def clear(self):
+        """
+        Remove all responses from memory and disk.
+        """
+
+        self._entries.clear()
+        self._size = 0
+
+        if self.directory is None:
+            return
+
+        self._disk = OrderedDict()
+        self._disk_size = 0
+
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+    # -------------------------------------------------------------------------
+
+    def disk_size(self):
+        """
+        Return bytes of response files kept in the directory.
+
+        @return (int)
+        """
+
+        if self.directory is None:
+            return 0
+
+        if self._disk is None:
+            self._load_disk()
+
+        return self._disk_size
+
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def key(url):
+        """
+        Return the cache key of a request URL: a digest of its access token,
+        its path and its sorted params.
+
+        @param url (str)
+
+        @return (str)
+        """
+
+        parts = urlparse.urlsplit(url)
+
+        params = urlparse.parse_qsl(parts.query, True)
+        token = "".join(v for k, v in params if k == "access_token")
+        params = sorted((k, v) for k, v in params if k != "access_token")
+
+        scope = hashlib.sha1(token).hexdigest()[:16] if token else ""
+
+        return "%s %s?%s" % (scope, parts.path, urllib.urlencode(params))
+
+    # -------------------------------------------------------------------------
+
+    def lookup(self, key):
+        """
+        Look a response up.
+
+        @param key (str) See `key`.
+
+        @return (tuple) (body, etag, fresh). Body and etag are None on a
+                        miss, and fresh is False for stale responses.
+        """
+
+        entry = self._get(key)
+
+        if entry is None:
+            self._stats["misses"] += 1
+
+            return None, None, False
+
+        body, etag, expires_at = entry
+
+        if expires_at > time.time():
+            self._stats["hits"] += 1
+
+            return body, etag, True
+
+        self._stats["stale"] += 1
+
+        return body, etag, False
+
+    # -------------------------------------------------------------------------
+
+    def put(self, key, body, etag=None):
+        """
+        Store a response, fresh for the TTL of its path.
+
+        @param key    (str) See `key`.
+        @param body   (str) Response body.
+        @param [etag] (str) ETag response header.
+        """
+
+        path = key.split(" ", 1)[1].split("?", 1)[0].lstrip("/")
+
+        self._set(key, body, etag, time.time() + self._ttl(path))
+
+    # -------------------------------------------------------------------------
+
+    def reset_stats(self):
+        """
+        Reset hit, miss and revalidation counters to zero.
+        """
+
+        self._stats = {"hits": 0, "misses": 0, "stale": 0,
+                "revalidations": 0}
+
+    # -------------------------------------------------------------------------
+
+    def revalidated(self, key):
+        """
+        Mark a stale response as fresh again after a 304 response.
+
+        @param key (str) See `key`.
+
+        @return (str/None) Response body, None if it's no longer cached.
+        """
+
+        entry = self._get(key)
+
+        if entry is None:
+            return None
+
+        self._stats["revalidations"] += 1
+
+        self.put(key, entry[0], entry[1])
+
+        return entry[0]
+
+    # -------------------------------------------------------------------------
+
+    def size(self):
+        """
+        Return bytes of response bodies kept in memory.
+
+        @return (int)
+        """
+
+        return self._size
+
+    # -------------------------------------------------------------------------
+
+    def stats(self):
+        """
+        Return the cache's counters: fresh `hits`, `misses`, `stale` lookups
+        and stale responses `revalidations` confirmed as unchanged.
+
+        @return (dict)
+        """
+
+        return self._stats.copy()
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphRequest(FBFuture):
+
+    """
+    The pending result of a Graph API call made through FBGraphAPI,
+    resolved to the decoded JSON response.
+
+    Fails with a FBGraphAPIException subclass when the call fails and with
+    FBGraphAPICancelledException when cancelled.
+    """
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted while the files of an upload request are sent.
+
+    @param bytes_sent  (int)
+    @param bytes_total (int)
+    """
+
+    signal_uploadProgress = Signal("qint64", "qint64")
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, api, method, url, body=None, name=None):
+        """
+        Instantiate FBGraphRequest object.
+
+        @param api    (FBGraphAPI) API the request is made through.
+        @param method (str)        "GET", "POST" or "DELETE".
+        @param url    (str)        Encoded URL of the request.
+        @param [body] (str)        Encoded form body of POST requests.
+        @param [name] (str)        Name other operations of the same batch
+                                   refer to the result by.
+        """
+
+        super(FBGraphRequest, self).__init__(api)
+
+        self.method = method
+        self.url = url
+        self.body = body
+        self.name = name
+        self.host = urlparse.urlsplit(url).netloc
+
+        # HTTP status code and response headers, set once the reply finished
+        self.status = None
+        self.headers = {}
+
+        # FBGraphCache key of cached GET requests, and the ETag of the stale
+        # response being revalidated
+        self.cache_key = None
+        self.etag = None
+
+        # FBGraphScheduler priority, and retries made after rate limit errors
+        self.priority = FBGraphScheduler.PRIORITY_NORMAL
+        self.attempts = 0
+
+        # files of upload requests, see FBGraphAPI.upload
+        self.files = []
+
+        self._api = api
+        self._reply = None
+
+        # request actually sent for identical GET requests in flight, and
+        # the requests waiting on it when this is that request
+        self._leader = None
+        self._followers = []
+
+    # -------------------------------------------------------------------------
+
+    def __repr__(self):
+        return "<FBGraphRequest %s %s>" % (self.method, self.url)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _abort(self):
+        self._api._abort(self)
+
+    # -------------------------------------------------------------------------
+
+    def _cancelled_exception(self):
+        return FBGraphAPICancelledException("request cancelled")
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def wait(self):
+        """
+        Reimplemented from FBFuture to send the request right away when it's
+        waiting to be batched.
+        """
+
+        if (self._leader or self) in self._api._batch_pending:
+            self._api.flush()
+
+        super(FBGraphRequest, self).wait()
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphStreamRequest(FBGraphRequest):
+
+    """
+    A FBGraphRequest whose response is decoded while it downloads by a
+    FBJSONStreamDecoder, emitting the items of its `data` array as they
+    arrive.
+
+    Resolves to the response without its items (with an empty `data`
+    array), so the items are only held by whoever handles signal_item.
+    """
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted for each item of the response's data array.
+
+    @param item (object)
+    """
+
+    signal_item = Signal(object)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, api, method, url, body=None,
+            max_buffer=GRAPH_STREAM_MAX_BUFFER):
+        """
+        Instantiate FBGraphStreamRequest object.
+
+        @param [max_buffer] (int) See FBJSONStreamDecoder. See
+                                  FBGraphRequest for the other arguments.
+        """
+
+        super(FBGraphStreamRequest, self).__init__(api, method, url, body)
+
+        self.decoder = FBJSONStreamDecoder(max_buffer)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _feed(self, data):
+        """
+        Decode the next chunk of the response and emit its items.
+
+        @param data (str)
+        """
+
+        for item in self.decoder.feed(data):
+            self.signal_item.emit(item)
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphPager(QObject):
+
+    """
+    Walks a cursor-paged Graph API edge (example: "me/friends") by following
+    the `paging.next` URLs of its pages.
+
+    Iterating over the pager yields items as their pages arrive. With
+    `prefetch` set, the next page is requested while the current one is
+    consumed, so only one page is ever held ahead of the consumer. Breaking
+    out of the loop or calling `close` cancels the page in flight.
+
+    `next_page` returns a FBFuture of the next page's items for asynchronous
+    consumers, which can be awaited with `to_asyncio`.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, api, path, params=None, fields=None, limit=None,
+            page_size=None, prefetch=True):
+        """
+        Instantiate FBGraphPager object.
+
+        @param api         (FBGraphAPI) API the pages are requested through.
+        @param path        (str)        Path of the edge.
+        @param [params]    (dict)       Query params of the first page.
+        @param [fields]    (list)       Fields of each item to request.
+        @param [limit]     (int)        Maximum number of items to yield.
+        @param [page_size] (int)        Items to request per page, defaults to
+                                        `limit` when set.
+        @param [prefetch]  (bool)       Request the next page while the
+                                        current one is consumed.
+        """
+
+        super(FBGraphPager, self).__init__(api)
+
+        params = dict(params or {})
+
+        if fields:
+            params["fields"] = fields
+
+        if page_size or limit:
+            params["limit"] = page_size or limit
+
+        self.limit = limit
+        self.prefetch = prefetch
+
+        self._api = api
+
+        # path and params of the next page to request, None once the last
+        # page was requested
+        self._next = (path, params)
+
+        self._request = None
+        self._fetched = 0
+
+        # pages received but not handed out yet
+        self._pages = deque()
+
+        # futures returned by next_page waiting for a page
+        self._waiting = deque()
+
+        self._exception = None
+        self._closed = False
+
+    # -------------------------------------------------------------------------
+
+    def __iter__(self):
+        try:
+            while True:
+                items = self.next_page().result()
+
+                if not items:
+                    return
+
+                for item in items:
+                    yield item
+        finally:
+            self.close()
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _fetch(self):
+        """
+        Request the next page unless one is in flight or held already.
+        """
+
+        if (self._closed or self._request is not None or self._pages or
+                self._next is None):
+            return
+
+        if self.limit is not None and self._fetched >= self.limit:
+            return
+
+        path, params = self._next
+
+        self._request = self._api.get(path, params)
+        self._request.add_done_callback(self._page_finished)
+
+    # -------------------------------------------------------------------------
+
+    def _page_finished(self, request):
+        """
+        Done callback of page requests.
+
+        @param request (FBGraphRequest)
+        """
+
+        if request is not self._request:
+            return
+
+        self._request = None
+
+        if request.cancelled():
+            return
+
+        if request._exception is not None:
+            self._exception = request._exception
+            self._next = None
+        else:
+            page = request._result or {}
+            items = page.get("data") or []
+
+            if self.limit is not None:
+                items = items[:self.limit - self._fetched]
+
+            self._fetched += len(items)
+
+            next_url = (page.get("paging") or {}).get("next")
+
+            # an empty page ends the edge even when it links to another
+            self._next = (next_url, None) if next_url and items else None
+
+            if items:
+                self._pages.append(items)
+
+        self._resolve()
+
+        if self.prefetch:
+            self._fetch()
+
+    # -------------------------------------------------------------------------
+
+    def _resolve(self):
+        """
+        Hand pages out to the futures waiting for them.
+        """
+
+        while self._waiting:
+            if self._pages:
+                self._waiting.popleft()._finish(self._pages.popleft())
+
+                if self.prefetch:
+                    self._fetch()
+
+            elif self._exception is not None:
+                self._waiting.popleft()._finish(exception=self._exception)
+
+            elif self._closed or (self._request is None and
+                    (self._next is None or (self.limit is not None and
+                        self._fetched >= self.limit))):
+                self._waiting.popleft()._finish([])
+
+            else:
+                self._fetch()
+
+                return
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def close(self):
+        """
+        Stop walking the edge and cancel the page in flight.
+        """
+
+        if self._closed:
+            return
+
+        self._closed = True
+        self._pages.clear()
+
+        if self._request is not None:
+            request, self._request = self._request, None
+            request.cancel()
+
+        self._resolve()
+
+    # -------------------------------------------------------------------------
+
+    def next_page(self):
+        """
+        Return the items of the next page, an empty list once the edge has
+        been walked.
+
+        @return (FBFuture)
+        """
+
+        future = FBFuture(self)
+
+        self._waiting.append(future)
+        self._resolve()
+
+        return future
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphScheduler(QObject):
+
+    """
+    Schedules the requests of FBGraphAPI objects by priority while keeping
+    the app clear of facebook's rate limits.
+
+    The usage headers of every reply (X-App-Usage, X-Page-Usage and
+    X-Business-Use-Case-Usage) tell how close the app is to being throttled.
+    Past `throttle_usage` percent the scheduler lowers the number of
+    requests in flight and spaces out request starts, and at `max_usage`
+    percent it pauses until the limit resets. Calls failing with a rate
+    limit error anyway are retried with exponential backoff and jitter.
+
+    One scheduler can be shared by several FBGraphAPI objects, as the limits
+    apply to the app as a whole.
+    """
+
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_BACKGROUND = 2
+
+    USAGE_HEADERS = ("x-app-usage", "x-page-usage",
+                     "x-business-use-case-usage")
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None,
+            max_requests_per_host=GRAPH_MAX_REQUESTS_PER_HOST,
+            throttle_usage=GRAPH_USAGE_THROTTLE, max_usage=GRAPH_USAGE_MAX,
+            max_retries=GRAPH_MAX_RETRIES, retry_delay=GRAPH_RETRY_DELAY):
+        """
+        Instantiate FBGraphScheduler object.
+
+        @param [parent]                (QObject) Parent object that this
+                        object belongs to.
+        @param [max_requests_per_host] (int)     Requests kept in flight per
+                        host while usage is low.
+        @param [throttle_usage]        (int)     Usage percent at which
+                        requests are slowed down.
+        @param [max_usage]             (int)     Usage percent at which
+                        requests are paused.
+        @param [max_retries]           (int)     Retries of calls failing
+                        with a rate limit error.
+        @param [retry_delay]           (float)   Seconds before the first
+                        retry.
+        """
+
+        super(FBGraphScheduler, self).__init__(parent)
+
+        self.max_requests_per_host = max_requests_per_host
+        self.throttle_usage = throttle_usage
+        self.max_usage = max_usage
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        # host => heap of (priority, sequence, request)
+        self._queues = {}
+        self._sequence = itertools.count()
+
+        # host => number of requests in flight
+        self._active = {}
+
+        # usage header => last reported usage percent
+        self._usage = {}
+
+        self._paused_until = 0
+        self._last_start = 0
+
+        # time the next scheduled dispatch runs at
+        self._wake_at = None
+
+        self.reset_stats()
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _dispatch(self):
+        """
+        Send queued requests while the usage allows, highest priority first.
+        """
+
+        now = time.time()
+
+        if self._paused_until > now:
+            self._schedule(self._paused_until - now)
+
+            return
+
+        limit = self.concurrency()
+        interval = self.interval()
+
+        for host, queue in self._queues.iteritems():
+            while queue and self._active.get(host, 0) < limit:
+                if interval and self._last_start + interval > now:
+                    self._schedule(self._last_start + interval - now)
+
+                    return
+
+                priority, sequence, request = heapq.heappop(queue)
+
+                self._active[host] = self._active.get(host, 0) + 1
+                self._last_start = now
+
+                request._api._send(request)
+
+    # -------------------------------------------------------------------------
+
+    def _schedule(self, delay):
+        """
+        Dispatch again in `delay` seconds.
+        """
+
+        wake_at = time.time() + delay
+
+        if self._wake_at is not None and self._wake_at <= wake_at:
+            return
+
+        self._wake_at = wake_at
+
+        QTimer.singleShot(int(math.ceil(delay * 1000)), self._slot_wake)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_wake(self):
+        self._wake_at = None
+
+        self._dispatch()
+
+    # -------------------------------------------------------------------------
+
+    def _update_usage(self, headers):
+        """
+        Read the usage headers of a reply and pause once a limit is close.
+
+        @param headers (dict) Lower cased header name => value.
+        """
+
+        regain = 0
+
+        for name in self.USAGE_HEADERS:
+            if name not in headers:
+                continue
+
+            try:
+                usage = json.loads(headers[name])
+            except ValueError:
+                continue
+
+            # business use case usage lists the usage of each use case of
+            # each business object
+            if name == "x-business-use-case-usage":
+                entries = [entry for entries in usage.itervalues()
+                           for entry in entries]
+            else:
+                entries = [usage]
+
+            percents = [0]
+
+            for entry in entries:
+                percents.extend(value for key, value in entry.iteritems()
+                        if key in ("call_count", "total_time",
+                            "total_cputime")
+                        and isinstance(value, (int, float)))
+
+                regain = max(regain,
+                        entry.get("estimated_time_to_regain_access") or 0)
+
+            self._usage[name] = max(percents)
+
+        if self.usage() >= self.max_usage or regain:
+            # facebook reports the time to regain access in minutes
+            pause = regain * 60 or GRAPH_THROTTLE_PAUSE
+
+            self._paused_until = max(self._paused_until, time.time() + pause)
+            self._stats["throttled"] += 1
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def active_count(self):
+        return sum(self._active.itervalues())
+
+    # -------------------------------------------------------------------------
+
+    def concurrency(self):
+        """
+        Return the number of requests allowed in flight per host at the
+        current usage.
+
+        @return (int)
+        """
+
+        usage = self.usage()
+
+        if usage < self.throttle_usage:
+            return self.max_requests_per_host
+
+        scale = ((self.max_usage - usage) /
+                float(self.max_usage - self.throttle_usage))
+
+        return max(1, int(round(self.max_requests_per_host * scale)))
+
+    # -------------------------------------------------------------------------
+
+    def finished(self, request, exception=None):
+        """
+        Free the slot of a request that's no longer in flight, and retry it
+        when it failed with a rate limit error.
+
+        @param request     (FBGraphRequest)
+        @param [exception] (Exception) Exception the request failed with.
+
+        @return (bool) True if the request will be retried.
+        """
+
+        self._active[request.host] -= 1
+
+        self._update_usage(request.headers)
+
+        retrying = (isinstance(exception, FBGraphAPIRateLimitException) and
+                self.retry(request))
+
+        self._dispatch()
+
+        return retrying
+
+    # -------------------------------------------------------------------------
+
+    def interval(self):
+        """
+        Return the seconds between request starts at the current usage.
+
+        @return (float)
+        """
+
+        usage = self.usage()
+
+        if usage < self.throttle_usage:
+            return 0
+
+        return GRAPH_PACING_INTERVAL * min(1, (usage - self.throttle_usage) /
+                float(self.max_usage - self.throttle_usage))
+
+    # -------------------------------------------------------------------------
+
+    def metrics(self):
+        """
+        Return the state of the scheduler: requests `queued` and `active`,
+        the `usage` percent of the closest limit, the `budget` percent left
+        before requests are paused, the current `concurrency` and
+        `interval`, seconds `paused` for and the number of `retries` and
+        `throttled` replies.
+
+        @return (dict)
+        """
+
+        metrics = self._stats.copy()
+        metrics.update({
+            "queued": self.queue_depth(),
+            "active": self.active_count(),
+            "usage": self.usage(),
+            "budget": max(0, self.max_usage - self.usage()),
+            "concurrency": self.concurrency(),
+            "interval": self.interval(),
+            "paused": max(0, self._paused_until - time.time()),
+        })
+
+        return metrics
+
+    # -------------------------------------------------------------------------
+
+    def queue_depth(self):
+        return sum(len(q) for q in self._queues.itervalues())
+
+    # -------------------------------------------------------------------------
+
+    def remove(self, request):
+        """
+        Drop a queued request.
+
+        @param request (FBGraphRequest)
+
+        @return (bool) False if the request wasn't queued.
+        """
+
+        queue = self._queues.get(request.host, [])
+
+        for i, entry in enumerate(queue):
+            if entry[2] is request:
+                queue[i] = queue[-1]
+                queue.pop()
+
+                heapq.heapify(queue)
+
+                return True
+
+        return False
+
+    # -------------------------------------------------------------------------
+
+    def reset_stats(self):
+        self._stats = {"retries": 0, "throttled": 0}
+
+    # -------------------------------------------------------------------------
+
+    def retry(self, request):
+        """
+        Queue a request again after a rate limit error, pausing all requests
+        for an exponentially growing delay with jitter.
+
+        @param request (FBGraphRequest)
+
+        @return (bool) False if the request is out of retries.
+        """
+
+        if request.attempts >= self.max_retries:
+            return False
+
+        request.attempts += 1
+
+        delay = (self.retry_delay * 2 ** (request.attempts - 1) *
+                random.uniform(0.5, 1.5))
+
+        self._paused_until = max(self._paused_until, time.time() + delay)
+        self._stats["retries"] += 1
+
+        self.submit(request)
+
+        return True
+
+    # -------------------------------------------------------------------------
+
+    def submit(self, request):
+        """
+        Queue a request to be sent once the usage allows.
+
+        @param request (FBGraphRequest)
+        """
+
+        heapq.heappush(self._queues.setdefault(request.host, []),
+                (request.priority, next(self._sequence), request))
+
+        self._dispatch()
+
+    # -------------------------------------------------------------------------
+
+    def usage(self):
+        """
+        Return the usage percent of the limit the app is closest to.
+
+        @return (int)
+        """
+
+        return max(self._usage.itervalues()) if self._usage else 0
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphAPI(QObject):
+
+    """
+    Non-blocking Graph API client.
+
+    Every FBGraphAPI object sends its requests through one process-wide
+    QNetworkAccessManager, so connections to the Graph API are kept alive and
+    reused across clients. Each call returns a FBGraphRequest right away and
+    is sent by a FBGraphScheduler, which queues calls by priority and keeps
+    the app clear of facebook's rate limits.
+
+    Calls made inside a `batch()` block, or within `batch_window`
+    milliseconds of each other when set, are coalesced into Graph API batch
+    requests of up to GRAPH_BATCH_MAX_SIZE operations. Each call still gets
+    its own result or error. Operations given a `name` can be referred to by
+    later operations of the same batch with JSONPath references
+    (example: "{result=friends:$.data.*.id}").
+
+    Identical GET calls (same URL, params and token) made while one of them
+    is in flight share a single request. Each caller still gets its own
+    FBGraphRequest, which can be cancelled without affecting the others, and
+    all of them resolve to the same decoded response.
+    """
+
+    _shared_nam = None
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, access_token=None,
+            network_access_manager=None,
+            max_requests_per_host=GRAPH_MAX_REQUESTS_PER_HOST,
+            graph_url=GRAPH_URL, batch_window=None, cache=None,
+            single_flight=True, scheduler=None):
+        """
+        Instantiate FBGraphAPI object.
+
+        @param [parent]                 (QObject) Parent object that this
+                        object belongs to.
+        @param [access_token]           (str)     Token appended to every
+                        request that doesn't carry its own.
+        @param [network_access_manager] (QNetworkAccessManager) Defaults to
+                        the manager shared by all FBGraphAPI objects.
+        @param [max_requests_per_host]  (int)     Requests kept in flight per
+                        host by the default scheduler.
+        @param [graph_url]              (str)     Base URL paths are relative
+                        to.
+        @param [batch_window]           (int)     Milliseconds calls are
+                        collected for and sent as one batch request
+                        (example: GRAPH_BATCH_WINDOW), None to only batch
+                        calls made inside `batch()` blocks.
+        @param [cache]                  (FBGraphCache) Cache GET responses
+                        are served from.
+        @param [single_flight]          (bool)    Share one request between
+                        identical GET calls in flight.
+        @param [scheduler]              (FBGraphScheduler) Scheduler sending
+                        the requests, shared by several clients to stay clear
+                        of the app's rate limits together.
+        """
+
+        super(FBGraphAPI, self).__init__(parent)
+
+        self.access_token = access_token
+        self.graph_url = graph_url.rstrip("/")
+        self.cache = cache
+        self.single_flight = single_flight
+
+        self._nam = (network_access_manager or
+                FBGraphAPI.shared_network_access_manager())
+
+        self.scheduler = scheduler or FBGraphScheduler(self,
+                max_requests_per_host)
+
+        # reply => request
+        self._replies = {}
+
+        # FBGraphCache key => request in flight shared by identical calls
+        self._in_flight = {}
+
+        # requests waiting to be sent in the next batch
+        self._batch_pending = []
+        self._batch_depth = 0
+
+        self.batch_window = batch_window
+
+        self._batch_timer = QTimer(self)
+        self._batch_timer.setSingleShot(True)
+        self._batch_timer.timeout.connect(self.flush)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _abort(self, request):
+        """
+        Drop a cancelled request from its queue, or abort its reply if it's
+        in flight.
+
+        @param request (FBGraphRequest)
+        """
+
+        leader = request._leader
+
+        if leader is not None:
+            # only cancel the shared request once nobody waits on it
+            leader._followers.remove(request)
+
+            if not leader._followers:
+                leader.cancel()
+
+            return
+
+        reply = request._reply
+
+        if request in self._batch_pending:
+            self._batch_pending.remove(request)
+
+            return
+
+        if reply is None:
+            self.scheduler.remove(request)
+
+            return
+
+        del self._replies[reply]
+        request._reply = None
+
+        reply.finished.disconnect(self._slot_replyFinished)
+        reply.abort()
+        reply.deleteLater()
+
+        self.scheduler.finished(request)
+
+    # -------------------------------------------------------------------------
+
+    def _batch_finished(self, requests, batch):
+        """
+        Resolve the requests sent in a batch request.
+
+        @param requests (list)           FBGraphRequest objects in the order
+                                         they were sent.
+        @param batch    (FBGraphRequest) The finished batch request.
+        """
+
+        if batch._exception is not None:
+            for request in requests:
+                request._finish(exception=batch._exception)
+
+            return
+
+        responses = batch._result
+
+        if (not isinstance(responses, list) or
+                len(responses) != len(requests)):
+            for request in requests:
+                request._finish(exception=FBGraphAPIDecodeException(
+                        "invalid batch response"))
+
+            return
+
+        for request, response in zip(requests, responses):
+            if response is None:
+                # operations aren't run when an operation they refer to
+                # failed
+                request._finish(exception=FBGraphAPIErrorException(
+                        "batch operation not run, an operation it depends "
+                        "on failed"))
+
+                continue
+
+            request.status = response.get("code")
+            request.headers = dict((h["name"].lower(), h["value"])
+                    for h in response.get("headers") or ())
+
+            body = response.get("body")
+
+            if body is None:
+                request._finish()
+            else:
+                if isinstance(body, unicode):
+                    body = body.encode("utf-8")
+
+                result, exception = self._decode_body(body, request.status,
+                        request)
+
+                # operations are retried on their own
+                if (isinstance(exception, FBGraphAPIRateLimitException) and
+                        self.scheduler.retry(request)):
+                    continue
+
+                request._finish(result, exception)
+
+    # -------------------------------------------------------------------------
+
+    def _build_multipart(self, request):
+        """
+        Return the multipart body of an upload request. File parts read from
+        their device while the request is sent, so files are never held in
+        memory whole.
+
+        @param request (FBGraphRequest)
+
+        @return (QHttpMultiPart)
+        """
+
+        multipart = QHttpMultiPart(QHttpMultiPart.FormDataType)
+
+        for key, value in urlparse.parse_qsl(request.body or "", True):
+            part = QHttpPart()
+            part.setHeader(QNetworkRequest.ContentDispositionHeader,
+                    'form-data; name="%s"' % key)
+            part.setBody(value)
+
+            multipart.append(part)
+
+        for name, file_name, content_type, open_device in request.files:
+            device = open_device()
+            device.setParent(multipart)
+
+            part = QHttpPart()
+            part.setHeader(QNetworkRequest.ContentTypeHeader, content_type)
+            part.setHeader(QNetworkRequest.ContentDispositionHeader,
+                    'form-data; name="%s"; filename="%s"' % (name, file_name))
+            part.setBodyDevice(device)
+
+            multipart.append(part)
+
+        return multipart
+
+    # -------------------------------------------------------------------------
+
+    def _build_request(self, method, path, params=None, name=None,
+            request_class=FBGraphRequest, **kwargs):
+        """
+        Return a request for a Graph API call.
+
+        @param [request_class] (type)   FBGraphRequest subclass to create.
+        @param [kwargs]        (kwargs) Extra request_class arguments.
+
+        @return (FBGraphRequest)
+        """
+
+        method = method.upper()
+
+        if method not in ("GET", "POST", "DELETE"):
+            raise FBGraphAPIException("unsupported method: %s" % method)
+
+        params = dict(params or {})
+
+        if "://" in path:
+            url = path
+        else:
+            url = "%s/%s" % (self.graph_url, path.lstrip("/"))
+
+        if isinstance(url, unicode):
+            url = url.encode("utf-8")
+
+        if (self.access_token and "access_token" not in params and
+                not self._is_token_exchange(url)):
+            params["access_token"] = self.access_token
+
+        query = urllib.urlencode(self._encode_params(params))
+        body = None
+
+        if method == "POST":
+            body = query
+        elif query:
+            url += ("&" if "?" in url else "?") + query
+
+        if name is not None:
+            kwargs["name"] = name
+
+        return request_class(self, method, url, body, **kwargs)
+
+    # -------------------------------------------------------------------------
+
+    def _decode_body(self, body, status=None, request=None):
+        """
+        Decode a Graph API response body, and cache it when it's the
+        successful response of a cached request.
+
+        @param body      (str)
+        @param [status]  (int)            HTTP status code of the response.
+        @param [request] (FBGraphRequest)
+
+        @return (tuple) (result, exception)
+        """
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None, FBGraphAPIDecodeException(
+                    "invalid JSON response: %r" % body[:100])
+
+        if isinstance(data, dict) and "error" in data:
+            return None, self._error_exception(data["error"], status)
+
+        if (request is not None and request.cache_key is not None and
+                status == 200 and self.cache is not None):
+            self.cache.put(request.cache_key, body,
+                    request.headers.get("etag"))
+
+        return data, None
+
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _encode_params(params):
+        """
+        Return Graph API params as a list of encoded (key, value) pairs.
+        Lists are joined with commas and dicts are sent as JSON.
+
+        @param params (dict)
+
+        @return (list)
+        """
+
+        items = []
+
+        for key, value in params.iteritems():
+            if value is None:
+                continue
+
+            if isinstance(value, (list, tuple, set)):
+                value = ",".join(unicode(v) for v in value)
+            elif isinstance(value, dict):
+                value = json.dumps(value)
+            elif isinstance(value, bool):
+                value = "true" if value else "false"
+
+            if isinstance(value, unicode):
+                value = value.encode("utf-8")
+            else:
+                value = str(value)
+
+            items.append((key, value))
+
+        return items
+
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _error_exception(error, status=None):
+        """
+        Return the exception matching a Graph API error object.
+
+        @param error    (dict) The "error" object of a response.
+        @param [status] (int)  HTTP status code of the response.
+
+        @return (FBGraphAPIErrorException)
+        """
+
+        if not isinstance(error, dict):
+            error = {"message": unicode(error)}
+
+        code = error.get("code")
+
+        if code in GRAPH_RATE_LIMIT_CODES:
+            cls = FBGraphAPIRateLimitException
+        elif error.get("type") == "OAuthException":
+            cls = FBGraphAPIOAuthException
+        else:
+            cls = FBGraphAPIErrorException
+
+        return cls(error.get("message", ""), code, error.get("type"),
+                error.get("error_subcode"), status)
+
+    # -------------------------------------------------------------------------
+
+    def _finish_cached(self, request, body):
+        """
+        Resolve a request with a fresh response from the cache.
+        """
+
+        request.status = 200
+        request._finish(*self._decode_body(body))
+
+    # -------------------------------------------------------------------------
+
+    def _follow(self, request):
+        """
+        Attach a GET request to the identical request in flight, creating
+        the shared request when there's none.
+
+        @param request (FBGraphRequest)
+
+        @return (FBGraphRequest/None) The shared request when it was just
+                                      created and still has to be sent.
+        """
+
+        key = FBGraphCache.key(request.url)
+        leader = self._in_flight.get(key)
+        created = leader is None
+
+        if created:
+            leader = FBGraphRequest(self, request.method, request.url)
+            leader.cache_key = request.cache_key
+            leader.etag = request.etag
+            leader.priority = request.priority
+            leader.add_done_callback(partial(self._leader_finished, key))
+
+            self._in_flight[key] = leader
+
+        leader._followers.append(request)
+        request._leader = leader
+
+        return leader if created else None
+
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _is_token_exchange(url):
+        """
+        Return whether a URL exchanges tokens, which is authenticated by the
+        app secret and must not carry the user's token.
+
+        @param url (str)
+
+        @return (bool)
+        """
+
+        path = urlparse.urlsplit(url).path.rstrip("/")
+
+        return path.endswith("/oauth/access_token")
+
+    # -------------------------------------------------------------------------
+
+    def _leader_finished(self, key, leader):
+        """
+        Done callback of requests shared by identical calls, resolving the
+        calls waiting on it.
+        """
+
+        if self._in_flight.get(key) is leader:
+            del self._in_flight[key]
+
+        followers, leader._followers = leader._followers, []
+
+        for request in followers:
+            request.status = leader.status
+            request.headers = leader.headers
+            request._leader = None
+
+            request._finish(leader._result, leader._exception)
+
+    # -------------------------------------------------------------------------
+
+    def _parse_reply(self, reply, request):
+        """
+        Decode a finished reply.
+
+        @param reply   (QNetworkReply)
+        @param request (FBGraphRequest)
+
+        @return (tuple) (result, exception)
+        """
+
+        body = str(reply.readAll())
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+
+        if isinstance(request, FBGraphStreamRequest):
+            try:
+                request._feed(body)
+
+                body = request.decoder.close()
+            except FBGraphAPIDecodeException as e:
+                if reply.error() != QNetworkReply.NoError:
+                    e = FBGraphAPINetworkException(reply.errorString())
+
+                return None, e
+
+        if status == 304 and request.etag is not None:
+            body = self.cache.revalidated(request.cache_key)
+
+            if body is None:
+                return None, FBGraphAPIDecodeException(
+                        "revalidated response no longer cached")
+
+            return self._decode_body(body)
+
+        # the Graph API answers errors with an error object, so only fail on
+        # the transport error when there's no body to decode
+        if reply.error() != QNetworkReply.NoError:
+            if not body:
+                return None, FBGraphAPINetworkException(reply.errorString())
+
+            result, exception = self._decode_body(body, status)
+
+            if isinstance(exception, FBGraphAPIDecodeException):
+                exception = FBGraphAPINetworkException(reply.errorString())
+
+            return result, exception
+
+        return self._decode_body(body, status, request)
+
+    # -------------------------------------------------------------------------
+
+    def _enqueue(self, request):
+        """
+        Hand a request to the scheduler.
+
+        @param request (FBGraphRequest)
+        """
+
+        self.scheduler.submit(request)
+
+    # -------------------------------------------------------------------------
+
+    def _submit(self, request):
+        """
+        Send a request, or hold it for the next batch when batching.
+
+        @param request (FBGraphRequest)
+        """
+
+        batching = self._batch_depth or self.batch_window is not None
+
+        # revalidation needs its own request header, and token exchanges
+        # would get the batch's token, so neither is batched
+        if (not batching or request.etag is not None or
+                not request.url.startswith(self.graph_url + "/") or
+                self._is_token_exchange(request.url)):
+            self._enqueue(request)
+
+            return
+
+        self._batch_pending.append(request)
+
+        if self._batch_depth:
+            return
+
+        if len(self._batch_pending) >= GRAPH_BATCH_MAX_SIZE:
+            self.flush()
+        elif not self._batch_timer.isActive():
+            self._batch_timer.start(self.batch_window)
+
+    # -------------------------------------------------------------------------
+
+    def _send(self, request):
+        """
+        Hand a request to the network access manager.
+
+        @param request (FBGraphRequest)
+        """
+
+        net_request = QNetworkRequest(QUrl.fromEncoded(request.url))
+
+        if request.etag is not None:
+            net_request.setRawHeader("If-None-Match", request.etag)
+
+        if request.files:
+            multipart = self._build_multipart(request)
+
+            reply = self._nam.post(net_request, multipart)
+            reply.uploadProgress.connect(request.signal_uploadProgress)
+
+            multipart.setParent(reply)
+        elif request.method == "POST":
+            net_request.setHeader(QNetworkRequest.ContentTypeHeader,
+                    "application/x-www-form-urlencoded")
+
+            reply = self._nam.post(net_request, request.body)
+        elif request.method == "DELETE":
+            reply = self._nam.deleteResource(net_request)
+        else:
+            reply = self._nam.get(net_request)
+
+        request._reply = reply
+
+        self._replies[reply] = request
+
+        reply.finished.connect(self._slot_replyFinished)
+
+        if isinstance(request, FBGraphStreamRequest):
+            reply.readyRead.connect(self._slot_replyReadyRead)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_permsAuthorizedAccessToken(self, access_token, expires_in,
+            state):
+        """
+        Slot for the signal_permsAuthorizedAccessToken signal of dialogs
+        passed to `connect_auth_dialog`.
+        """
+
+        self.set_access_token(access_token)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_replyFinished(self):
+        """
+        Slot for the finished signal of replies in flight.
+        """
+
+        reply = self.sender()
+        request = self._replies.pop(reply, None)
+
+        if request is None:
+            return
+
+        request._reply = None
+        request.status = reply.attribute(
+                QNetworkRequest.HttpStatusCodeAttribute)
+        request.headers = dict((str(name).lower(), str(value))
+                for name, value in reply.rawHeaderPairs())
+
+        result, exception = self._parse_reply(reply, request)
+
+        reply.deleteLater()
+
+        if self.scheduler.finished(request, exception):
+            return
+
+        request._finish(result, exception)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_replyReadyRead(self):
+        """
+        Slot for the readyRead signal of streamed replies in flight.
+        """
+
+        reply = self.sender()
+        request = self._replies.get(reply)
+
+        if request is None:
+            return
+
+        try:
+            request._feed(str(reply.readAll()))
+        except FBGraphAPIDecodeException as e:
+            self._abort(request)
+
+            request._finish(exception=e)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager coalescing the calls made inside it into batch
+        requests, sent when the outermost block exits.
+
+        Example:
+
+            with api.batch():
+                friends = api.get("me/friends", name="friends")
+                pictures = api.get("", {"ids": "{result=friends:$.data.*.id}",
+                        "fields": "picture"})
+        """
+
+        self._batch_depth += 1
+
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+
+            if not self._batch_depth:
+                self.flush()
+
+    # -------------------------------------------------------------------------
+
+    def connect_auth_dialog(self, dialog):
+        """
+        Use the access tokens a FBAuthDialog is authorized with.
+
+        @param dialog (FBAuthDialog)
+        """
+
+        dialog.signal_permsAuthorizedAccessToken.connect(
+                self._slot_permsAuthorizedAccessToken)
+
+    # -------------------------------------------------------------------------
+
+    def delete(self, path, params=None, name=None, priority=None):
+        return self.request("DELETE", path, params, name, priority)
+
+    # -------------------------------------------------------------------------
+
+    def flush(self):
+        """
+        Send the calls waiting to be batched right away.
+        """
+
+        self._batch_timer.stop()
+
+        pending, self._batch_pending = self._batch_pending, []
+
+        prefix = self.graph_url + "/"
+
+        for i in xrange(0, len(pending), GRAPH_BATCH_MAX_SIZE):
+            requests = pending[i:i + GRAPH_BATCH_MAX_SIZE]
+
+            if len(requests) == 1:
+                self._enqueue(requests[0])
+
+                continue
+
+            operations = []
+
+            for request in requests:
+                operation = {
+                    "method": request.method,
+                    "relative_url": request.url[len(prefix):],
+                    "omit_response_on_success": False,
+                }
+
+                if request.body:
+                    operation["body"] = request.body
+
+                if request.name:
+                    operation["name"] = request.name
+
+                operations.append(operation)
+
+            batch = self._build_request("POST", "", {
+                "batch": json.dumps(operations),
+                "include_headers": True,
+            })
+            batch.priority = min(r.priority for r in requests)
+            batch.add_done_callback(partial(self._batch_finished, requests))
+
+            self._enqueue(batch)
+
+    # -------------------------------------------------------------------------
+
+    def get(self, path, params=None, name=None, priority=None):
+        return self.request("GET", path, params, name, priority)
+
+    # -------------------------------------------------------------------------
+
+    def iterate(self, path, params=None, fields=None, limit=None,
+            page_size=None, prefetch=True):
+        """
+        Return a pager walking a cursor-paged edge.
+
+        Example:
+
+            for friend in api.iterate("me/friends", fields=["id", "name"]):
+                print friend["name"]
+
+        @return (FBGraphPager) See FBGraphPager for the arguments.
+        """
+
+        return FBGraphPager(self, path, params, fields, limit, page_size,
+                prefetch)
+
+    # -------------------------------------------------------------------------
+
+    def pending_count(self):
+        """
+        Return the number of requests queued or in flight.
+
+        @return (int)
+        """
+
+        return (len(self._batch_pending) + self.scheduler.queue_depth() +
+                self.scheduler.active_count())
+
+    # -------------------------------------------------------------------------
+
+    def post(self, path, params=None, name=None, priority=None):
+        return self.request("POST", path, params, name, priority)
+
+    # -------------------------------------------------------------------------
+
+    def request(self, method, path, params=None, name=None, priority=None):
+        """
+        Make a Graph API call.
+
+        @param method     (str)  "GET", "POST" or "DELETE".
+        @param path       (str)  Path relative to `graph_url`
+                                 (example: "me/friends") or a full URL, such
+                                 as a paging URL returned by the Graph API.
+        @param [params]   (dict) Query params, sent as the form body of POST
+                                 requests.
+        @param [name]     (str)  Name later operations of the same batch
+                                 refer to the result by.
+        @param [priority] (int)  FBGraphScheduler priority, defaults to
+                                 PRIORITY_NORMAL.
+
+        @raise FBGraphAPIException If the method is not supported.
+
+        @return (FBGraphRequest)
+        """
+
+        request = self._build_request(method, path, params, name)
+
+        if priority is not None:
+            request.priority = priority
+
+        if self.cache is not None and request.method == "GET":
+            request.cache_key = self.cache.key(request.url)
+
+            body, etag, fresh = self.cache.lookup(request.cache_key)
+
+            if fresh:
+                # resolved from the event loop like any other request
+                QTimer.singleShot(0, partial(self._finish_cached, request,
+                        body))
+
+                return request
+
+            request.etag = etag
+
+        # named requests are referred to by their own batch operation
+        if (self.single_flight and request.method == "GET" and
+                request.name is None):
+            leader = self._follow(request)
+
+            if leader is not None:
+                self._submit(leader)
+        else:
+            self._submit(request)
+
+        return request
+
+    # -------------------------------------------------------------------------
+
+    def set_access_token(self, access_token):
+        self.access_token = access_token
+
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def shared_network_access_manager(cls):
+        """
+        Return the QNetworkAccessManager shared by all FBGraphAPI objects,
+        creating it on first use.
+
+        @return (FBNetworkAccessManager)
+        """
+
+        if cls._shared_nam is None:
+            cls._shared_nam = FBNetworkAccessManager()
+
+        return cls._shared_nam
+
+    # -------------------------------------------------------------------------
+
+    def stream(self, path, params=None, max_buffer=GRAPH_STREAM_MAX_BUFFER):
+        """
+        Make a GET call whose response is decoded while it downloads. Meant
+        for large responses, such as feeds with embedded comments. Streamed
+        calls are never batched.
+
+        Example:
+
+            request = api.stream("me/feed")
+            request.signal_item.connect(self.add_post)
+
+        @param path         (str)  See `request`.
+        @param [params]     (dict) See `request`.
+        @param [max_buffer] (int)  Bytes of an item buffered before the call
+                                   fails with a FBGraphAPIDecodeException.
+
+        @return (FBGraphStreamRequest)
+        """
+
+        request = self._build_request("GET", path, params,
+                request_class=FBGraphStreamRequest, max_buffer=max_buffer)
+
+        self._enqueue(request)
+
+        return request
+
+    # -------------------------------------------------------------------------
+
+    def upload(self, path, params=None, files=(), priority=None):
+        """
+        Make a multipart POST call uploading files. Uploads are never
+        batched, shared or cached.
+
+        @param path       (str)   See `request`.
+        @param [params]   (dict)  See `request`.
+        @param [files]    (list)  (name, file name, content type,
+                                  open_device) tuples, where open_device
+                                  returns an open QIODevice to read the file
+                                  from. It's called again when the request is
+                                  retried.
+        @param [priority] (int)   See `request`.
+
+        @return (FBGraphRequest) Emitting signal_uploadProgress.
+        """
+
+        request = self._build_request("POST", path, params)
+        request.files = list(files)
+
+        if priority is not None:
+            request.priority = priority
+
+        self._enqueue(request)
+
+        return request
+
+
+# -----------------------------------------------------------------------------
+
+class FBTokenManager(QObject):
+
+    """
+    Keeps the access token of a FBGraphAPI valid.
+
+    Codes from the "code" response type are exchanged for tokens, short lived
+    tokens are upgraded to long lived ones, and tokens are refreshed shortly
+    before they expire. All exchanges run in the background through the
+    API, and callers asking for a token while a refresh is in flight wait on
+    that refresh instead of starting their own.
+
+    Exchanges need the app secret, so only use this where the secret can be
+    kept, such as an in-house tool or a backend.
+    """
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when the managed token is set, exchanged or refreshed.
+
+    @param access_token (str)
+    @param expires_in   (int) Seconds until the token expires or 0 if it
+                              never expires.
+    """
+
+    signal_tokenChanged = Signal(str, int)
+
+    """
+    Emitted when refreshing the token failed. The current token is kept
+    until it expires, and the refresh is retried until then.
+
+    @param exception (FBGraphAPIException)
+    """
+
+    signal_refreshFailed = Signal(object)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, api, app_id, app_secret, scope=None, store=None,
+            refresh_margin=TOKEN_REFRESH_MARGIN,
+            retry_delay=TOKEN_REFRESH_RETRY_DELAY):
+        """
+        Instantiate FBTokenManager object.
+
+        @param api              (FBGraphAPI)   API whose token is managed and
+                                               exchanges are made with.
+        @param app_id           (str)
+        @param app_secret       (str)
+        @param [scope]          (list)         Permissions the tokens are
+                                               granted, used as the store
+                                               key.
+        @param [store]          (FBTokenStore) Store tokens are loaded from
+                                               and saved to.
+        @param [refresh_margin] (int)          Seconds before expiry tokens
+                                               are refreshed.
+        @param [retry_delay]    (int)          Seconds before a failed
+                                               refresh is retried, doubled
+                                               after every failure.
+        """
+
+        super(FBTokenManager, self).__init__(api)
+
+        self.api = api
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.scope = scope or []
+        self.store = store
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+
+        self.access_token = api.access_token
+        self.expires_at = 0
+
+        # key ("refresh" or ("code", code)) => futures waiting on the
+        # exchange in flight
+        self._exchanges = {}
+
+        self._refresh_at = None
+
+        # refreshes failed in a row
+        self._refresh_failures = 0
+
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self._slot_refreshTimeout)
+
+        if store is not None:
+            token = store.get(app_id, self.scope)
+
+            if token is not None:
+                self._apply(token[0], token[1], save=False)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _apply(self, access_token, expires_in, upgrade=True, save=True):
+        """
+        Use a token and schedule its refresh.
+
+        @param [upgrade] (bool) Refresh short lived tokens right away.
+        @param [save]    (bool) Save the token to the store.
+        """
+
+        if save and self.store is not None:
+            self.store.put(self.app_id, self.scope, access_token, expires_in)
+
+        self.access_token = access_token
+        self.expires_at = time.time() + expires_in if expires_in else 0
+
+        self.api.set_access_token(access_token)
+
+        self._refresh_timer.stop()
+        self._refresh_at = None
+        self._refresh_failures = 0
+
+        if expires_in:
+            if upgrade and expires_in < TOKEN_SHORT_LIVED_MAX:
+                self._refresh_at = time.time()
+            else:
+                self._refresh_at = self.expires_at - self.refresh_margin
+
+            self._schedule()
+
+        self.signal_tokenChanged.emit(access_token, expires_in)
+
+    # -------------------------------------------------------------------------
+
+    def _exchange(self, key, params):
+        """
+        Return a future waiting on an exchange, starting the exchange unless
+        one with the same key is in flight.
+
+        @return (FBFuture)
+        """
+
+        future = FBFuture(self)
+
+        futures = self._exchanges.get(key)
+
+        if futures is None:
+            futures = self._exchanges[key] = []
+
+            params = dict(params, client_id=self.app_id,
+                    client_secret=self.app_secret)
+
+            # POST keeps the app secret out of URLs and the response cache
+            request = self.api.request("POST", "oauth/access_token", params,
+                    priority=FBGraphScheduler.PRIORITY_INTERACTIVE)
+            request.add_done_callback(partial(self._exchange_finished, key))
+
+        futures.append(future)
+
+        return future
+
+    # -------------------------------------------------------------------------
+
+    def _exchange_finished(self, key, request):
+        futures = self._exchanges.pop(key)
+        exception = request.exception()
+
+        if exception is None:
+            data = request.result()
+
+            try:
+                access_token = data["access_token"]
+                expires_in = int(data.get("expires_in") or 0)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                exception = FBGraphAPIDecodeException(
+                        "no access token in response")
+
+        if exception is not None:
+            if key == "refresh":
+                self._retry_refresh()
+
+                self.signal_refreshFailed.emit(exception)
+
+            for future in futures:
+                future._finish(exception=exception)
+
+            return
+
+        # exchanged tokens are as long lived as facebook hands out
+        self._apply(access_token, expires_in, upgrade=False)
+
+        for future in futures:
+            future._finish((access_token, expires_in))
+
+    # -------------------------------------------------------------------------
+
+    def _retry_refresh(self):
+        """
+        Schedule another refresh after a failed one, backing off after every
+        failure. The last retry is made just before the token expires.
+        """
+
+        if not self.expires_at:
+            return
+
+        now = time.time()
+        delay = self.retry_delay * 2 ** self._refresh_failures
+
+        self._refresh_failures += 1
+
+        retry_at = min(now + delay, self.expires_at - 1)
+
+        if retry_at <= now:
+            return
+
+        self._refresh_at = retry_at
+
+        self._schedule()
+
+    # -------------------------------------------------------------------------
+
+    def _schedule(self):
+        """
+        Arm the refresh timer for `_refresh_at`, or as close to it as a
+        QTimer reaches.
+        """
+
+        delay = min(max(self._refresh_at - time.time(), 0),
+                TOKEN_REFRESH_MAX_DELAY)
+
+        self._refresh_timer.start(int(delay * 1000))
+
+    # -------------------------------------------------------------------------
+
+    def _slot_permsAuthorizedAccessToken(self, access_token, expires_in,
+            state):
+        """
+        Slot for the signal_permsAuthorizedAccessToken signal of dialogs
+        passed to `connect_auth_dialog`.
+        """
+
+        self.set_token(access_token, expires_in)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_permsAuthorizedOAuthCode(self, code, state):
+        """
+        Slot for the signal_permsAuthorizedOAuthCode signal of dialogs
+        passed to `connect_auth_dialog`.
+        """
+
+        dialog = self.sender()
+
+        self.exchange_code(code, dialog.oauth_params["redirect_uri"])
+
+    # -------------------------------------------------------------------------
+
+    def _slot_refreshTimeout(self):
+        if self._refresh_at is None:
+            return
+
+        # the timer only covers part of the wait for long lived tokens
+        if self._refresh_at - time.time() > 1:
+            self._schedule()
+        else:
+            self.refresh()
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def connect_auth_dialog(self, dialog):
+        """
+        Manage the tokens and exchange the codes a FBAuthDialog is
+        authorized with.
+
+        @param dialog (FBAuthDialog)
+        """
+
+        dialog.signal_permsAuthorizedAccessToken.connect(
+                self._slot_permsAuthorizedAccessToken)
+        dialog.signal_permsAuthorizedOAuthCode.connect(
+                self._slot_permsAuthorizedOAuthCode)
+
+    # -------------------------------------------------------------------------
+
+    def exchange_code(self, code, redirect_uri=REDIRECT_URI):
+        """
+        Exchange an OAuth code for an access token, which becomes the
+        managed token.
+
+        @param code           (str)
+        @param [redirect_uri] (str) Redirect URI the code was issued for.
+
+        @return (FBFuture) Resolved to (access_token, expires_in).
+        """
+
+        return self._exchange(("code", code), {
+            "code": code,
+            "redirect_uri": redirect_uri,
+        })
+
+    # -------------------------------------------------------------------------
+
+    def expires_in(self):
+        """
+        Return seconds until the managed token expires.
+
+        @return (int) 0 if the token never expires.
+        """
+
+        if not self.expires_at:
+            return 0
+
+        return max(int(self.expires_at - time.time()), 0)
+
+    # -------------------------------------------------------------------------
+
+    def refresh(self):
+        """
+        Exchange the managed token for a long lived one, joining the refresh
+        in flight if there is one.
+
+        @raise FBGraphAPIException If there's no token to refresh.
+
+        @return (FBFuture) Resolved to (access_token, expires_in).
+        """
+
+        if not self.access_token and "refresh" not in self._exchanges:
+            raise FBGraphAPIException("no access token to refresh")
+
+        return self._exchange("refresh", {
+            "grant_type": "fb_exchange_token",
+            "fb_exchange_token": self.access_token,
+        })
+
+    # -------------------------------------------------------------------------
+
+    def set_token(self, access_token, expires_in=0):
+        """
+        Manage a token, saving it to the store. Short lived tokens are
+        upgraded right away.
+
+        @param access_token (str)
+        @param [expires_in] (int) Seconds until the token expires or 0 if it
+                                  never expires.
+        """
+
+        self._apply(access_token, expires_in)
+
+    # -------------------------------------------------------------------------
+
+    def token(self):
+        """
+        Return the managed token once it's valid, waiting on the refresh in
+        flight or starting one if the token is about to expire.
+
+        @raise FBGraphAPIException If there's no token.
+
+        @return (FBFuture) Resolved to (access_token, expires_in).
+        """
+
+        if ("refresh" in self._exchanges or (self.expires_at and
+                self.expires_at - time.time() <= self.refresh_margin)):
+            return self.refresh()
+
+        if not self.access_token:
+            raise FBGraphAPIException("no access token")
+
+        future = FBFuture(self)
+
+        # resolved from the event loop like a refreshed token
+        QTimer.singleShot(0, partial(future._finish, (self.access_token,
+                self.expires_in())))
+
+        return future
+
+
+# -----------------------------------------------------------------------------
+
+class FBUpload(FBFuture):
+
+    """
+    The pending result of a photo or video upload made through
+    FBGraphUploader, resolved to the Graph API response (with the new
+    object's "id").
+
+    Videos uploaded in chunks keep their upload session and the offset
+    facebook has confirmed, so a failed upload can be picked up where it
+    stopped with `FBGraphUploader.resume`. `state` returns all that is needed
+    to resume as a dict, which can be saved to resume after a restart.
+    """
+
+    KIND_PHOTO = "photo"
+    KIND_VIDEO = "video"
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted while the file is sent.
+
+    @param bytes_sent  (int)
+    @param bytes_total (int)
+    """
+
+    signal_progress = Signal("qint64", "qint64")
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, uploader, kind, path, target="me", params=None,
+            size=None, session_id=None, video_id=None, offset=0,
+            end_offset=None):
+        """
+        Instantiate FBUpload object. The arguments after `params` are the
+        state of a resumed upload.
+
+        @param uploader (FBGraphUploader)
+        @param kind     (str)  KIND_PHOTO or KIND_VIDEO.
+        @param path     (str)  File to upload.
+        @param [target] (str)  ID of the user, page or album uploaded to.
+        @param [params] (dict) Params of the photo or video
+                               (example: {"description": "..."}).
+        """
+
+        super(FBUpload, self).__init__(uploader)
+
+        self.kind = kind
+        self.path = path
+        self.target = target
+        self.params = dict(params or {})
+        self.size = size
+
+        # resumable upload session, and the bytes facebook asks for next
+        self.session_id = session_id
+        self.video_id = video_id
+        self.offset = offset
+        self.end_offset = end_offset
+
+        self._request = None
+        self._chunk_start = 0
+
+        self._file = None
+        self._map = None
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _abort(self):
+        if self._request is not None:
+            request, self._request = self._request, None
+            request.cancel()
+
+    # -------------------------------------------------------------------------
+
+    def _cancelled_exception(self):
+        return FBGraphAPICancelledException("upload cancelled")
+
+    # -------------------------------------------------------------------------
+
+    def _close(self):
+        """
+        Unmap and close the file of a chunked upload.
+        """
+
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # -------------------------------------------------------------------------
+
+    def _finish(self, result=None, exception=None):
+        if self._done:
+            return False
+
+        self._close()
+
+        return super(FBUpload, self)._finish(result, exception)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_chunkProgress(self, bytes_sent, bytes_total):
+        """
+        Slot for the signal_uploadProgress signal of chunk requests.
+        """
+
+        # the bytes sent include the multipart headers, so they can overshoot
+        self.signal_progress.emit(min(self._chunk_start + bytes_sent,
+                self.end_offset), self.size)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def state(self):
+        """
+        Return what `FBGraphUploader.resume` needs to resume the upload.
+
+        @return (dict)
+        """
+
+        return {
+            "kind": self.kind,
+            "path": self.path,
+            "target": self.target,
+            "params": self.params,
+            "size": self.size,
+            "session_id": self.session_id,
+            "video_id": self.video_id,
+            "offset": self.offset,
+            "end_offset": self.end_offset,
+        }
+
+
+# -----------------------------------------------------------------------------
+
+class FBGraphUploader(QObject):
+
+    """
+    Uploads photos and videos through a FBGraphAPI, a bounded number at a
+    time.
+
+    Files are streamed from disk while they are sent and never read into
+    memory whole. Videos of `chunked_size` bytes or more are uploaded with
+    facebook's resumable upload protocol (start, transfer and finish
+    phases), reading each chunk facebook asks for from a memory map of the
+    file.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, api, max_uploads=GRAPH_MAX_UPLOADS,
+            chunked_size=GRAPH_UPLOAD_CHUNKED_SIZE, video_url=GRAPH_VIDEO_URL):
+        """
+        Instantiate FBGraphUploader object.
+
+        @param api            (FBGraphAPI) API the uploads are made
+                                           through.
+        @param [max_uploads]  (int)        Files uploaded at once, the rest
+                                           wait in a queue.
+        @param [chunked_size] (int)        Size from which videos are
+                                           uploaded in chunks.
+        @param [video_url]    (str)        Base URL of video uploads.
+        """
+
+        super(FBGraphUploader, self).__init__(api)
+
+        self.api = api
+        self.max_uploads = max_uploads
+        self.chunked_size = chunked_size
+        self.video_url = video_url.rstrip("/")
+
+        self._queue = deque()
+        self._active = set()
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _call(self, upload, params, callback, files=()):
+        """
+        Make a call of a chunked upload's protocol and pass its result to
+        `callback` with the upload.
+
+        @return (FBGraphRequest)
+        """
+
+        request = self.api.upload("%s/%s/videos" % (self.video_url,
+                upload.target), params, files)
+        request.add_done_callback(partial(self._phase_finished, upload,
+                callback))
+
+        upload._request = request
+
+        return request
+
+    # -------------------------------------------------------------------------
+
+    def _dispatch(self):
+        """
+        Start queued uploads while fewer than `max_uploads` are running.
+        """
+
+        while self._queue and len(self._active) < self.max_uploads:
+            upload = self._queue.popleft()
+
+            if upload.done():
+                continue
+
+            self._active.add(upload)
+            self._start(upload)
+
+    # -------------------------------------------------------------------------
+
+    def _finish_video(self, upload, result=None):
+        """
+        Make the finish call of a chunked upload.
+        """
+
+        params = dict(upload.params, upload_phase="finish",
+                upload_session_id=upload.session_id)
+
+        self._call(upload, params, self._video_finished)
+
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _open_chunk(data):
+        device = QBuffer()
+        device.setData(data)
+        device.open(QIODevice.ReadOnly)
+
+        return device
+
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _open_file(path):
+        device = QFile(path)
+        device.open(QIODevice.ReadOnly)
+
+        return device
+
+    # -------------------------------------------------------------------------
+
+    def _phase_finished(self, upload, callback, request):
+        """
+        Done callback of the calls of chunked uploads.
+        """
+
+        if request.cancelled() or upload.done():
+            return
+
+        upload._request = None
+
+        if request._exception is not None:
+            upload._finish(exception=request._exception)
+        else:
+            callback(upload, request._result)
+
+    # -------------------------------------------------------------------------
+
+    def _start(self, upload):
+        """
+        Start sending an upload.
+
+        @param upload (FBUpload)
+        """
+
+        try:
+            upload.size = os.path.getsize(upload.path)
+
+            chunked = (upload.kind == FBUpload.KIND_VIDEO and
+                    (upload.session_id is not None or
+                        upload.size >= self.chunked_size))
+
+            if chunked:
+                upload._file = open(upload.path, "rb")
+                upload._map = mmap.mmap(upload._file.fileno(), 0,
+                        access=mmap.ACCESS_READ)
+        except (EnvironmentError, ValueError) as e:
+            upload._finish(exception=FBGraphAPIException(
+                    "can't read %s: %s" % (upload.path, e)))
+
+            return
+
+        if chunked and upload.session_id is None:
+            self._call(upload, {"upload_phase": "start",
+                    "file_size": upload.size}, self._transfer)
+
+        elif chunked:
+            self._transfer(upload)
+
+        else:
+            if upload.kind == FBUpload.KIND_PHOTO:
+                url = "%s/%s/photos" % (self.api.graph_url, upload.target)
+            else:
+                url = "%s/%s/videos" % (self.video_url, upload.target)
+
+            content_type = (mimetypes.guess_type(upload.path)[0] or
+                    "application/octet-stream")
+
+            request = self.api.upload(url, upload.params, [("source",
+                    os.path.basename(upload.path), content_type,
+                    partial(self._open_file, upload.path))])
+
+            request.signal_uploadProgress.connect(upload.signal_progress)
+            request.add_done_callback(partial(self._phase_finished, upload,
+                    self._uploaded))
+
+            upload._request = request
+
+    # -------------------------------------------------------------------------
+
+    def _submit(self, upload):
+        """
+        Queue an upload to start once fewer than `max_uploads` are running.
+
+        @return (FBUpload)
+        """
+
+        self._queue.append(upload)
+
+        upload.add_done_callback(self._upload_finished)
+
+        self._dispatch()
+
+        return upload
+
+    # -------------------------------------------------------------------------
+
+    def _transfer(self, upload, result=None):
+        """
+        Send the chunk facebook asked for next, or make the finish call once
+        it has the whole file.
+
+        @param upload   (FBUpload)
+        @param [result] (dict)     Result of the previous call, with the
+                                   offsets of the next chunk.
+        """
+
+        if result is not None:
+            upload.session_id = result.get("upload_session_id",
+                    upload.session_id)
+            upload.video_id = result.get("video_id", upload.video_id)
+            upload.offset = int(result["start_offset"])
+            upload.end_offset = int(result["end_offset"])
+
+            upload.signal_progress.emit(upload.offset, upload.size)
+
+        if upload.offset >= upload.end_offset:
+            self._finish_video(upload)
+
+            return
+
+        data = upload._map[upload.offset:upload.end_offset]
+
+        upload._chunk_start = upload.offset
+
+        request = self._call(upload, {
+            "upload_phase": "transfer",
+            "upload_session_id": upload.session_id,
+            "start_offset": upload.offset,
+        }, self._transfer, [("video_file_chunk",
+                os.path.basename(upload.path), "application/octet-stream",
+                partial(self._open_chunk, data))])
+
+        request.signal_uploadProgress.connect(upload._slot_chunkProgress)
+
+    # -------------------------------------------------------------------------
+
+    def _upload_finished(self, upload):
+        """
+        Done callback of uploads.
+        """
+
+        self._active.discard(upload)
+
+        self._dispatch()
+
+    # -------------------------------------------------------------------------
+
+    def _uploaded(self, upload, result):
+        upload._finish(result)
+
+    # -------------------------------------------------------------------------
+
+    def _video_finished(self, upload, result):
+        result = dict(result or {})
+        result.setdefault("id", upload.video_id)
+
+        upload._finish(result)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def resume(self, upload):
+        """
+        Resume a failed or cancelled upload. Chunked video uploads pick up
+        at the last chunk facebook confirmed, other uploads start over.
+
+        @param upload (FBUpload/dict) The upload or its saved `state`.
+
+        @return (FBUpload)
+        """
+
+        if isinstance(upload, FBUpload):
+            upload = upload.state()
+
+        return self._submit(FBUpload(self, **upload))
+
+    # -------------------------------------------------------------------------
+
+    def upload_photo(self, path, target="me", params=None):
+        """
+        Upload a photo.
+
+        @param path     (str)  Image file.
+        @param [target] (str)  ID of the user, page or album to upload to.
+        @param [params] (dict) Params of the photo
+                               (example: {"message": "..."}).
+
+        @return (FBUpload)
+        """
+
+        return self._submit(FBUpload(self, FBUpload.KIND_PHOTO, path, target,
+                params))
+
+    # -------------------------------------------------------------------------
+
+    def upload_video(self, path, target="me", params=None):
+        """
+        Upload a video, in chunks when it's `chunked_size` bytes or larger.
+
+        @param path     (str)  Video file.
+        @param [target] (str)  ID of the user or page to upload to.
+        @param [params] (dict) Params of the video
+                               (example: {"title": "...",
+                               "description": "..."}).
+
+        @return (FBUpload)
+        """
+
+        return self._submit(FBUpload(self, FBUpload.KIND_VIDEO, path, target,
+                params))
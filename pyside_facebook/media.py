@@ -0,0 +1,694 @@
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+
+"""
+Concurrent, cached fetching of pictures and photos.
+"""
+
+import errno
+import hashlib
+import os
+import tempfile
+import time
+import urllib
+
+from collections import OrderedDict
+from collections import deque
+from functools   import partial
+from stat        import S_ISREG
+
+from PySide.QtCore    import QObject
+from PySide.QtCore    import QRunnable
+from PySide.QtCore    import QThreadPool
+from PySide.QtCore    import QTimer
+from PySide.QtCore    import QUrl
+from PySide.QtCore    import Signal
+from PySide.QtGui     import QImage
+from PySide.QtNetwork import QNetworkReply
+from PySide.QtNetwork import QNetworkRequest
+
+from pyside_facebook.constants  import MEDIA_CACHE_MAX_AGE
+from pyside_facebook.constants  import MEDIA_CACHE_MAX_DISK_SIZE
+from pyside_facebook.constants  import MEDIA_CACHE_MAX_SIZE
+from pyside_facebook.constants  import MEDIA_MAX_DOWNLOADS
+from pyside_facebook.constants  import MEDIA_MAX_REDIRECTS
+from pyside_facebook.exceptions import FBGraphAPICancelledException
+from pyside_facebook.exceptions import FBGraphAPIDecodeException
+from pyside_facebook.exceptions import FBGraphAPINetworkException
+from pyside_facebook.futures    import FBFuture
+
+
+# -----------------------------------------------------------------------------
+# CLASSES
+# -----------------------------------------------------------------------------
+
+class FBImageDecodeTask(QRunnable):
+
+    """
+    Decodes an image on a QThreadPool thread and hands it back to the
+    FBMediaFetcher, whose slot runs on the fetcher's own thread.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, fetcher, key, data=None, path=None):
+        """
+        Instantiate FBImageDecodeTask object.
+
+        @param fetcher (FBMediaFetcher)
+        @param key     (tuple) Cache key of the image.
+        @param [data]  (str)   Encoded image.
+        @param [path]  (str)   File to read the encoded image from instead.
+        """
+
+        super(FBImageDecodeTask, self).__init__()
+
+        self.fetcher = fetcher
+        self.key = key
+        self.data = data
+        self.path = path
+
+    # -------------------------------------------------------------------------
+
+    def run(self):
+        data = self.data
+
+        if data is None:
+            try:
+                with open(self.path, "rb") as f:
+                    data = f.read()
+            except IOError:
+                data = ""
+
+        image = QImage.fromData(data)
+
+        # queued to the fetcher's thread, as the fetcher lives there
+        self.fetcher._signal_decoded.emit(self.key, image)
+
+
+# -----------------------------------------------------------------------------
+
+class FBMediaRequest(FBFuture):
+
+    """
+    The pending result of an image fetched by FBMediaFetcher, resolved to a
+    QImage.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, fetcher, key):
+        super(FBMediaRequest, self).__init__(fetcher)
+
+        self.key = key
+
+        self._fetcher = fetcher
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _abort(self):
+        self._fetcher._abort(self)
+
+    # -------------------------------------------------------------------------
+
+    def _cancelled_exception(self):
+        return FBGraphAPICancelledException("fetch cancelled")
+
+
+# -----------------------------------------------------------------------------
+
+class FBMediaFetcher(QObject):
+
+    """
+    Fetches profile pictures and photos for display, such as the pictures of
+    a friend list or the thumbnails of a photo grid.
+
+    Images are downloaded a bounded number at a time and decoded on a
+    QThreadPool, so the GUI thread never waits on either. Each image is
+    fetched once no matter how many callers ask for it while it's pending.
+    Decoded images are kept in a size-bounded LRU keyed by (object ID, size),
+    and the downloaded files can also be kept on disk to outlive the process.
+    Files are downloaded again once older than `max_age`, and the least
+    recently used are removed once they exceed `max_disk_size`.
+
+    Callers get a FBMediaRequest per image, and signal_imageReady is emitted
+    as each image becomes available so views can fill in progressively.
+    """
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted when an image has been downloaded (or read from disk) and
+    decoded.
+
+    @param key   (tuple)  (object ID, size) or (URL, None).
+    @param image (QImage)
+    """
+
+    signal_imageReady = Signal(object, QImage)
+
+    # emitted by FBImageDecodeTask from pool threads
+    _signal_decoded = Signal(object, object)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, api, max_downloads=MEDIA_MAX_DOWNLOADS,
+            max_size=MEDIA_CACHE_MAX_SIZE, directory=None, thread_pool=None,
+            max_disk_size=MEDIA_CACHE_MAX_DISK_SIZE,
+            max_age=MEDIA_CACHE_MAX_AGE):
+        """
+        Instantiate FBMediaFetcher object.
+
+        @param api             (FBGraphAPI)  API whose network access
+                                             manager and token are used.
+        @param [max_downloads] (int)         Images downloaded at once.
+        @param [max_size]      (int)         Bytes of decoded images kept in
+                                             memory.
+        @param [directory]     (str)         Folder downloaded images are
+                                             also kept in, None to only
+                                             cache in memory.
+        @param [thread_pool]   (QThreadPool) Pool images are decoded on,
+                                             defaults to the global pool.
+        @param [max_disk_size] (int)         Bytes of downloaded files kept
+                                             in the directory.
+        @param [max_age]       (int)         Seconds a downloaded file is
+                                             used for, None for no limit.
+        """
+
+        super(FBMediaFetcher, self).__init__(api)
+
+        self.api = api
+        self.max_downloads = max_downloads
+        self.max_size = max_size
+        self.max_disk_size = max_disk_size
+        self.max_age = max_age
+        self.directory = directory
+
+        self._pool = thread_pool or QThreadPool.globalInstance()
+
+        # key => QImage in least to most recently used order
+        self._images = OrderedDict()
+        self._size = 0
+
+        # key => {"url", "requests", "reply", "redirects"} of images being
+        # fetched
+        self._pending = {}
+
+        # reply => key of downloads running
+        self._replies = {}
+
+        # file path => size of the files in the directory in least to most
+        # recently used order, loaded from disk when first needed
+        self._disk = None
+        self._disk_size = 0
+
+        self._queue = deque()
+        self._active = 0
+
+        self._stats = {"hits": 0, "disk_hits": 0, "downloads": 0}
+
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._signal_decoded.connect(self._slot_decoded)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _abort(self, request):
+        """
+        Drop a cancelled request, and stop fetching its image once no other
+        request waits on it.
+
+        @param request (FBMediaRequest)
+        """
+
+        pending = self._pending.get(request.key)
+
+        if pending is None or request not in pending["requests"]:
+            return
+
+        pending["requests"].remove(request)
+
+        if pending["requests"]:
+            return
+
+        if pending["reply"] is not None:
+            reply = pending["reply"]
+
+            del self._replies[reply]
+
+            reply.finished.disconnect(self._slot_replyFinished)
+            reply.abort()
+            reply.deleteLater()
+
+            self._active -= 1
+        elif request.key in self._queue:
+            self._queue.remove(request.key)
+        else:
+            # already decoding, let the image land in the cache
+            return
+
+        del self._pending[request.key]
+
+        self._dispatch()
+
+    # -------------------------------------------------------------------------
+
+    def _dispatch(self):
+        """
+        Start queued downloads while fewer than `max_downloads` run.
+        """
+
+        while self._queue and self._active < self.max_downloads:
+            self._download(self._queue.popleft())
+
+    # -------------------------------------------------------------------------
+
+    def _download(self, key):
+        pending = self._pending[key]
+
+        reply = self.api._nam.get(QNetworkRequest(
+                QUrl.fromEncoded(pending["url"])))
+        reply.finished.connect(self._slot_replyFinished)
+
+        pending["reply"] = reply
+        self._replies[reply] = key
+        self._active += 1
+
+    # -------------------------------------------------------------------------
+
+    def _cached_file(self, key):
+        """
+        Return the file of an image kept on disk, marking it as the most
+        recently used. Files older than `max_age` are removed.
+
+        @return (str/None) Path, None if the image isn't on disk.
+        """
+
+        path = self._file_path(key)
+
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+            return None
+
+        now = time.time()
+
+        if self.max_age is not None and now - stat.st_mtime > self.max_age:
+            self._remove_file(path)
+
+            return None
+
+        # the access time orders files across runs, the modification time
+        # stays the time the file was downloaded
+        os.utime(path, (now, stat.st_mtime))
+
+        self._index_file(path, stat.st_size)
+
+        return path
+
+    # -------------------------------------------------------------------------
+
+    def _file_path(self, key):
+        return os.path.join(self.directory,
+                hashlib.sha1(repr(key)).hexdigest())
+
+    # -------------------------------------------------------------------------
+
+    def _index_file(self, path, size):
+        """
+        Mark a file as the most recently used, and remove the least recently
+        used files over `max_disk_size`.
+        """
+
+        if self._disk is None:
+            self._load_disk()
+
+        self._disk_size -= self._disk.pop(path, 0)
+        self._disk[path] = size
+        self._disk_size += size
+
+        while self._disk_size > self.max_disk_size and len(self._disk) > 1:
+            self._remove_file(next(iter(self._disk)))
+
+    # -------------------------------------------------------------------------
+
+    def _insert(self, key, image):
+        """
+        Add an image to the memory cache, evicting the least recently used
+        images over `max_size`.
+        """
+
+        old = self._images.pop(key, None)
+
+        if old is not None:
+            self._size -= old.byteCount()
+
+        self._images[key] = image
+        self._size += image.byteCount()
+
+        while self._size > self.max_size and len(self._images) > 1:
+            evicted_key, evicted = self._images.popitem(last=False)
+            self._size -= evicted.byteCount()
+
+    # -------------------------------------------------------------------------
+
+    def _load_disk(self):
+        """
+        Build the index of the files already in the directory, ordered by the
+        time each was last used.
+        """
+
+        entries = []
+
+        try:
+            names = os.listdir(self.directory)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+            names = []
+
+        for name in names:
+            # files still being written
+            if name.endswith(".part"):
+                continue
+
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+
+            if not S_ISREG(stat.st_mode):
+                continue
+
+            entries.append((stat.st_atime, path, stat.st_size))
+
+        entries.sort()
+
+        self._disk = OrderedDict((path, size) for _, path, size in entries)
+        self._disk_size = sum(self._disk.itervalues())
+
+    # -------------------------------------------------------------------------
+
+    def _remove_file(self, path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+        if self._disk is not None:
+            self._disk_size -= self._disk.pop(path, 0)
+
+    # -------------------------------------------------------------------------
+
+    def _request(self, key, url):
+        """
+        Return a request for an image, starting to fetch it unless it's
+        cached or pending already.
+
+        @return (FBMediaRequest)
+        """
+
+        request = FBMediaRequest(self, key)
+
+        image = self._images.pop(key, None)
+
+        if image is not None:
+            self._images[key] = image
+            self._stats["hits"] += 1
+
+            # resolved from the event loop like any other request
+            QTimer.singleShot(0, partial(request._finish, image))
+
+            return request
+
+        pending = self._pending.get(key)
+
+        if pending is not None:
+            pending["requests"].append(request)
+
+            return request
+
+        self._pending[key] = {"url": url, "requests": [request],
+                "reply": None, "redirects": 0}
+
+        path = None
+
+        if self.directory is not None:
+            path = self._cached_file(key)
+
+        if path is not None:
+            self._stats["disk_hits"] += 1
+
+            self._pool.start(FBImageDecodeTask(self, key, path=path))
+        else:
+            self._queue.append(key)
+            self._dispatch()
+
+        return request
+
+    # -------------------------------------------------------------------------
+
+    def _save(self, key, data):
+        """
+        Keep a downloaded image on disk. Errors writing it (disk full,
+        directory removed) leave the image out of the disk cache.
+        """
+
+        tmp_path = None
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix=".part",
+                    dir=self.directory)
+
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+
+            path = self._file_path(key)
+
+            # rename can't replace an existing file on windows
+            if os.name == "nt" and os.path.exists(path):
+                os.remove(path)
+
+            os.rename(tmp_path, path)
+            tmp_path = None
+
+            self._index_file(path, len(data))
+        except (IOError, OSError):
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    # -------------------------------------------------------------------------
+
+    def _slot_decoded(self, key, image):
+        """
+        Slot for images decoded by FBImageDecodeTask.
+        """
+
+        pending = self._pending.pop(key, None)
+        requests = pending["requests"] if pending is not None else []
+
+        if image.isNull():
+            exception = FBGraphAPIDecodeException("can't decode image %r" %
+                    (key,))
+
+            if self.directory is not None:
+                self._remove_file(self._file_path(key))
+
+            for request in requests:
+                request._finish(exception=exception)
+
+            return
+
+        self._insert(key, image)
+
+        for request in requests:
+            request._finish(image)
+
+        self.signal_imageReady.emit(key, image)
+
+    # -------------------------------------------------------------------------
+
+    def _slot_replyFinished(self):
+        """
+        Slot for the finished signal of downloads.
+        """
+
+        reply = self.sender()
+        key = self._replies.pop(reply, None)
+
+        if key is None:
+            return
+
+        pending = self._pending[key]
+
+        reply.deleteLater()
+
+        pending["reply"] = None
+        self._active -= 1
+
+        target = reply.attribute(QNetworkRequest.RedirectionTargetAttribute)
+
+        if reply.error() != QNetworkReply.NoError:
+            exception = FBGraphAPINetworkException(reply.errorString())
+
+        elif target is not None and not target.isEmpty():
+            if pending["redirects"] < MEDIA_MAX_REDIRECTS:
+                pending["redirects"] += 1
+                pending["url"] = str(reply.url().resolved(target).toEncoded())
+
+                # keep the download slot for the redirect
+                self._download(key)
+
+                return
+
+            exception = FBGraphAPINetworkException("too many redirects")
+
+        else:
+            data = str(reply.readAll())
+
+            self._stats["downloads"] += 1
+
+            if self.directory is not None:
+                self._save(key, data)
+
+            self._pool.start(FBImageDecodeTask(self, key, data))
+
+            self._dispatch()
+
+            return
+
+        del self._pending[key]
+
+        for request in pending["requests"]:
+            request._finish(exception=exception)
+
+        self._dispatch()
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def clear(self):
+        """
+        Remove all images from memory and disk. Files being written by other
+        fetchers sharing the directory are left alone.
+        """
+
+        self._images.clear()
+        self._size = 0
+
+        if self.directory is None:
+            return
+
+        if self._disk is None:
+            self._load_disk()
+
+        # only indexed files, not the ones still being written
+        for path in list(self._disk):
+            self._remove_file(path)
+
+        self._disk = OrderedDict()
+        self._disk_size = 0
+
+    # -------------------------------------------------------------------------
+
+    def fetch(self, object_id, size="normal"):
+        """
+        Fetch the picture of a user, page, album or photo.
+
+        @param object_id (str)       Graph API ID of the object.
+        @param [size]    (str/tuple) Picture type ("square", "small",
+                                     "normal" or "large") or (width,
+                                     height) in pixels.
+
+        @return (FBMediaRequest)
+        """
+
+        if isinstance(size, tuple):
+            params = [("width", size[0]), ("height", size[1])]
+        else:
+            params = [("type", size)]
+
+        if self.api.access_token:
+            params.append(("access_token", self.api.access_token))
+
+        url = "%s/%s/picture?%s" % (self.api.graph_url, object_id,
+                urllib.urlencode(params))
+
+        return self._request((object_id, size), url)
+
+    # -------------------------------------------------------------------------
+
+    def fetch_url(self, url):
+        """
+        Fetch an image by URL, such as the `source` or `picture` URL of a
+        photo.
+
+        @param url (str)
+
+        @return (FBMediaRequest)
+        """
+
+        if isinstance(url, unicode):
+            url = url.encode("utf-8")
+
+        return self._request((url, None), url)
+
+    # -------------------------------------------------------------------------
+
+    def image(self, object_id, size="normal"):
+        """
+        Return a picture if it's in the memory cache, without fetching it.
+
+        @return (QImage/None)
+        """
+
+        return self._images.get((object_id, size))
+
+    # -------------------------------------------------------------------------
+
+    def size(self):
+        """
+        Return bytes of decoded images kept in memory.
+
+        @return (int)
+        """
+
+        return self._size
+
+    # -------------------------------------------------------------------------
+
+    def stats(self):
+        """
+        Return the number of memory cache `hits`, images read from disk
+        (`disk_hits`) and `downloads`.
+
+        @return (dict)
+        """
+
+        return self._stats.copy()
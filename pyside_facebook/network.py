@@ -0,0 +1,1062 @@
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+
+"""
+Network access manager, disk cache and cookie jars.
+"""
+
+import errno
+import fnmatch
+import os
+import re
+import tempfile
+
+from collections import OrderedDict
+
+from PySide.QtCore    import QDateTime
+from PySide.QtCore    import QIODevice
+from PySide.QtCore    import QTimer
+from PySide.QtCore    import QUrl
+from PySide.QtCore    import SIGNAL
+from PySide.QtCore    import Signal
+from PySide.QtGui     import QDesktopServices
+from PySide.QtNetwork import QNetworkAccessManager
+from PySide.QtNetwork import QNetworkCookie
+from PySide.QtNetwork import QNetworkCookieJar
+from PySide.QtNetwork import QNetworkDiskCache
+from PySide.QtNetwork import QNetworkReply
+from PySide.QtNetwork import QNetworkRequest
+
+from pyside_facebook.constants  import CACHE_DIR_NAME
+from pyside_facebook.constants  import CACHE_MAX_SIZE
+from pyside_facebook.constants  import COOKIE_JAR_COMPACT_LINES
+from pyside_facebook.constants  import COOKIE_JAR_FILE_NAME
+from pyside_facebook.constants  import STATIC_CACHE_DIR_NAME
+from pyside_facebook.constants  import STATIC_CACHE_HOSTS
+from pyside_facebook.constants  import STATIC_CACHE_MIME_TYPES
+from pyside_facebook.exceptions import FBAuthDialogInvalidParamException
+
+
+# -----------------------------------------------------------------------------
+# CLASSES
+# -----------------------------------------------------------------------------
+
+class FBResourceRule(object):
+
+    """
+    A rule matching network requests that should never reach the network (or
+    be dropped as soon as their MIME type is known).
+
+    A rule matches when every criteria it was given matches; criteria left as
+    `None` match anything. Host and path patterns are shell-style wildcards
+    (see `fnmatch`) and are checked before a request is sent. MIME types can
+    only be checked once the response headers arrive, so rules with
+    `mime_types` set are checked against the reply instead and abort it.
+
+    Actions:
+     - block: Fail the request with a ContentAccessDenied error.
+     - stub:  Answer the request locally with an empty 200 response.
+    """
+
+    ACTION_BLOCK = "block"
+    ACTION_STUB = "stub"
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, name, action=ACTION_BLOCK, mime_types=None, hosts=None,
+            paths=None):
+        """
+        Instantiate FBResourceRule object.
+
+        @param name         (str)  Name the rule's hits are counted under.
+        @param [action]     (str)  ACTION_BLOCK or ACTION_STUB
+        @param [mime_types] (list) MIME type patterns (example: image/*)
+        @param [hosts]      (list) Host patterns (example: *.fbcdn.net)
+        @param [paths]      (list) URL path patterns (example: *.png)
+        """
+
+        if action not in (self.ACTION_BLOCK, self.ACTION_STUB):
+            raise FBAuthDialogInvalidParamException(
+                "action must be `%s` or `%s` but was: %s" %
+                (self.ACTION_BLOCK, self.ACTION_STUB, action))
+
+        self.name = name
+        self.action = action
+
+        self._mime_types = self._compile(mime_types)
+        self._hosts = self._compile(hosts)
+        self._paths = self._compile(paths)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _compile(self, patterns):
+        """
+        Compile a list of wildcard patterns into a single regex.
+
+        @param patterns (list/None)
+
+        @return (RegexObject/None)
+        """
+
+        if not patterns:
+            return None
+
+        return re.compile("|".join(fnmatch.translate(p) for p in patterns),
+                re.IGNORECASE)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def checks_mime_type(self):
+        """
+        Return True when the rule can only be checked against a reply.
+
+        @return (bool)
+        """
+
+        return self._mime_types is not None
+
+    # -------------------------------------------------------------------------
+
+    def matches(self, host, path, mime_type=None):
+        """
+        Return True when the rule matches the request/reply.
+
+        @param host        (str)
+        @param path        (str)
+        @param [mime_type] (str) Content-Type of the reply, if known.
+
+        @return (bool)
+        """
+
+        if self._hosts and not self._hosts.match(host):
+            return False
+
+        if self._paths and not self._paths.match(path):
+            return False
+
+        if self._mime_types:
+            if mime_type is None:
+                return False
+
+            # drop parameters such as charset from the content type
+            mime_type = mime_type.split(";", 1)[0].strip()
+
+            if not self._mime_types.match(mime_type):
+                return False
+
+        return True
+
+
+# -----------------------------------------------------------------------------
+
+class FBStubReply(QNetworkReply):
+
+    """
+    A QNetworkReply answered locally, used in place of requests filtered by a
+    FBResourceRule.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent, operation, request, blocked=False):
+        """
+        Instantiate FBStubReply object.
+
+        @param parent    (QObject)
+        @param operation (QNetworkAccessManager.Operation)
+        @param request   (QNetworkRequest)
+        @param [blocked] (bool) Fail the reply instead of answering it with an
+                                empty 200 response.
+        """
+
+        super(FBStubReply, self).__init__(parent)
+
+        self.setOperation(operation)
+        self.setRequest(request)
+        self.setUrl(request.url())
+
+        if blocked:
+            self.setError(QNetworkReply.ContentAccessDenied,
+                    "Blocked by resource rule")
+        else:
+            self.setAttribute(QNetworkRequest.HttpStatusCodeAttribute, 200)
+            self.setHeader(QNetworkRequest.ContentLengthHeader, 0)
+
+        self.open(QIODevice.ReadOnly | QIODevice.Unbuffered)
+
+        # replies must finish asynchronously, after the caller connected
+        QTimer.singleShot(0, self._slot_finish)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _slot_finish(self):
+        self.setFinished(True)
+
+        self.metaDataChanged.emit()
+
+        # like the replies of QNetworkAccessManager, failed replies emit
+        # error() before finished()
+        if self.error() != QNetworkReply.NoError:
+            self.emit(SIGNAL("error(QNetworkReply::NetworkError)"),
+                    self.error())
+
+        self.finished.emit()
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def abort(self):
+        pass
+
+    # -------------------------------------------------------------------------
+
+    def bytesAvailable(self):
+        return 0
+
+    # -------------------------------------------------------------------------
+
+    def isSequential(self):
+        return True
+
+    # -------------------------------------------------------------------------
+
+    def readData(self, maxlen):
+        return ""
+
+
+# -----------------------------------------------------------------------------
+
+class FBNetworkAccessManager(QNetworkAccessManager):
+
+    """
+    A QNetworkAccessManager that filters requests through a list of
+    FBResourceRule objects and counts how often each rule was hit.
+
+    Without rules it behaves exactly like a stock QNetworkAccessManager.
+    """
+
+    # -------------------------------------------------------------------------
+    # SIGNALS
+    # -------------------------------------------------------------------------
+
+    """
+    Emitted for every reply created, including the local replies of filtered
+    requests.
+
+    @param reply (QNetworkReply)
+    """
+
+    signal_replyCreated = Signal(QNetworkReply)
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, rules=None):
+        """
+        Instantiate FBNetworkAccessManager object.
+
+        @param [parent] (QObject) Parent object that this object belongs to.
+        @param [rules]  (list)    FBResourceRule objects or dicts of
+                                  FBResourceRule kwargs
+                                  (example: RESOURCE_RULES_LEAN).
+        """
+
+        super(FBNetworkAccessManager, self).__init__(parent)
+
+        self.set_rules(rules or [])
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def createRequest(self, operation, request, data=None):
+        """
+        Reimplemented from QNetworkAccessManager.
+        """
+
+        url = request.url()
+        host = url.host()
+        path = url.path()
+
+        for rule in self._request_rules:
+            if rule.matches(host, path):
+                self._hits[rule.name] += 1
+
+                reply = FBStubReply(self, operation, request,
+                        rule.action == FBResourceRule.ACTION_BLOCK)
+
+                self.signal_replyCreated.emit(reply)
+
+                return reply
+
+        reply = super(FBNetworkAccessManager, self).createRequest(operation,
+                request, data)
+
+        if self._reply_rules:
+            reply.metaDataChanged.connect(self._slot_replyMetaDataChanged)
+
+        self.signal_replyCreated.emit(reply)
+
+        return reply
+
+    # -------------------------------------------------------------------------
+
+    def _slot_replyMetaDataChanged(self):
+        """
+        Slot for the metaDataChanged signal of replies created while rules
+        checking MIME types are set. Aborts replies whose MIME type matches.
+        """
+
+        reply = self.sender()
+        mime_type = reply.header(QNetworkRequest.ContentTypeHeader)
+
+        if not mime_type:
+            return
+
+        url = reply.url()
+
+        for rule in self._reply_rules:
+            if rule.matches(url.host(), url.path(), mime_type):
+                self._hits[rule.name] += 1
+
+                reply.abort()
+
+                return
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def hits(self):
+        """
+        Return number of requests filtered by each rule.
+
+        @return (dict) Rule name => hit count
+        """
+
+        return self._hits.copy()
+
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def originating_page(request):
+        """
+        Return the QWebPage a request was made for.
+
+        @param request (QNetworkRequest)
+
+        @return (QWebPage/None) None for requests not made by a page.
+        """
+
+        frame = request.originatingObject()
+
+        # a QWebFrame, told apart by its page() without importing QtWebKit
+        if frame is None or not hasattr(frame, "page"):
+            return None
+
+        return frame.page()
+
+    # -------------------------------------------------------------------------
+
+    def reset_hits(self):
+        """
+        Reset all rule hit counters to zero.
+        """
+
+        self._hits = dict.fromkeys(self._hits, 0)
+
+    # -------------------------------------------------------------------------
+
+    def set_rules(self, rules):
+        """
+        Replace the rules requests are filtered by. Rules are checked in
+        order and the first matching rule wins.
+
+        @param rules (list) FBResourceRule objects or dicts of FBResourceRule
+                            kwargs.
+        """
+
+        rules = [r if isinstance(r, FBResourceRule) else FBResourceRule(**r)
+                 for r in rules]
+
+        self.rules = rules
+        self._request_rules = [r for r in rules if not r.checks_mime_type()]
+        self._reply_rules = [r for r in rules if r.checks_mime_type()]
+        self._hits = dict((r.name, 0) for r in rules)
+
+
+# -----------------------------------------------------------------------------
+
+class FBNetworkCache(QNetworkDiskCache):
+
+    """
+    A size-bounded QNetworkDiskCache that evicts the least recently used
+    entries first and counts cache hits and misses.
+
+    Use `FBNetworkCache.shared()` to get the process-wide instance shared by
+    every FBAuthDialog.
+    """
+
+    # folder in the platform's cache location used by default
+    DIR_NAME = CACHE_DIR_NAME
+
+    _shared = None
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, directory=None, max_size=CACHE_MAX_SIZE):
+        """
+        Instantiate FBNetworkCache object.
+
+        @param [parent]    (QObject) Parent object that this object belongs
+                                     to.
+        @param [directory] (str)     Directory cached files are stored in.
+                                     Defaults to a `DIR_NAME` folder in the
+                                     platform's cache location.
+        @param [max_size]  (int)     Maximum size of the cache in bytes.
+        """
+
+        super(FBNetworkCache, self).__init__(parent)
+
+        if directory is None:
+            directory = QDesktopServices.storageLocation(
+                    QDesktopServices.CacheLocation) or tempfile.gettempdir()
+            directory = os.path.join(directory, self.DIR_NAME)
+
+        self.setCacheDirectory(directory)
+        self.setMaximumCacheSize(max_size)
+
+        self._hits = 0
+        self._misses = 0
+
+        # url => size of entries ordered from least to most recently used,
+        # loaded from disk the first time an entry is inserted
+        self._lru = None
+        self._lru_size = 0
+
+        # devices returned by prepare() => url, until they're inserted
+        self._prepared = {}
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _evict(self, size):
+        """
+        Remove least recently used entries until `size` more bytes fit within
+        90% of the maximum cache size.
+
+        @param size (int) Number of bytes to make room for.
+        """
+
+        goal = (self.maximumCacheSize() * 9) / 10
+
+        while self._lru and self._lru_size + size > goal:
+            url = next(iter(self._lru))
+
+            self.remove(QUrl.fromEncoded(url))
+
+    # -------------------------------------------------------------------------
+
+    def _load_lru(self):
+        """
+        Build the LRU index from the files already in the cache directory,
+        ordered by the time each was last written.
+        """
+
+        entries = []
+
+        for root, dirs, names in os.walk(self.cacheDirectory()):
+            # entries being written, not in the cache yet
+            if "prepared" in dirs:
+                dirs.remove("prepared")
+
+            for name in names:
+                path = os.path.join(root, name)
+                meta = self.fileMetaData(path)
+
+                if not meta.isValid():
+                    continue
+
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, str(meta.url().toEncoded()),
+                        stat.st_size))
+
+        entries.sort()
+
+        self._lru = OrderedDict((url, size) for _, url, size in entries)
+        self._lru_size = sum(self._lru.itervalues())
+
+    # -------------------------------------------------------------------------
+
+    def expire(self):
+        """
+        Reimplemented from QNetworkDiskCache, whose own expire() deletes
+        files without calling `remove`, which would leave entries in the LRU
+        index that are gone from disk. Evicts least recently used entries
+        instead. QNetworkDiskCache.clear() calls it with a maximum size of
+        0 to remove every entry.
+
+        @return (int) Size of the cache in bytes.
+        """
+
+        if self._lru is None:
+            self._load_lru()
+
+        if self._lru_size > self.maximumCacheSize():
+            self._evict(0)
+
+        return self._lru_size
+
+    # -------------------------------------------------------------------------
+
+    def insert(self, device):
+        """
+        Reimplemented from QNetworkDiskCache.
+        """
+
+        url = self._prepared.pop(device, None)
+
+        if url is not None:
+            if self._lru is None:
+                self._load_lru()
+
+            # the device is deleted by QNetworkDiskCache.insert
+            device_size = device.size()
+
+            # an entry replacing one of the same URL
+            self._lru_size -= self._lru.pop(url, 0)
+            self._evict(device_size)
+
+        super(FBNetworkCache, self).insert(device)
+
+        if url is not None:
+            # QNetworkDiskCache sets its size to what expire() returned and
+            # adds the size of the file it wrote, headers included, which is
+            # what the entry takes on disk
+            size = self.cacheSize() - self._lru_size
+
+            if size <= 0:
+                size = device_size
+
+            self._lru[url] = size
+            self._lru_size += size
+
+    # -------------------------------------------------------------------------
+
+    def metaData(self, url):
+        """
+        Reimplemented from QNetworkDiskCache.
+        """
+
+        meta = super(FBNetworkCache, self).metaData(url)
+
+        if not meta.isValid():
+            self._misses += 1
+
+            return meta
+
+        self._hits += 1
+
+        if self._lru is not None:
+            key = str(url.toEncoded())
+            size = self._lru.pop(key, None)
+
+            # move entry to the most recently used end
+            if size is not None:
+                self._lru[key] = size
+
+        return meta
+
+    # -------------------------------------------------------------------------
+
+    def prepare(self, meta):
+        """
+        Reimplemented from QNetworkDiskCache.
+        """
+
+        device = super(FBNetworkCache, self).prepare(meta)
+
+        if device is not None:
+            self._prepared[device] = str(meta.url().toEncoded())
+
+        return device
+
+    # -------------------------------------------------------------------------
+
+    def remove(self, url):
+        """
+        Reimplemented from QNetworkDiskCache.
+        """
+
+        if self._lru is not None:
+            self._lru_size -= self._lru.pop(str(url.toEncoded()), 0)
+
+        return super(FBNetworkCache, self).remove(url)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def shared(cls, directory=None, max_size=None):
+        """
+        Return the process-wide FBNetworkCache, creating it on first use.
+
+        @param [directory] (str) Directory of the cache. Only used when the
+                                 shared cache is created.
+        @param [max_size]  (int) If set, the new maximum size of the cache in
+                                 bytes.
+
+        @return (FBNetworkCache)
+        """
+
+        if cls._shared is None:
+            cls._shared = cls(directory=directory)
+
+        if max_size is not None:
+            cls._shared.setMaximumCacheSize(max_size)
+
+        return cls._shared
+
+    # -------------------------------------------------------------------------
+
+    def install(self, network_access_manager):
+        """
+        Make the QNetworkAccessManager use this cache.
+
+        QNetworkAccessManager normally takes ownership of its cache and
+        deletes it along with itself, so the cache is detached from the
+        manager again to let it outlive the manager and be shared.
+
+        NOTE: Never set another cache on a manager this cache was installed
+              into; QNetworkAccessManager deletes the cache it replaces.
+
+        @param network_access_manager (QNetworkAccessManager)
+        """
+
+        network_access_manager.setCache(self)
+
+        self.setParent(None)
+
+    # -------------------------------------------------------------------------
+
+    def purge(self):
+        """
+        Remove every entry from the cache.
+        """
+
+        self.clear()
+
+        self._lru = OrderedDict()
+        self._lru_size = 0
+
+    # -------------------------------------------------------------------------
+
+    def reset_stats(self):
+        """
+        Reset the hit and miss counters to zero.
+        """
+
+        self._hits = 0
+        self._misses = 0
+
+    # -------------------------------------------------------------------------
+
+    def stats(self):
+        """
+        Return cache usage statistics.
+
+        @return (dict) hits, misses, hit_ratio, size and max_size
+        """
+
+        lookups = self._hits + self._misses
+
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": float(self._hits) / lookups if lookups else 0.0,
+            "size": self.cacheSize(),
+            "max_size": self.maximumCacheSize(),
+        }
+
+
+# -----------------------------------------------------------------------------
+
+class FBStaticCache(FBNetworkCache):
+
+    """
+    A FBNetworkCache that only keeps static assets: responses of the hosts in
+    `hosts` with a MIME type in `mime_types` that set no cookies. Pages and
+    anything else that may be made for a logged in user are never written to
+    it, so it can be shared by the pages of different accounts.
+
+    `FBStaticCache.shared()` returns a process-wide instance of its own,
+    apart from the FBNetworkCache one.
+    """
+
+    DIR_NAME = STATIC_CACHE_DIR_NAME
+
+    _shared = None
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, directory=None, max_size=CACHE_MAX_SIZE,
+            hosts=STATIC_CACHE_HOSTS, mime_types=STATIC_CACHE_MIME_TYPES):
+        """
+        Instantiate FBStaticCache object.
+
+        @param [parent]     (QObject) See FBNetworkCache.
+        @param [directory]  (str)     See FBNetworkCache.
+        @param [max_size]   (int)     See FBNetworkCache.
+        @param [hosts]      (list)    Host patterns of static assets.
+        @param [mime_types] (list)    MIME type patterns of static assets.
+        """
+
+        super(FBStaticCache, self).__init__(parent, directory, max_size)
+
+        # only used for its matching
+        self._rule = FBResourceRule("static", hosts=hosts,
+                mime_types=mime_types)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def prepare(self, meta):
+        """
+        Reimplemented from QNetworkDiskCache. Refuses everything but static
+        assets.
+        """
+
+        headers = dict((str(name).lower(), str(value))
+                for name, value in meta.rawHeaders())
+
+        if "set-cookie" in headers:
+            return None
+
+        url = meta.url()
+
+        if not self._rule.matches(str(url.host()), str(url.path()),
+                headers.get("content-type")):
+            return None
+
+        return super(FBStaticCache, self).prepare(meta)
+
+
+# -----------------------------------------------------------------------------
+
+class FBCookieJar(QNetworkCookieJar):
+
+    """
+    A QNetworkCookieJar persisted to a per-profile file so a user's Facebook
+    session survives app restarts.
+
+    Cookie changes are appended to the file as they happen, one cookie per
+    line, and later lines replace earlier ones for the same cookie. The file
+    is only rewritten as a whole to compact it once it grows well beyond the
+    number of cookies in the jar. Expired cookies are dropped when the file
+    is loaded and compacted.
+
+    NOTE: Facebook only sets persistent session cookies when the user checks
+          "Keep me logged in". Set `keep_session_cookies` to also persist
+          cookies that would normally be discarded on exit.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, parent=None, profile="default", directory=None,
+            keep_session_cookies=False):
+        """
+        Instantiate FBCookieJar object.
+
+        @param [parent]               (QObject) Parent object that this object
+                                                belongs to.
+        @param [profile]              (str)     Name of the profile whose
+                                                cookies are loaded and saved.
+        @param [directory]            (str)     Directory cookie files are
+                                                stored in. Defaults to a
+                                                `pyside-facebook` folder in
+                                                the platform's data location.
+        @param [keep_session_cookies] (bool)    Persist session cookies.
+        """
+
+        super(FBCookieJar, self).__init__(parent)
+
+        if directory is None:
+            directory = os.path.join(QDesktopServices.storageLocation(
+                    QDesktopServices.DataLocation), CACHE_DIR_NAME)
+
+        self.path = os.path.join(directory, COOKIE_JAR_FILE_NAME % profile)
+        self.keep_session_cookies = keep_session_cookies
+
+        # number of lines in the file, used to decide when to compact it
+        self._lines = 0
+
+        self._load()
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _append(self, cookies):
+        """
+        Append cookies to the end of the file.
+
+        @param cookies (list) QNetworkCookie objects
+        """
+
+        directory = os.path.dirname(self.path)
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        # readable by the user only, like the files written by compact()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+        with os.fdopen(fd, "a") as f:
+            for cookie in cookies:
+                f.write(str(cookie.toRawForm(QNetworkCookie.Full)) + "\n")
+
+        self._lines += len(cookies)
+
+        if self._needs_compact():
+            self.compact()
+
+    # -------------------------------------------------------------------------
+
+    def _expired(self, cookie):
+        """
+        Return an expired copy of a cookie, which removes the cookie when
+        the file is loaded.
+
+        @param cookie (QNetworkCookie)
+
+        @return (QNetworkCookie)
+        """
+
+        cookie = QNetworkCookie(cookie)
+        cookie.setExpirationDate(QDateTime.fromTime_t(0))
+
+        return cookie
+
+    # -------------------------------------------------------------------------
+
+    def _is_persistent(self, cookie):
+        return self.keep_session_cookies or not cookie.isSessionCookie()
+
+    # -------------------------------------------------------------------------
+
+    def _keyed(self, cookies):
+        """
+        Return cookies by the name, domain and path that identify them.
+
+        @param cookies (list) QNetworkCookie objects
+
+        @return (dict)
+        """
+
+        return dict(((str(c.name()), c.domain(), c.path()), c)
+                    for c in cookies)
+
+    # -------------------------------------------------------------------------
+
+    def _needs_compact(self):
+        return self._lines > max(COOKIE_JAR_COMPACT_LINES,
+                2 * len(self.allCookies()))
+
+    # -------------------------------------------------------------------------
+
+    def _load(self):
+        """
+        Load cookies by replaying the lines of the file.
+        """
+
+        cookies = OrderedDict()
+
+        try:
+            f = open(self.path)
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+            return
+
+        with f:
+            for line in f:
+                self._lines += 1
+
+                for cookie in QNetworkCookie.parseCookies(line.strip()):
+                    key = (str(cookie.name()), cookie.domain(), cookie.path())
+
+                    cookies.pop(key, None)
+                    cookies[key] = cookie
+
+        self.setAllCookies(cookies.values())
+
+        if self.expire() or self._needs_compact():
+            self.compact()
+
+    # -------------------------------------------------------------------------
+
+    def setCookiesFromUrl(self, cookies, url):
+        """
+        Reimplemented from QNetworkCookieJar.
+
+        Only what the jar did with the cookies is saved: cookies it rejected
+        (for example ones set for a foreign domain) never reach the file.
+        """
+
+        before = self._keyed(self.allCookies())
+
+        # False when cookies were only removed, so the jar is checked anyway
+        accepted = super(FBCookieJar, self).setCookiesFromUrl(cookies, url)
+
+        after = self._keyed(self.allCookies())
+
+        changes = []
+        for key, cookie in after.iteritems():
+            old = before.get(key)
+
+            # cookies the jar added or replaced
+            if old is not None and old.toRawForm() == cookie.toRawForm():
+                continue
+
+            if not self._is_persistent(cookie):
+                # save an expired copy so a persistent cookie it replaced
+                # isn't restored on the next load
+                cookie = self._expired(cookie)
+
+            changes.append(cookie)
+
+        # cookies the jar removed, as they were set again already expired
+        for key, cookie in before.iteritems():
+            if key not in after:
+                changes.append(self._expired(cookie))
+
+        if changes:
+            self._append(changes)
+
+        return accepted
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def clear(self):
+        """
+        Remove all cookies from the jar and its file.
+        """
+
+        self.setAllCookies([])
+
+        self.compact()
+
+    # -------------------------------------------------------------------------
+
+    def compact(self):
+        """
+        Atomically rewrite the file with only the cookies in the jar.
+        """
+
+        cookies = [c for c in self.allCookies() if self._is_persistent(c)]
+
+        directory = os.path.dirname(self.path)
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+
+        try:
+            with os.fdopen(fd, "w") as f:
+                for cookie in cookies:
+                    f.write(str(cookie.toRawForm(QNetworkCookie.Full)) +
+                            "\n")
+
+            # rename can't replace an existing file on windows
+            if os.name == "nt" and os.path.exists(self.path):
+                os.remove(self.path)
+
+            os.rename(tmp_path, self.path)
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+            raise
+
+        self._lines = len(cookies)
+
+    # -------------------------------------------------------------------------
+
+    def expire(self):
+        """
+        Remove expired cookies from the jar.
+
+        @return (bool) True if any cookies were removed.
+        """
+
+        now = QDateTime.currentDateTime()
+        cookies = self.allCookies()
+        live = [c for c in cookies
+                if c.isSessionCookie() or c.expirationDate() > now]
+
+        if len(live) == len(cookies):
+            return False
+
+        self.setAllCookies(live)
+
+        return True
+
+
+# -----------------------------------------------------------------------------
+
+class FBNullCookieJar(QNetworkCookieJar):
+
+    """
+    A QNetworkCookieJar that never holds any cookies.
+    """
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def cookiesForUrl(self, url):
+        """
+        Reimplemented from QNetworkCookieJar.
+        """
+
+        return []
+
+    # -------------------------------------------------------------------------
+
+    def setCookiesFromUrl(self, cookies, url):
+        """
+        Reimplemented from QNetworkCookieJar.
+        """
+
+        return False
@@ -0,0 +1,856 @@
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+
+"""
+OAuth URL building, redirect routing, state and token storage. Nothing
+here needs QtWebKit, and only `get_oauth_url` and the default path of
+FBTokenStore need Qt, which they import when called.
+"""
+
+import errno
+import heapq
+import json
+import os
+import tempfile
+import time
+import urllib
+import urlparse
+
+from collections import deque
+
+from pyside_facebook.constants  import CACHE_DIR_NAME
+from pyside_facebook.constants  import OAUTH_STATE_MAX_SIZE
+from pyside_facebook.constants  import OAUTH_STATE_TTL
+from pyside_facebook.constants  import OAUTH_URL
+from pyside_facebook.constants  import OAUTH_URL_BUILDER_CACHE_SIZE
+from pyside_facebook.constants  import REDIRECT_URI
+from pyside_facebook.constants  import TOKEN_MIN_TTL
+from pyside_facebook.constants  import TOKEN_STORE_FILE_NAME
+from pyside_facebook.exceptions import FBAuthDialogInvalidParamException
+
+
+# -----------------------------------------------------------------------------
+# FUNCTIONS
+# -----------------------------------------------------------------------------
+
+# FBOAuthURLBuilder objects of build_oauth_url by params
+_oauth_url_builders = {}
+
+
+# -----------------------------------------------------------------------------
+
+def _check_oauth_params(app_id, redirect_uri, scope, state, response_type,
+        display, oauth_url):
+    """
+    Raise FBAuthDialogInvalidParamException if an OAuth param has the wrong
+    type.
+    """
+
+    if type(app_id) not in (str, unicode):
+        raise FBAuthDialogInvalidParamException(
+            "app_id must be `str` or `unicode` but was: %s" % type(app_id))
+
+    if type(redirect_uri) not in (type(None), str, unicode):
+        raise FBAuthDialogInvalidParamException(
+            "redirect_uri must be `None`, `str` or `unicode` but was: %s" %
+            type(redirect_uri))
+
+    if type(scope) not in (type(None), list):
+        raise FBAuthDialogInvalidParamException(
+            "scope must be `None` or `list` but was: %s" %
+            type(scope))
+
+    if type(state) not in (type(None), str, unicode):
+        raise FBAuthDialogInvalidParamException(
+            "state must be `None`, `str` or `unicode` but was: %s" %
+            type(state))
+
+    if type(response_type) not in (type(None), str, unicode):
+        raise FBAuthDialogInvalidParamException(
+            "response_type must be `None`, `str` or `unicode` but was: %s"
+            % type(response_type))
+
+    if type(display) not in (type(None), str, unicode):
+        raise FBAuthDialogInvalidParamException(
+            "display must be `None`, `str` or `unicode` but was: %s"
+            % type(display))
+
+    if type(oauth_url) not in (str, unicode):
+        raise FBAuthDialogInvalidParamException(
+            "oauth_url must be `str` or `unicode` but was: %s"
+            % type(oauth_url))
+
+
+# -----------------------------------------------------------------------------
+
+def get_oauth_url(app_id, redirect_uri, scope, state, response_type, display,
+        oauth_url=OAUTH_URL):
+    """
+    Return encoded OAuth URL with request params formated as GET params.
+
+    @param app_id        (str/uni)
+    @param redirect_uri  (str/uni)
+    @param scope         (list)
+    @param state         (str/uni)
+    @param response_type (str/uni)
+    @param display       (str/uni)
+    @param [oauth_url]   (str/uni)
+
+    @return (QUrl)
+    """
+
+    from PySide.QtCore import QUrl
+
+    _check_oauth_params(app_id, redirect_uri, scope, state, response_type,
+            display, oauth_url)
+
+    url = QUrl(oauth_url)
+
+    url.addQueryItem("client_id", app_id)
+    url.addQueryItem("redirect_uri", redirect_uri)
+    url.addQueryItem("response_type", response_type)
+    url.addQueryItem("display", display)
+
+    if scope:
+        _scope = ",".join(map(unicode, scope))
+
+        url.addQueryItem("scope", _scope)
+
+    if state:
+        url.addQueryItem("state", state)
+
+    return url
+
+
+# -----------------------------------------------------------------------------
+
+def build_oauth_url(app_id, redirect_uri=REDIRECT_URI, scope=None, state=None,
+        response_type="token", display="popup", oauth_url=OAUTH_URL):
+    """
+    Return an encoded OAuth URL like `get_oauth_url`, without any Qt objects.
+
+    The part of the URL that doesn't change with the state is built once per
+    set of params by FBOAuthURLBuilder and reused.
+
+    @return (str)
+
+    @raise FBAuthDialogInvalidParamException If a param has the wrong type.
+    """
+
+    # checked before the params are used as a key, which needs them hashable
+    _check_oauth_params(app_id, redirect_uri, scope, state, response_type,
+            display, oauth_url)
+
+    key = (app_id, redirect_uri, tuple(scope or ()), response_type, display,
+            oauth_url)
+
+    builder = _oauth_url_builders.get(key)
+
+    if builder is None:
+        if len(_oauth_url_builders) >= OAUTH_URL_BUILDER_CACHE_SIZE:
+            _oauth_url_builders.clear()
+
+        builder = _oauth_url_builders[key] = FBOAuthURLBuilder(app_id,
+                redirect_uri, scope, response_type, display, oauth_url)
+
+    return builder.url(state)
+
+
+# -----------------------------------------------------------------------------
+# CLASSES
+# -----------------------------------------------------------------------------
+
+class FBURLRouter(object):
+
+    """
+    Maps the top-level URLs visited while the OAuth Dialog is open onto the
+    FBAuthDialog signal each one should fire.
+
+    Routes are compiled once into a dispatch table keyed by URL path, and the
+    result for every distinct URL is memoized so that a URL seen again (for
+    example a repeated bad password) is not parsed a second time.
+    """
+
+    """
+    Routes by URL path. Each path maps to an ordered tuple of
+    (trigger key, route method name) pairs; the first trigger key present in
+    the URL's query or fragment items selects the route.
+    """
+
+    ROUTES = {
+        "/login.php": (
+            ("skip_api_login", "_route_authFormReady"),
+            ("login_attempt", "_route_authFail"),
+        ),
+        "/dialog/permissions.request": (
+            ("from_login", "_route_authSuccess"),
+        ),
+    }
+
+    """
+    Routes for the path of the redirect URI.
+    """
+
+    REDIRECT_ROUTES = (
+        ("access_token", "_route_permsAuthorizedAccessToken"),
+        ("code", "_route_permsAuthorizedOAuthCode"),
+    )
+
+    """
+    Signals of routes to pages holding the login form. URLs are routed as
+    soon as they're committed, but these signals promise a form that's there
+    to be filled in, so they are only emitted once the page has loaded.
+    """
+
+    LOAD_SIGNALS = frozenset(["signal_authFormReady", "signal_authFail"])
+
+    """
+    Signals of routes to the redirect URI, which end the authentication and
+    carry the state back as their last argument.
+    """
+
+    REDIRECT_SIGNALS = frozenset(["signal_permsAuthorizedAccessToken",
+        "signal_permsAuthorizedOAuthCode", "signal_permsNotAuthorized"])
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, redirect_uri=REDIRECT_URI, cache_size=64):
+        """
+        Instantiate FBURLRouter object.
+
+        @param [redirect_uri] (str) Redirect URI the OAuth Dialog sends the
+                                    user to when it's done.
+        @param [cache_size]   (int) Number of distinct URLs to memoize routes
+                                    for. Set to 0 to disable memoization.
+        """
+
+        self.redirect_uri = redirect_uri
+
+        self._cache = {}
+        self._cache_size = cache_size
+
+        routes = self.ROUTES.copy()
+        routes[urlparse.urlsplit(redirect_uri).path] = self.REDIRECT_ROUTES
+
+        # bind route methods once so dispatching is a pair of dict lookups
+        self._table = {}
+        for path, path_routes in routes.iteritems():
+            self._table[path] = tuple(
+                (key, getattr(self, name)) for key, name in path_routes)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _parse_url(self, url):
+        """
+        Split URL into its path and a dict of its query and fragment items.
+        Fragment items take precedence over query items of the same name.
+
+        @param url (str) Encoded URL.
+
+        @return (tuple) (path, items)
+        """
+
+        _, _, path, query, fragment = urlparse.urlsplit(url)
+
+        items = dict(urlparse.parse_qsl(query, True))
+
+        if fragment:
+            items.update(urlparse.parse_qsl(fragment, True))
+
+        return path, items
+
+    # -------------------------------------------------------------------------
+
+    def _route_authFormReady(self, items, state):
+        return "signal_authFormReady", (state,)
+
+    # -------------------------------------------------------------------------
+
+    def _route_authFail(self, items, state):
+        return "signal_authFail", (state,)
+
+    # -------------------------------------------------------------------------
+
+    def _route_authSuccess(self, items, state):
+        return "signal_authSuccess", (state,)
+
+    # -------------------------------------------------------------------------
+
+    def _route_permsAuthorizedAccessToken(self, items, state):
+        expires_in = int(items.get("expires_in") or 0)
+
+        return "signal_permsAuthorizedAccessToken", (items["access_token"],
+                expires_in, state)
+
+    # -------------------------------------------------------------------------
+
+    def _route_permsAuthorizedOAuthCode(self, items, state):
+        return "signal_permsAuthorizedOAuthCode", (items["code"], state)
+
+    # -------------------------------------------------------------------------
+
+    def _route_permsNotAuthorized(self, items, state):
+        return "signal_permsNotAuthorized", (items["error"],
+                items.get("error_reason", ""),
+                items.get("error_description", ""), state)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def route_body(self, body):
+        """
+        Return the signal name and signal arguments for a page body holding
+        a Graph API OAuthException, which is what the OAuth Dialog shows
+        instead of the login form when its request is invalid (for example
+        an invalid app ID).
+
+        @param body (str/uni) Plain text of the page.
+
+        @return (tuple/None) (signal name, args) or None when the body isn't
+                             an OAuthException.
+        """
+
+        if not body.lstrip().startswith("{"):
+            return None
+
+        try:
+            error = json.loads(body).get("error")
+        except (ValueError, AttributeError):
+            return None
+
+        if not isinstance(error, dict) or error.get("type") != \
+                "OAuthException":
+            return None
+
+        return "signal_errorOAuthException", (error.get("message", ""),
+                int(error.get("code") or 0))
+
+    # -------------------------------------------------------------------------
+
+    def route(self, url):
+        """
+        Return the signal name and signal arguments the URL routes to.
+
+        @param url (str) Encoded URL.
+
+        @return (tuple/None) (signal name, args) or None when the URL does
+                             not match any route.
+        """
+
+        try:
+            return self._cache[url]
+        except KeyError:
+            pass
+
+        path, items = self._parse_url(url)
+        state = items.get("state", "")
+
+        result = None
+
+        if "error" in items:
+            # user canceled before granting permissions
+            result = self._route_permsNotAuthorized(items, state)
+        else:
+            for key, route in self._table.get(path, ()):
+                if key in items:
+                    result = route(items, state)
+                    break
+
+        if self._cache_size:
+            if len(self._cache) >= self._cache_size:
+                self._cache.clear()
+
+            self._cache[url] = result
+
+        return result
+
+
+# -----------------------------------------------------------------------------
+
+class FBOAuthURLBuilder(object):
+
+    """
+    Builds OAuth URLs that only differ in their state, such as the login
+    links of many sessions.
+
+    The params are checked and encoded once, so each URL is a single string
+    concatenation. Unlike `get_oauth_url` nothing here needs Qt.
+    """
+
+    # characters left as they are in encoded params, matching QUrl
+    SAFE_CHARS = ":/,"
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, app_id, redirect_uri=REDIRECT_URI, scope=None,
+            response_type="token", display="popup", oauth_url=OAUTH_URL):
+        """
+        Instantiate FBOAuthURLBuilder object.
+
+        @param app_id          (str/uni)
+        @param [redirect_uri]  (str/uni)
+        @param [scope]         (list)
+        @param [response_type] (str/uni)
+        @param [display]       (str/uni)
+        @param [oauth_url]     (str/uni)
+
+        @raise FBAuthDialogInvalidParamException If a param has the wrong
+                                                 type.
+        """
+
+        # the same checks as get_oauth_url, made once
+        _check_oauth_params(app_id, redirect_uri, scope, None, response_type,
+                display, oauth_url)
+
+        items = [
+            ("client_id", app_id),
+            ("redirect_uri", redirect_uri),
+            ("response_type", response_type),
+            ("display", display),
+        ]
+
+        if scope:
+            items.append(("scope", ",".join(map(unicode, scope))))
+
+        self.prefix = "%s?%s" % (self._encode(oauth_url), "&".join(
+                "%s=%s" % (key, self._encode(value or ""))
+                for key, value in items))
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _encode(self, value):
+        if isinstance(value, unicode):
+            value = value.encode("utf-8")
+
+        return urllib.quote(value, self.SAFE_CHARS)
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def url(self, state=None):
+        """
+        Return the encoded OAuth URL.
+
+        @param [state] (str/uni)
+
+        @return (str)
+
+        @raise FBAuthDialogInvalidParamException If the state has the wrong
+                                                 type.
+        """
+
+        if type(state) not in (type(None), str, unicode):
+            raise FBAuthDialogInvalidParamException(
+                "state must be `None`, `str` or `unicode` but was: %s" %
+                type(state))
+
+        if not state:
+            return self.prefix
+
+        return "%s&state=%s" % (self.prefix, self._encode(state))
+
+
+# -----------------------------------------------------------------------------
+
+class FBStateRegistry(object):
+
+    """
+    Issues random OAuth `state` values and validates the ones that come back
+    in the dialog's signals, to reject forged redirects (CSRF). Pass it as
+    the `state_registry` of FBAuthDialog to have its redirects validated.
+
+    States are single use and expire after `ttl` seconds. Validation is a
+    dict lookup, and expired states are dropped in the order they were
+    issued, as they all live equally long.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, ttl=OAUTH_STATE_TTL, max_size=OAUTH_STATE_MAX_SIZE):
+        """
+        Instantiate FBStateRegistry object.
+
+        @param [ttl]      (int) Seconds each state stays valid.
+        @param [max_size] (int) States held at most, the oldest are dropped
+                                first.
+        """
+
+        self.ttl = ttl
+        self.max_size = max_size
+
+        # state => (expires_at, data)
+        self._states = {}
+
+        # (expires_at, state) in the order states were issued
+        self._expiry = deque()
+
+    # -------------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self._states)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _purge(self, now):
+        """
+        Drop expired states, and the oldest states over `max_size`.
+        """
+
+        expiry = self._expiry
+        states = self._states
+
+        while expiry and (expiry[0][0] <= now or
+                len(states) > self.max_size):
+            expires_at, state = expiry.popleft()
+
+            # skip states that have been validated since
+            entry = states.get(state)
+
+            if entry is not None and entry[0] == expires_at:
+                del states[state]
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def clear(self):
+        self._states.clear()
+        self._expiry.clear()
+
+    # -------------------------------------------------------------------------
+
+    def issue(self, data=None):
+        """
+        Return a new random state.
+
+        @param [data] (object) Returned by `pop` with the state, such as
+                               the session the state was issued for.
+
+        @return (str)
+        """
+
+        now = time.time()
+        expires_at = now + self.ttl
+
+        state = os.urandom(16).encode("hex")
+
+        self._states[state] = (expires_at, data)
+        self._expiry.append((expires_at, state))
+
+        self._purge(now)
+
+        return state
+
+    # -------------------------------------------------------------------------
+
+    def pop(self, state, default=None):
+        """
+        Validate a state and return the data it was issued with. The state
+        can't be used again.
+
+        @param state     (str)
+        @param [default] (object) Returned if the state is not valid.
+
+        @return (object)
+        """
+
+        entry = self._states.pop(state, None)
+
+        if entry is None or entry[0] <= time.time():
+            return default
+
+        return entry[1]
+
+    # -------------------------------------------------------------------------
+
+    def validate(self, state):
+        """
+        Return whether a state was issued and hasn't expired. The state
+        can't be used again.
+
+        @param state (str)
+
+        @return (bool)
+        """
+
+        entry = self._states.pop(state, None)
+
+        return entry is not None and entry[0] > time.time()
+
+
+# -----------------------------------------------------------------------------
+
+class FBTokenStore(object):
+
+    """
+    A file-backed store of access tokens keyed by app ID and the set of
+    permissions (scope) each token was granted.
+
+    The file is only read the first time the store is used and is always
+    rewritten atomically, so a crash can never leave a half written file.
+    Expired tokens are dropped using an index ordered by expiry time.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, path=None, min_ttl=TOKEN_MIN_TTL):
+        """
+        Instantiate FBTokenStore object.
+
+        @param [path]    (str) File tokens are stored in. Defaults to a
+                               `pyside-facebook` folder in the platform's data
+                               location.
+        @param [min_ttl] (int) Tokens expiring within this many seconds are
+                               treated as expired.
+        """
+
+        if path is None:
+            from PySide.QtGui import QDesktopServices
+
+            path = os.path.join(QDesktopServices.storageLocation(
+                    QDesktopServices.DataLocation), CACHE_DIR_NAME,
+                    TOKEN_STORE_FILE_NAME)
+
+        self.path = path
+        self.min_ttl = min_ttl
+
+        # app_id => {frozenset(scope) => (access_token, expires_at)}, loaded
+        # from file on first use
+        self._tokens = None
+
+        # heap of (expires_at, app_id, scope) for tokens that expire
+        self._expiry = []
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _index(self, app_id, scope, access_token, expires_at):
+        """
+        Add token to the in-memory store and expiry index.
+        """
+
+        self._tokens.setdefault(app_id, {})[scope] = (access_token,
+                expires_at)
+
+        if expires_at:
+            heapq.heappush(self._expiry, (expires_at, app_id, scope))
+
+    # -------------------------------------------------------------------------
+
+    def _load(self):
+        """
+        Load tokens from file unless they have already been loaded.
+        """
+
+        if self._tokens is not None:
+            return
+
+        self._tokens = {}
+        self._expiry = []
+
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+            return
+        except ValueError:
+            # corrupt file, start over
+            return
+
+        for entry in entries:
+            self._index(entry["app_id"], frozenset(entry["scope"]),
+                    entry["access_token"], entry["expires_at"])
+
+        self._purge()
+
+    # -------------------------------------------------------------------------
+
+    def _purge(self):
+        """
+        Remove tokens that are about to expire.
+
+        @return (bool) True if any tokens were removed.
+        """
+
+        deadline = time.time() + self.min_ttl
+        purged = False
+
+        while self._expiry and self._expiry[0][0] <= deadline:
+            expires_at, app_id, scope = heapq.heappop(self._expiry)
+
+            tokens = self._tokens.get(app_id, {})
+
+            # skip index entries for tokens that have since been replaced
+            if scope in tokens and tokens[scope][1] == expires_at:
+                del tokens[scope]
+                purged = True
+
+                if not tokens:
+                    del self._tokens[app_id]
+
+        return purged
+
+    # -------------------------------------------------------------------------
+
+    def _save(self):
+        """
+        Atomically replace the store's file with the in-memory tokens.
+        """
+
+        entries = []
+        for app_id, tokens in self._tokens.iteritems():
+            for scope, (access_token, expires_at) in tokens.iteritems():
+                entries.append({
+                    "app_id": app_id,
+                    "scope": sorted(scope),
+                    "access_token": access_token,
+                    "expires_at": expires_at,
+                })
+
+        directory = os.path.dirname(self.path) or "."
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # rename can't replace an existing file on windows
+            if os.name == "nt" and os.path.exists(self.path):
+                os.remove(self.path)
+
+            os.rename(tmp_path, self.path)
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+            raise
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    def clear(self):
+        """
+        Remove all tokens from the store.
+        """
+
+        self._tokens = {}
+        self._expiry = []
+
+        self._save()
+
+    # -------------------------------------------------------------------------
+
+    def get(self, app_id, scope=None):
+        """
+        Return the longest lived valid token of the app that was granted at
+        least the permissions in `scope`.
+
+        @param app_id  (str)
+        @param [scope] (list) Permissions the token must have been granted.
+
+        @return (tuple/None) (access_token, expires_in) or None if no stored
+                             token fits. expires_in is 0 for tokens that
+                             never expire.
+        """
+
+        self._load()
+
+        if self._purge():
+            self._save()
+
+        scope = frozenset(scope or [])
+        best = None
+
+        for token_scope, token in self._tokens.get(app_id, {}).iteritems():
+            if not scope <= token_scope:
+                continue
+
+            # tokens that never expire (expires_at of 0) beat all others
+            if best is None or (best[1] and (not token[1] or
+                    token[1] > best[1])):
+                best = token
+
+        if best is None:
+            return None
+
+        access_token, expires_at = best
+
+        if not expires_at:
+            return access_token, 0
+
+        return access_token, int(expires_at - time.time())
+
+    # -------------------------------------------------------------------------
+
+    def put(self, app_id, scope, access_token, expires_in):
+        """
+        Store a token, replacing any token of the app with the same scope.
+
+        @param app_id       (str)
+        @param scope        (list) Permissions the token was granted.
+        @param access_token (str)
+        @param expires_in   (int)  Seconds until the token expires or 0 if it
+                                   never expires.
+        """
+
+        self._load()
+
+        expires_at = time.time() + expires_in if expires_in else 0
+
+        self._index(app_id, frozenset(scope or []), access_token, expires_at)
+        self._purge()
+
+        self._save()
+
+    # -------------------------------------------------------------------------
+
+    def remove(self, app_id, scope=None):
+        """
+        Remove stored tokens of an app.
+
+        @param app_id  (str)
+        @param [scope] (list) If set, only the token with exactly this scope
+                              is removed.
+        """
+
+        self._load()
+
+        if scope is None:
+            self._tokens.pop(app_id, None)
+        else:
+            self._tokens.get(app_id, {}).pop(frozenset(scope), None)
+
+        self._save()
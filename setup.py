@@ -19,7 +19,7 @@ setup(
     author = "Brandon Orther",
     author_email = "an.able.coder@gmail.com",
 
-    py_modules=[
+    packages=[
         'pyside_facebook',
     ],
 
@@ -0,0 +1,710 @@
+# This file is part of PySide-Facebook.
+# Copyright (c) 2012 Brandon Orther. All rights reserved.
+#
+# The full license is available in the LICENSE file that was distributed with
+# this source code.
+#
+# Author: Brandon Orther <an.able.coder@gmail.com>
+
+
+"""
+A local stand-in for Facebook's OAuth Dialog that reproduces the redirect
+sequences recorded in `logs/login.txt`, along with a few Graph API
+endpoints, so FBAuthDialog and FBGraphAPI can be tested and benchmarked
+without a network connection or a real Facebook account.
+"""
+
+import cgi
+import hashlib
+import json
+import struct
+import threading
+import time
+import urllib
+import urlparse
+import zlib
+
+from BaseHTTPServer import BaseHTTPRequestHandler
+from BaseHTTPServer import HTTPServer
+from SocketServer   import ThreadingMixIn
+
+from PySide.QtCore import QObject
+
+# -----------------------------------------------------------------------------
+# CONSTANTS
+# -----------------------------------------------------------------------------
+
+APP_ID = "262499290528925"
+APP_SECRET = "FAKE_APP_SECRET"
+EMAIL = "test@example.com"
+PASSWORD = "secret"
+
+ACCESS_TOKEN = "FAKE_ACCESS_TOKEN"
+OAUTH_CODE = "FAKE_OAUTH_CODE"
+EXPIRES_IN = 5183999
+
+# token codes and tokens are exchanged for at /oauth/access_token
+LONG_LIVED_ACCESS_TOKEN = "FAKE_LONG_LIVED_ACCESS_TOKEN"
+LONG_LIVED_EXPIRES_IN = 5184000
+
+INVALID_APP_ID_ERROR = {
+    "error": {
+        "message": "Error validating application. Invalid application ID.",
+        "type": "OAuthException",
+        "code": 101,
+    },
+}
+
+# name of the cookie set once a user has logged in
+SESSION_COOKIE = "c_user"
+
+# Graph API object returned for /me
+ME = {"id": "100000000000001", "name": "Test User"}
+
+# edge returned for /me/friends, 25 per page unless a limit is given
+FRIENDS = [{"id": str(200000000000000 + i), "name": "Friend %d" % i}
+           for i in xrange(60)]
+
+# picture type => pixel size, as served by /<id>/picture
+PICTURE_SIZES = {"square": 50, "small": 50, "normal": 100, "large": 200}
+
+INVALID_TOKEN_ERROR = {
+    "error": {
+        "message": "Invalid OAuth access token.",
+        "type": "OAuthException",
+        "code": 190,
+    },
+}
+
+LOGIN_FORM_HTML = """<html><body>
+<p>%(error)s</p>
+<form id="login_form" method="post" action="/login.php?%(query)s">
+<input id="email" name="email" type="text">
+<input id="pass" name="pass" type="password">
+<input type="submit" name="login" value="Log In">
+</form>
+<a id="cancel" href="%(cancel_url)s">Cancel</a>
+</body></html>"""
+
+PERMISSIONS_HTML = """<html><body>
+<form id="allow_form" method="post" action="/dialog/permissions.request?%(query)s">
+<input type="hidden" name="grant" value="1">
+<input type="submit" value="Allow">
+</form>
+<form id="deny_form" method="post" action="/dialog/permissions.request?%(query)s">
+<input type="hidden" name="grant" value="0">
+<input type="submit" value="Don't Allow">
+</form>
+</body></html>"""
+
+
+# -----------------------------------------------------------------------------
+# CLASSES
+# -----------------------------------------------------------------------------
+
+class FakeFacebookRequestHandler(BaseHTTPRequestHandler):
+
+    """
+    Serves the pages and redirects of the OAuth Dialog.
+
+    Every URL carries the original OAuth request params in its query so the
+    server doesn't need to keep any per-session state.
+    """
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _params(self):
+        """
+        Return the query items of the request URL.
+
+        @return (dict)
+        """
+
+        return dict(urlparse.parse_qsl(urlparse.urlsplit(self.path).query,
+                True))
+
+    # -------------------------------------------------------------------------
+
+    def _oauth_query(self, params, **extra):
+        """
+        Return an encoded query carrying the OAuth request params along.
+        """
+
+        keys = ("client_id", "redirect_uri", "response_type", "state",
+                "scope", "display")
+
+        items = [(k, params[k]) for k in keys if k in params]
+        items.extend(sorted(extra.items()))
+
+        return urllib.urlencode(items)
+
+    # -------------------------------------------------------------------------
+
+    def _send(self, status, body="", content_type="text/html", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+
+        for name, value in headers:
+            self.send_header(name, value)
+
+        self.end_headers()
+        self.wfile.write(body)
+
+    # -------------------------------------------------------------------------
+
+    def _redirect(self, url, headers=()):
+        self._send(302, headers=[("Location", url)] + list(headers))
+
+    # -------------------------------------------------------------------------
+
+    def _redirect_uri_result(self, params):
+        """
+        Return the redirect URI with the token or code appended, the way
+        facebook sends users back after they authorized the app.
+        """
+
+        state = params.get("state")
+
+        if params.get("response_type") == "code":
+            items = [("code", OAUTH_CODE)]
+            separator = "?"
+        else:
+            items = [("access_token", ACCESS_TOKEN),
+                     ("expires_in", EXPIRES_IN)]
+            separator = "#"
+
+        if state:
+            items.append(("state", state))
+
+        return params["redirect_uri"] + separator + urllib.urlencode(items)
+
+    # -------------------------------------------------------------------------
+
+    def _redirect_uri_denied(self, params):
+        items = [
+            ("error_reason", "user_denied"),
+            ("error", "access_denied"),
+            ("error_description", "The user denied your request."),
+        ]
+
+        if params.get("state"):
+            items.append(("state", params["state"]))
+
+        return params["redirect_uri"] + "?" + urllib.urlencode(items)
+
+    # -------------------------------------------------------------------------
+
+    def _graph(self, path, params):
+        """
+        Answer a Graph API call, the way graph.facebook.com would.
+        """
+
+        self.server.graph_requests += 1
+
+        if "batch" in params:
+            status, data = 200, self._graph_batch(params)
+        else:
+            status, data = self._graph_response(path, params)
+
+        body = json.dumps(data)
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+
+        if status != 200:
+            self._send(status, body, "text/javascript")
+        elif self.headers.get("If-None-Match") == etag:
+            self._send(304, headers=[("ETag", etag)])
+        else:
+            self._send(status, body, "text/javascript", [("ETag", etag)])
+
+    # -------------------------------------------------------------------------
+
+    def _graph_batch(self, params):
+        """
+        Return the responses to the operations of a batch request. JSONPath
+        references between operations are not supported.
+
+        @return (list)
+        """
+
+        responses = []
+
+        for operation in json.loads(params["batch"]):
+            url = urlparse.urlsplit("/" + operation["relative_url"])
+
+            op_params = {"access_token": params.get("access_token")}
+            op_params.update(urlparse.parse_qsl(url.query, True))
+            op_params.update(urlparse.parse_qsl(operation.get("body", ""),
+                    True))
+
+            status, data = self._graph_response(url.path, op_params)
+
+            responses.append({
+                "code": status,
+                "headers": [{"name": "Content-Type",
+                             "value": "text/javascript"}],
+                "body": json.dumps(data),
+            })
+
+        return responses
+
+    # -------------------------------------------------------------------------
+
+    def _graph_page(self, path, params, items):
+        """
+        Return a cursor-paged page of an edge.
+
+        @return (dict)
+        """
+
+        start = int(params.get("after") or 0)
+        limit = int(params.get("limit") or 25)
+
+        page = {"data": items[start:start + limit], "paging": {}}
+
+        if start + limit < len(items):
+            query = dict(params, after=start + limit)
+
+            page["paging"]["next"] = "%s%s?%s" % (self.server.url, path,
+                    urllib.urlencode(sorted(query.items())))
+
+        return page
+
+    # -------------------------------------------------------------------------
+
+    def _graph_video(self, params):
+        """
+        Answer a video upload, either in one go or in chunks of
+        `video_chunk_size` bytes with the resumable upload protocol.
+
+        @return (tuple) (status, data)
+        """
+
+        server = self.server
+        phase = params.get("upload_phase")
+
+        if phase is None:
+            server.uploads.append(params["source"])
+
+            return 200, {"id": "VIDEO_%d" % len(server.uploads)}
+
+        if phase == "start":
+            session_id = str(len(server.video_sessions) + 1)
+            size = int(params["file_size"])
+
+            server.video_sessions[session_id] = [size, ""]
+
+            return 200, {
+                "upload_session_id": session_id,
+                "video_id": "VIDEO_" + session_id,
+                "start_offset": "0",
+                "end_offset": str(min(server.video_chunk_size, size)),
+            }
+
+        size, data = server.video_sessions[params["upload_session_id"]]
+
+        if phase == "transfer":
+            if server.fail_transfers:
+                server.fail_transfers -= 1
+
+                return 500, {"error": {
+                    "message": "An unexpected error has occurred.",
+                    "type": "OAuthException",
+                    "code": 2,
+                }}
+
+            if int(params["start_offset"]) != len(data):
+                return 400, {"error": {"message": "Bad start offset",
+                        "code": 6000}}
+
+            data += params["video_file_chunk"]
+            server.video_sessions[params["upload_session_id"]][1] = data
+
+            return 200, {
+                "start_offset": str(len(data)),
+                "end_offset": str(min(len(data) + server.video_chunk_size,
+                        size)),
+            }
+
+        # finish
+        server.uploads.append(data)
+
+        return 200, {"success": len(data) == size}
+
+    # -------------------------------------------------------------------------
+
+    def _graph_access_token(self, params):
+        """
+        Exchange a code or a token for a long lived token.
+
+        @return (tuple) Status and decoded body.
+        """
+
+        self.server.token_exchanges += 1
+        self.server.token_exchange_params = params
+
+        if (params.get("client_id") != self.server.app_id or
+                params.get("client_secret") != APP_SECRET):
+            return 400, {"error": {
+                "message": "Error validating client secret.",
+                "type": "OAuthException",
+                "code": 1,
+            }}
+
+        if params.get("grant_type") == "fb_exchange_token":
+            if params.get("fb_exchange_token") not in (ACCESS_TOKEN,
+                    LONG_LIVED_ACCESS_TOKEN):
+                return 400, INVALID_TOKEN_ERROR
+
+        elif params.get("code") != OAUTH_CODE:
+            return 400, {"error": {
+                "message": "Invalid verification code format.",
+                "type": "OAuthException",
+                "code": 100,
+            }}
+
+        return 200, {
+            "access_token": LONG_LIVED_ACCESS_TOKEN,
+            "token_type": "bearer",
+            "expires_in": LONG_LIVED_EXPIRES_IN,
+        }
+
+    # -------------------------------------------------------------------------
+
+    def _graph_response(self, path, params):
+        """
+        Return the status and decoded body of a Graph API call.
+
+        @return (tuple)
+        """
+
+        if path == "/oauth/access_token":
+            return self._graph_access_token(params)
+
+        if params.get("access_token") not in (ACCESS_TOKEN,
+                LONG_LIVED_ACCESS_TOKEN):
+            return 400, INVALID_TOKEN_ERROR
+
+        if path == "/me":
+            return 200, ME
+
+        if path == "/me/friends":
+            return 200, self._graph_page(path, params, FRIENDS)
+
+        if path == "/me/photos" and "source" in params:
+            self.server.uploads.append(params["source"])
+
+            return 200, {"id": "PHOTO_%d" % len(self.server.uploads)}
+
+        if path == "/me/videos":
+            return self._graph_video(params)
+
+        return 404, {"error": {
+            "message": "Unknown path components: %s" % path,
+            "type": "OAuthException",
+            "code": 2500,
+        }}
+
+    # -------------------------------------------------------------------------
+
+    def _picture(self, path, params):
+        """
+        Redirect a picture request to the image, the way facebook redirects
+        to its CDN.
+        """
+
+        object_id = path.split("/")[1]
+
+        if "width" in params:
+            size = "%sx%s" % (params["width"], params["height"])
+        else:
+            size = PICTURE_SIZES.get(params.get("type"), 50)
+            size = "%sx%s" % (size, size)
+
+        self._redirect("/images/%s_%s.png" % (object_id, size))
+
+    # -------------------------------------------------------------------------
+
+    def _image(self, path):
+        """
+        Send a blank PNG of the size named in `path`.
+        """
+
+        self.server.image_requests += 1
+
+        width, height = [int(n) for n in
+                path.rsplit("_", 1)[1][:-len(".png")].split("x")]
+
+        def chunk(kind, data):
+            return (struct.pack(">I", len(data)) + kind + data +
+                    struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+        body = "".join([
+            "\x89PNG\r\n\x1a\n",
+            chunk("IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0,
+                0)),
+            chunk("IDAT", zlib.compress(("\0" + "\xff" * width) * height)),
+            chunk("IEND", ""),
+        ])
+
+        self._send(200, body, "image/png")
+
+    # -------------------------------------------------------------------------
+
+    def _logged_in(self):
+        return SESSION_COOKIE + "=" in (self.headers.get("Cookie") or "")
+
+    # -------------------------------------------------------------------------
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+
+        path = urlparse.urlsplit(self.path).path
+        params = self._params()
+
+        if path == "/oauth/authorize":
+            if params.get("client_id") != self.server.app_id:
+                self._send(400, json.dumps(INVALID_APP_ID_ERROR),
+                        "text/javascript")
+
+            elif self._logged_in():
+                # live session, skip straight to the redirect URI
+                self._redirect(self._redirect_uri_result(params))
+
+            else:
+                self._redirect("/login.php?" + self._oauth_query(params,
+                        api_key=params["client_id"], skip_api_login=1))
+
+        elif path == "/login.php":
+            error = ""
+            if "login_attempt" in params:
+                error = "Incorrect password."
+
+            self._send(200, LOGIN_FORM_HTML % {
+                "error": error,
+                "query": self._oauth_query(params, login_attempt=1),
+                "cancel_url": self._redirect_uri_denied(params),
+            })
+
+        elif path == "/dialog/permissions.request":
+            self._send(200, PERMISSIONS_HTML % {
+                "query": self._oauth_query(params),
+            })
+
+        elif path == "/connect/login_success.html":
+            self._send(200, "Success")
+
+        elif path.endswith("/picture"):
+            self._picture(path, params)
+
+        elif path.startswith("/images/"):
+            self._image(path)
+
+        else:
+            self._graph(path, params)
+
+    # -------------------------------------------------------------------------
+
+    def do_POST(self):
+        time.sleep(self.server.delay)
+
+        path = urlparse.urlsplit(self.path).path
+        params = self._params()
+
+        if self.headers.get("Content-Type", "").startswith("multipart/"):
+            fields = cgi.FieldStorage(self.rfile, self.headers,
+                    environ={"REQUEST_METHOD": "POST"})
+            form = dict((key, fields[key].value) for key in fields.keys())
+        else:
+            length = int(self.headers.get("Content-Length") or 0)
+            form = dict(urlparse.parse_qsl(self.rfile.read(length), True))
+
+        if path == "/login.php":
+            if form.get("pass") != self.server.password:
+                self._redirect("/login.php?" + self._oauth_query(params,
+                        login_attempt=1))
+            else:
+                self._redirect("/dialog/permissions.request?" +
+                        self._oauth_query(params,
+                            _path="permissions.request", from_login=1),
+                        [("Set-Cookie", "%s=1; path=/" % SESSION_COOKIE)])
+
+        elif path == "/dialog/permissions.request":
+            if form.get("grant") == "1":
+                self._redirect(self._redirect_uri_result(params))
+            else:
+                self._redirect(self._redirect_uri_denied(params))
+
+        else:
+            params.update(form)
+
+            self._graph(path, params)
+
+    # -------------------------------------------------------------------------
+
+    def log_message(self, format, *args):
+        pass
+
+
+# -----------------------------------------------------------------------------
+
+class FakeFacebookServer(ThreadingMixIn, HTTPServer):
+
+    """
+    Threaded HTTP server running FakeFacebookRequestHandler on 127.0.0.1.
+    """
+
+    daemon_threads = True
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, port=0, app_id=APP_ID, password=PASSWORD, delay=0):
+        """
+        Instantiate FakeFacebookServer object.
+
+        @param [port]     (int)   Port to listen on, 0 for any free port.
+        @param [app_id]   (str)   The only valid app ID.
+        @param [password] (str)   The only valid password.
+        @param [delay]    (float) Seconds to wait before answering each
+                                  request, to simulate a slow network.
+        """
+
+        HTTPServer.__init__(self, ("127.0.0.1", port),
+                FakeFacebookRequestHandler)
+
+        self.app_id = app_id
+        self.password = password
+        self.delay = delay
+
+        # Graph API round trips made, a batch request counting once
+        self.graph_requests = 0
+
+        # codes and tokens exchanged at /oauth/access_token, and the params
+        # of the last exchange
+        self.token_exchanges = 0
+        self.token_exchange_params = None
+
+        # images served, after the picture redirects
+        self.image_requests = 0
+
+        # contents of the photos and videos uploaded
+        self.uploads = []
+
+        # upload session ID => [file size, bytes received] of chunked video
+        # uploads, chunk size asked for and transfers to fail on purpose
+        self.video_sessions = {}
+        self.video_chunk_size = 64 * 1024
+        self.fail_transfers = 0
+
+        self._thread = None
+
+    # -------------------------------------------------------------------------
+    # PUBLIC METHODS
+    # -------------------------------------------------------------------------
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d" % self.server_address[1]
+
+    # -------------------------------------------------------------------------
+
+    def oauth_params(self, **oauth_params):
+        """
+        Return FBAuthDialog.set_oauth_params kwargs pointing at the server.
+
+        @param [oauth_params] (kwargs) Extra set_oauth_params kwargs.
+
+        @return (dict)
+        """
+
+        oauth_params.setdefault("app_id", self.app_id)
+        oauth_params["oauth_url"] = self.url + "/oauth/authorize"
+        oauth_params["redirect_uri"] = self.url + "/connect/login_success.html"
+
+        return oauth_params
+
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    # -------------------------------------------------------------------------
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+        self._thread.join()
+
+
+# -----------------------------------------------------------------------------
+
+class FakeFacebookUser(QObject):
+
+    """
+    Drives a FBAuthDialog the way a user would: fills in and submits the
+    login form once it's ready and then allows (or denies) the permissions.
+    """
+
+    # -------------------------------------------------------------------------
+    # METHODS
+    # -------------------------------------------------------------------------
+
+    def __init__(self, dialog, password=PASSWORD, allow=True):
+        """
+        Instantiate FakeFacebookUser object.
+
+        @param dialog     (FBAuthDialog)
+        @param [password] (str)  Password to log in with.
+        @param [allow]    (bool) Allow the requested permissions.
+        """
+
+        super(FakeFacebookUser, self).__init__(dialog)
+
+        self.password = password
+        self.allow = allow
+
+        self._dialog = dialog
+
+        # script to run once the current page has finished loading
+        self._script = None
+
+        dialog.signal_authFormReady.connect(self._slot_authFormReady)
+        dialog.signal_authSuccess.connect(self._slot_authSuccess)
+        dialog.loadFinished.connect(self._slot_loadFinished)
+
+    # -------------------------------------------------------------------------
+    # INTERNAL METHODS
+    # -------------------------------------------------------------------------
+
+    def _slot_authFormReady(self, state):
+        # the form has loaded by the time the signal is emitted
+        self._dialog.page().mainFrame().evaluateJavaScript(
+            "document.getElementById('email').value = %s;"
+            "document.getElementById('pass').value = %s;"
+            "document.getElementById('login_form').submit();"
+            % (json.dumps(EMAIL), json.dumps(self.password)))
+
+    # -------------------------------------------------------------------------
+
+    def _slot_authSuccess(self, state):
+        form = "allow_form" if self.allow else "deny_form"
+
+        self._script = "document.getElementById('%s').submit();" % form
+
+    # -------------------------------------------------------------------------
+
+    def _slot_loadFinished(self, ok):
+        # signal_authSuccess fires as soon as the permissions page's URL is
+        # committed, before the page has loaded, so scripts wait for the load
+        # to finish
+        script, self._script = self._script, None
+
+        if script:
+            self._dialog.page().mainFrame().evaluateJavaScript(script)
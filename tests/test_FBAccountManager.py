@@ -0,0 +1,188 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from PySide.QtCore    import QEventLoop
+from PySide.QtCore    import QTimer
+from PySide.QtGui     import QApplication
+from PySide.QtNetwork import QNetworkRequest
+
+from pyside_facebook import FBAccountManager
+from pyside_facebook import FBAuthDialogInvalidParamException
+
+from tests.fake_facebook import ACCESS_TOKEN
+from tests.fake_facebook import SESSION_COOKIE
+from tests.fake_facebook import FakeFacebookServer
+from tests.fake_facebook import FakeFacebookUser
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBAccountManagerTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+        self.manager = FBAccountManager(use_shared_cache=False)
+
+    def tearDown(self):
+        self.server.stop()
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_wait_for_signal(self, signal, start, timeout=10):
+        """
+        Call `start` and spin the event loop until `signal` is emitted.
+
+        @return (tuple/None) Arguments the signal was emitted with or None if
+                             it wasn't emitted in time.
+        """
+
+        received = []
+        loop = QEventLoop()
+
+        def slot(*args):
+            received.append(args)
+            loop.quit()
+
+        signal.connect(slot)
+        QTimer.singleShot(timeout * 1000, loop.quit)
+
+        start()
+
+        if not received:
+            loop.exec_()
+
+        signal.disconnect(slot)
+
+        return received[0] if received else None
+
+    # -------------------------------------------------------------------------
+
+    def helper_add_account(self, name):
+        account = self.manager.add_account(name)
+        account.dialog.set_oauth_params(**self.server.oauth_params())
+
+        return account
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_isolated_cookies(self):
+        alice = self.helper_add_account("alice")
+        bob = self.helper_add_account("bob")
+
+        # both dialogs share one network access manager
+        self.assertIs(alice.dialog.page().networkAccessManager(),
+                bob.dialog.page().networkAccessManager())
+
+        FakeFacebookUser(alice.dialog)
+
+        args = self.helper_wait_for_signal(
+                self.manager.signal_accountAuthorized,
+                alice.dialog.start_auth)
+
+        self.assertEqual(("alice", ACCESS_TOKEN), args[:2])
+        self.assertEqual(ACCESS_TOKEN, alice.access_token)
+
+        # the session cookie only went to alice's jar
+        self.assertIn(SESSION_COOKIE, [str(cookie.name())
+            for cookie in alice.cookie_jar.allCookies()])
+        self.assertEqual([], bob.cookie_jar.allCookies())
+
+        # so bob still has to log in
+        self.assertIsNotNone(self.helper_wait_for_signal(
+                bob.dialog.signal_authFormReady, bob.dialog.start_auth))
+        self.assertIsNone(bob.access_token)
+
+        stats = self.manager.stats()
+
+        self.assertEqual(2, stats["accounts"])
+        self.assertTrue(stats["per_account"]["alice"]["requests"] >
+                stats["per_account"]["bob"]["requests"] > 0)
+        self.assertEqual(1, stats["per_account"]["alice"]["cookies"])
+
+    # -------------------------------------------------------------------------
+
+    def test_add_remove_account(self):
+        self.manager.add_account("alice")
+
+        self.assertRaises(FBAuthDialogInvalidParamException,
+                self.manager.add_account, "alice")
+
+        self.manager.remove_account("alice")
+
+        self.assertIsNone(self.manager.account("alice"))
+        self.assertEqual([], self.manager.accounts())
+
+    # -------------------------------------------------------------------------
+
+    def test_account_names(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            manager = FBAccountManager(use_shared_cache=False,
+                    directory=os.path.join(directory, "profile"))
+
+            # names that would escape the directory or hide their files
+            for name in ("../alice", "alice/bob", "..", ".alice", "",
+                    "alice\n", None):
+                self.assertRaises(FBAuthDialogInvalidParamException,
+                        manager.add_account, name)
+
+            # e-mail addresses are fine
+            account = manager.add_account("alice.smith+1@example.com")
+            profile = os.path.join(directory, "profile")
+
+            self.assertEqual(profile, os.path.dirname(
+                    account.cookie_jar.path))
+            self.assertEqual(profile, os.path.dirname(
+                    account.token_store.path))
+        finally:
+            shutil.rmtree(directory)
+
+    # -------------------------------------------------------------------------
+
+    def test_authenticated_requests(self):
+        alice = self.helper_add_account("alice")
+
+        requests = []
+        self.manager.network_access_manager().signal_replyCreated.connect(
+                lambda reply: requests.append(reply.request()))
+
+        FakeFacebookUser(alice.dialog)
+
+        self.helper_wait_for_signal(self.manager.signal_accountAuthorized,
+                alice.dialog.start_auth)
+
+        # requests made with the account's cookies never use the cache
+        authenticated = [request for request in requests
+                if request.hasRawHeader("Cookie")]
+
+        self.assertTrue(authenticated)
+
+        for request in authenticated:
+            self.assertEqual(QNetworkRequest.AlwaysNetwork, request.attribute(
+                    QNetworkRequest.CacheLoadControlAttribute))
+            self.assertFalse(request.attribute(
+                    QNetworkRequest.CacheSaveControlAttribute))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,22 @@
 import sys
-import time
 import unittest
 
-from PySide.QtGui import QApplication
-from PySide.QtGui import QWidget
+from PySide.QtCore import QEventLoop
+from PySide.QtCore import QTimer
+from PySide.QtGui  import QApplication
+from PySide.QtGui  import QWidget
 
 from pyside_facebook import FBAuthDialog
 from pyside_facebook import FBAuthDialogInvalidParamException
+from pyside_facebook import FBStateRegistry
 from pyside_facebook import OAUTH_URL
 from pyside_facebook import REDIRECT_URI
 
+from tests.fake_facebook import ACCESS_TOKEN
+from tests.fake_facebook import EXPIRES_IN
+from tests.fake_facebook import FakeFacebookServer
+from tests.fake_facebook import FakeFacebookUser
+
 
 # -----------------------------------------------------------------------------
 # CONSTANTS
@@ -46,7 +53,7 @@ class FBAuthDialogTestCase(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        cls.app = QApplication(sys.argv)
+        cls.app = QApplication.instance() or QApplication(sys.argv)
 
         cls.parentWidget = QWidget()
 
@@ -84,6 +91,39 @@ class FBAuthDialogTestCase(unittest.TestCase):
             self.assertTrue(k in oauth_keys)
             self.assertEqual(oauth_params[k], oauth_vals[k])
 
+    # -------------------------------------------------------------------------
+
+    def helper_wait_for_signal(self, signal, start, timeout=10):
+        """
+        Call `start` and spin the event loop until `signal` is emitted.
+
+        @param signal    (Signal)
+        @param start     (callable)
+        @param [timeout] (int)     Seconds to wait for the signal.
+
+        @return (tuple/None) Arguments the signal was emitted with or None if
+                             it wasn't emitted in time.
+        """
+
+        received = []
+        loop = QEventLoop()
+
+        def slot(*args):
+            received.append(args)
+            loop.quit()
+
+        signal.connect(slot)
+        QTimer.singleShot(timeout * 1000, loop.quit)
+
+        start()
+
+        if not received:
+            loop.exec_()
+
+        signal.disconnect(slot)
+
+        return received[0] if received else None
+
     # -------------------------------------------------------------------------
     # TESTS
     # -------------------------------------------------------------------------
@@ -190,50 +230,147 @@ class FBAuthDialogTestCase(unittest.TestCase):
     # -------------------------------------------------------------------------
 
     def test_startAuth(self):
-        # setup temp variables for validating correct singals until I can find
-        # a more generic and general method for confirming signal fires
-        _errorOAuthException_code = None
-        _errorOAuthException_message = None
-        _urlChanged_url = None
-
-        def slot_urlChanged(url):
-            _urlChanged_url = url
-
-        # create slot to confirm proper OAuthException error signal raised
-        def slot_errorOAuthException(message, code):
-            _errorOAuthException_message = message
-            _errorOAuthException_code = code
+        server = FakeFacebookServer()
+        server.start()
 
         # setup widget to run tests with invalid app_id
         fbad = FBAuthDialog(FBAuthDialogTestCase.parentWidget,
-                app_id="INVALID")
-
-        # connect signals to slots
-        fbad.urlChanged.connect(slot_urlChanged)
-        fbad.signal_errorOAuthException.connect(slot_errorOAuthException)
+                use_shared_cache=False)
+        fbad.set_oauth_params(**server.oauth_params(app_id="INVALID"))
 
         # ---------------------------------------------------------------------
         # TESTS
         # ---------------------------------------------------------------------
 
-        fbad.start_auth()
+        args = self.helper_wait_for_signal(fbad.signal_errorOAuthException,
+                fbad.start_auth)
 
-        # wait for first urlChanged signal and then move onto tests
-        sleep_time_cur = 0
-        sleep_time_max = 10
-        sleep_time_step = 1
-        while _urlChanged_url is None:
-            if sleep_time_cur > sleep_time_max:
-                break
+        server.stop()
 
-            time.sleep(sleep_time_step)
+        self.assertIsNotNone(args)
 
-            sleep_time_cur += sleep_time_step
+        message, code = args
 
         self.assertEqual(FB_OAUTH_EXCEPTIONS["INVALID_APP_ID"]["code"],
-                _errorOAuthException_code)
+                code)
         self.assertEqual(FB_OAUTH_EXCEPTIONS["INVALID_APP_ID"]["message"],
-                _errorOAuthException_message)
+                message)
+
+    # -------------------------------------------------------------------------
+
+    def test_startAuth_formReady(self):
+        server = FakeFacebookServer()
+        server.start()
+
+        fbad = FBAuthDialog(FBAuthDialogTestCase.parentWidget,
+                use_shared_cache=False)
+        fbad.set_oauth_params(**server.oauth_params(state="TEST"))
+
+        forms = []
+
+        # the form can be filled in as soon as the signal is emitted
+        fbad.signal_authFormReady.connect(lambda state: forms.append(
+                fbad.page().mainFrame().findFirstElement("#login_form")))
+
+        args = self.helper_wait_for_signal(fbad.signal_authFormReady,
+                fbad.start_auth)
+
+        server.stop()
+
+        self.assertEqual(("TEST",), args)
+        self.assertFalse(forms[0].isNull())
+        self.assertTrue(fbad.form_ready)
+
+    # -------------------------------------------------------------------------
+
+    def test_startAuth_accessToken(self):
+        server = FakeFacebookServer()
+        server.start()
+
+        fbad = FBAuthDialog(FBAuthDialogTestCase.parentWidget,
+                use_shared_cache=False)
+        fbad.set_oauth_params(**server.oauth_params(state="TEST"))
+
+        FakeFacebookUser(fbad)
+
+        args = self.helper_wait_for_signal(
+                fbad.signal_permsAuthorizedAccessToken, fbad.start_auth)
+
+        server.stop()
+
+        self.assertEqual((ACCESS_TOKEN, EXPIRES_IN, "TEST"), args)
+
+    # -------------------------------------------------------------------------
+
+    def test_startAuth_denied(self):
+        server = FakeFacebookServer()
+        server.start()
+
+        fbad = FBAuthDialog(FBAuthDialogTestCase.parentWidget,
+                use_shared_cache=False)
+        fbad.set_oauth_params(**server.oauth_params(state="TEST"))
+
+        FakeFacebookUser(fbad, allow=False)
+
+        args = self.helper_wait_for_signal(fbad.signal_permsNotAuthorized,
+                fbad.start_auth)
+
+        server.stop()
+
+        self.assertEqual(("access_denied", "user_denied",
+            "The user denied your request.", "TEST"), args)
+
+    # -------------------------------------------------------------------------
+
+    def test_startAuth_stateRegistry(self):
+        server = FakeFacebookServer()
+        server.start()
+
+        registry = FBStateRegistry()
+
+        fbad = FBAuthDialog(FBAuthDialogTestCase.parentWidget,
+                use_shared_cache=False, state_registry=registry)
+        fbad.set_oauth_params(**server.oauth_params())
+
+        FakeFacebookUser(fbad)
+
+        started = []
+        fbad.signal_authStarted.connect(started.append)
+
+        args = self.helper_wait_for_signal(
+                fbad.signal_permsAuthorizedAccessToken, fbad.start_auth)
+
+        server.stop()
+
+        # the state is issued by the registry and used up by the redirect
+        self.assertEqual((ACCESS_TOKEN, EXPIRES_IN, started[0]), args)
+        self.assertTrue(started[0])
+        self.assertEqual(0, len(registry))
+
+    # -------------------------------------------------------------------------
+
+    def test_startAuth_stateMismatch(self):
+        server = FakeFacebookServer()
+        server.start()
+
+        fbad = FBAuthDialog(FBAuthDialogTestCase.parentWidget,
+                use_shared_cache=False, state_registry=FBStateRegistry())
+        fbad.set_oauth_params(**server.oauth_params())
+
+        FakeFacebookUser(fbad)
+
+        authorized = []
+        fbad.signal_permsAuthorizedAccessToken.connect(
+                lambda *args: authorized.append(args))
+
+        # a state the registry didn't issue
+        args = self.helper_wait_for_signal(fbad.signal_errorOAuthException,
+                lambda: fbad.start_auth("FORGED"))
+
+        server.stop()
+
+        self.assertEqual(FBAuthDialog.ERROR_STATE_MISMATCH, args[1])
+        self.assertEqual([], authorized)
 
 
 if __name__ == '__main__':
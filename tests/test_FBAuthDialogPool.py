@@ -0,0 +1,251 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from PySide.QtCore import QEventLoop
+from PySide.QtCore import QTimer
+from PySide.QtGui  import QApplication
+
+from pyside_facebook import FBAuthDialogPool
+
+from tests.fake_facebook import FakeFacebookServer
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBAuthDialogPoolTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.clear()
+
+        self.server.stop()
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_pool(self, size, **kwargs):
+        pool = FBAuthDialogPool(size=size, preconnect=False,
+                **self.server.oauth_params(**kwargs))
+
+        self.pools.append(pool)
+
+        return pool
+
+    # -------------------------------------------------------------------------
+
+    def helper_wait_for_ready(self, pool, count, timeout=10):
+        """
+        Spin the event loop until `count` dialogs of the pool are ready.
+
+        @return (bool) True if they were ready in time.
+        """
+
+        loop = QEventLoop()
+
+        def slot(ready_count):
+            if ready_count >= count:
+                loop.quit()
+
+        pool.signal_dialogReady.connect(slot)
+        QTimer.singleShot(timeout * 1000, loop.quit)
+
+        if pool.ready_count() < count:
+            loop.exec_()
+
+        pool.signal_dialogReady.disconnect(slot)
+
+        return pool.ready_count() >= count
+
+    # -------------------------------------------------------------------------
+
+    def helper_wait_for_signal(self, signal, timeout=10):
+        """
+        Spin the event loop until `signal` is emitted.
+
+        @return (tuple/None) Arguments the signal was emitted with or None if
+                             it wasn't emitted in time.
+        """
+
+        received = []
+        loop = QEventLoop()
+
+        def slot(*args):
+            received.append(args)
+            loop.quit()
+
+        signal.connect(slot)
+        QTimer.singleShot(timeout * 1000, loop.quit)
+
+        loop.exec_()
+
+        signal.disconnect(slot)
+
+        return received[0] if received else None
+
+    # -------------------------------------------------------------------------
+
+    def helper_process_events(self, msecs=200):
+        loop = QEventLoop()
+        QTimer.singleShot(msecs, loop.quit)
+        loop.exec_()
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_acquire_ready(self):
+        pool = self.helper_pool(2)
+
+        self.assertTrue(self.helper_wait_for_ready(pool, 2))
+
+        # a dialog with the login form loaded is handed out
+        dialog = pool.acquire()
+
+        self.assertTrue(dialog.form_ready)
+        self.assertFalse(dialog.page().mainFrame().findFirstElement(
+                "#login_form").isNull())
+        self.assertEqual(1, pool.ready_count())
+
+        # and the pool refills in the background
+        self.assertTrue(self.helper_wait_for_ready(pool, 2))
+        self.assertNotIn(dialog, pool._ready)
+
+    # -------------------------------------------------------------------------
+
+    def test_acquire_not_ready(self):
+        pool = self.helper_pool(1)
+
+        # nothing has been created yet, so a new dialog is handed out and
+        # signal_authFormReady follows
+        dialog = pool.acquire()
+
+        self.assertFalse(dialog.form_ready)
+        self.assertIsNotNone(self.helper_wait_for_signal(
+                dialog.signal_authFormReady))
+        self.assertTrue(dialog.form_ready)
+
+        # a dialog still loading is handed out before a new one is created
+        self.assertTrue(self.helper_wait_for_ready(pool, 1))
+
+        pool.acquire()
+        pool._fill()
+
+        loading = pool._loading[0]
+
+        self.assertIs(loading, pool.acquire())
+        self.assertFalse(loading.form_ready)
+
+    # -------------------------------------------------------------------------
+
+    def test_size(self):
+        pool = self.helper_pool(3)
+
+        # dialogs are loaded one at a time
+        self.helper_process_events(50)
+
+        self.assertEqual(1, len(pool._loading))
+
+        self.assertTrue(self.helper_wait_for_ready(pool, 3))
+
+        self.helper_process_events()
+
+        # never more dialogs than the pool's size
+        self.assertEqual(3, len(pool._ready) + len(pool._loading))
+
+        pool.acquire()
+        pool.acquire()
+
+        self.assertTrue(self.helper_wait_for_ready(pool, 3))
+        self.assertEqual(3, len(pool._ready) + len(pool._loading))
+
+    # -------------------------------------------------------------------------
+
+    def test_failure(self):
+        pool = self.helper_pool(1, app_id="INVALID")
+        pool.retry_delay = 0.05
+        pool.max_retry_delay = 0.2
+
+        # dialogs that fail are deleted and loaded again, backing off
+        self.helper_process_events(1000)
+
+        self.assertEqual(0, pool.ready_count())
+        self.assertTrue(pool._failures >= 2)
+        self.assertTrue(len(pool._loading) <= 1)
+
+        # and the pool fills once dialogs load again
+        pool.oauth_params = self.server.oauth_params()
+
+        self.assertTrue(self.helper_wait_for_ready(pool, 1))
+        self.assertEqual(0, pool._failures)
+
+    # -------------------------------------------------------------------------
+
+    def test_max_memory(self):
+        pool = self.helper_pool(2)
+        pool.max_memory = 1
+
+        # the process grows by 100 bytes for every dialog ready
+        pool._rss = lambda: 100 * len(pool._ready)
+
+        # dialogs load one at a time, so each grew the process by 100 bytes
+        self.assertTrue(self.helper_wait_for_ready(pool, 2))
+        self.assertEqual(200, pool.memory_usage())
+
+        # the pool is over its memory limit, so no dialog replaces this one
+        pool.acquire()
+
+        self.helper_process_events()
+
+        self.assertTrue(pool.memory_usage() > 0)
+        self.assertEqual(1, len(pool._ready) + len(pool._loading))
+
+        # the limit has no effect when memory can't be measured
+        pool = self.helper_pool(2)
+        pool.max_memory = 1
+        pool._rss = lambda: None
+
+        self.assertTrue(self.helper_wait_for_ready(pool, 2))
+        self.assertEqual(0, pool.memory_usage())
+
+    # -------------------------------------------------------------------------
+
+    def test_rss(self):
+        pool = self.helper_pool(0)
+
+        rss = pool._rss()
+
+        self.assertTrue(rss > 0)
+
+        # without /proc the peak resident set size is used
+        directory = tempfile.mkdtemp()
+
+        try:
+            pool.STATM_PATH = os.path.join(directory, "statm")
+
+            self.assertTrue(pool._rss() >= rss)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import sys
+import unittest
+
+from PySide.QtCore import QTimer
+from PySide.QtGui  import QApplication
+from PySide.QtGui  import QWidget
+
+from pyside_facebook import FBAuthCancelledException
+from pyside_facebook import FBAuthDialog
+from pyside_facebook import FBAuthResult
+from pyside_facebook import FBAuthTimeoutException
+
+from tests.fake_facebook import ACCESS_TOKEN
+from tests.fake_facebook import EXPIRES_IN
+from tests.fake_facebook import OAUTH_CODE
+from tests.fake_facebook import FakeFacebookServer
+from tests.fake_facebook import FakeFacebookUser
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBAuthFutureTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+        cls.parentWidget = QWidget()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parentWidget.destroy(True, True)
+        cls.parentWidget = None
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_dialog(self, **oauth_params):
+        """
+        Return a dialog for the fake server whose `stopped` attribute counts
+        the calls to its `stop` method.
+
+        @return (FBAuthDialog)
+        """
+
+        dialog = FBAuthDialog(FBAuthFutureTestCase.parentWidget,
+                use_shared_cache=False)
+        dialog.set_oauth_params(**self.server.oauth_params(**oauth_params))
+
+        dialog.stopped = 0
+        stop = dialog.stop
+
+        def counting_stop():
+            dialog.stopped += 1
+            stop()
+
+        dialog.stop = counting_stop
+
+        return dialog
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_token(self):
+        dialog = self.helper_dialog()
+        FakeFacebookUser(dialog)
+
+        result = dialog.authenticate("TEST", timeout=10).result()
+
+        self.assertEqual(FBAuthResult.KIND_TOKEN, result.kind)
+        self.assertEqual("TEST", result.state)
+        self.assertEqual(ACCESS_TOKEN, result.access_token)
+        self.assertEqual(EXPIRES_IN, result.expires_in)
+
+    # -------------------------------------------------------------------------
+
+    def test_code(self):
+        dialog = self.helper_dialog(response_type="code")
+        FakeFacebookUser(dialog)
+
+        result = dialog.authenticate("TEST", timeout=10).result()
+
+        self.assertEqual(FBAuthResult.KIND_CODE, result.kind)
+        self.assertEqual("TEST", result.state)
+        self.assertEqual(OAUTH_CODE, result.code)
+        self.assertIsNone(result.access_token)
+
+    # -------------------------------------------------------------------------
+
+    def test_denied(self):
+        dialog = self.helper_dialog()
+        FakeFacebookUser(dialog, allow=False)
+
+        result = dialog.authenticate("TEST", timeout=10).result()
+
+        self.assertEqual(FBAuthResult.KIND_DENIED, result.kind)
+        self.assertEqual("TEST", result.state)
+        self.assertEqual(("access_denied", "user_denied",
+            "The user denied your request."), (result.error, result.reason,
+            result.description))
+
+    # -------------------------------------------------------------------------
+
+    def test_error(self):
+        dialog = self.helper_dialog(app_id="INVALID")
+
+        result = dialog.authenticate(timeout=10).result()
+
+        self.assertEqual(FBAuthResult.KIND_ERROR, result.kind)
+        self.assertEqual(101, result.error_code)
+        self.assertTrue(result.message)
+
+    # -------------------------------------------------------------------------
+
+    def test_timeout(self):
+        self.server.delay = 1
+
+        dialog = self.helper_dialog()
+        future = dialog.authenticate(timeout=0.2)
+
+        self.assertRaises(FBAuthTimeoutException, future.result)
+
+        # the dialog is stopped and later signals are ignored
+        self.assertEqual(1, dialog.stopped)
+        self.assertFalse(future.cancelled())
+
+        dialog.signal_permsAuthorizedAccessToken.emit(ACCESS_TOKEN,
+                EXPIRES_IN, "")
+
+        self.assertIsInstance(future.exception(), FBAuthTimeoutException)
+
+    # -------------------------------------------------------------------------
+
+    def test_cancel(self):
+        self.server.delay = 1
+
+        dialog = self.helper_dialog()
+        future = dialog.authenticate(timeout=10)
+
+        QTimer.singleShot(0, future.cancel)
+
+        self.assertRaises(FBAuthCancelledException, future.result)
+
+        self.assertTrue(future.cancelled())
+        self.assertEqual(1, dialog.stopped)
+
+        # the timeout doesn't fire once cancelled
+        self.assertFalse(future._timer.isActive())
+
+    # -------------------------------------------------------------------------
+
+    def test_add_done_callback(self):
+        dialog = self.helper_dialog()
+        FakeFacebookUser(dialog)
+
+        future = dialog.authenticate(timeout=10)
+        future.result()
+
+        called = []
+        future.add_done_callback(called.append)
+
+        self.assertEqual([future], called)
+
+
+if __name__ == '__main__':
+    unittest.main()
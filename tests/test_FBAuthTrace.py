@@ -0,0 +1,161 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from StringIO import StringIO
+
+from PySide.QtGui import QApplication
+from PySide.QtGui import QWidget
+
+from pyside_facebook import FBAuthDialog
+from pyside_facebook import FBAuthTrace
+
+from tests.fake_facebook import FakeFacebookServer
+from tests.fake_facebook import FakeFacebookUser
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS
+# -----------------------------------------------------------------------------
+
+REPLY_KEYS = set(["event", "url", "method", "status", "from_cache", "error",
+    "t", "start_t", "ttfb_ms", "duration_ms", "bytes_received",
+    "bytes_sent"])
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBAuthTraceTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+        cls.parentWidget = QWidget()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parentWidget.destroy(True, True)
+        cls.parentWidget = None
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_login(self, callback=None):
+        """
+        Log in through a traced dialog.
+
+        @return (FBAuthTrace)
+        """
+
+        dialog = FBAuthDialog(FBAuthTraceTestCase.parentWidget,
+                use_shared_cache=False)
+        dialog.set_oauth_params(**self.server.oauth_params())
+
+        trace = FBAuthTrace(dialog, callback)
+
+        FakeFacebookUser(dialog)
+
+        dialog.authenticate(timeout=10).result()
+
+        return trace
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_events(self):
+        recorded = []
+        trace = self.helper_login(recorded.append)
+
+        events = trace.events()
+
+        self.assertEqual(["start_auth", "form_ready", "auth_success",
+            "token"], [e["phase"] for e in events if e["event"] == "phase"])
+
+        # records are made in order
+        times = [e["t"] for e in events]
+
+        self.assertEqual(sorted(times), times)
+        self.assertEqual("phase", events[0]["event"])
+
+        # every reply of the dialog is recorded
+        replies = [e for e in events if e["event"] == "reply"]
+
+        for reply in replies:
+            self.assertEqual(REPLY_KEYS, set(reply))
+            self.assertTrue(reply["url"].startswith(self.server.url))
+            self.assertEqual(reply["t"] - reply["start_t"],
+                    reply["duration_ms"])
+            self.assertFalse(reply["from_cache"])
+
+        login = [r for r in replies
+                if r["method"] == "POST" and "/login.php" in r["url"]]
+
+        self.assertEqual(1, len(login))
+        self.assertEqual(302, login[0]["status"])
+        self.assertEqual(0, login[0]["error"])
+        self.assertTrue(login[0]["bytes_sent"] > 0)
+        self.assertTrue(login[0]["ttfb_ms"] <= login[0]["duration_ms"])
+
+        form = [r for r in replies
+                if r["method"] == "GET" and "/login.php" in r["url"]]
+
+        self.assertEqual(200, form[0]["status"])
+        self.assertTrue(form[0]["bytes_received"] > 0)
+
+        # the callback gets every record
+        self.assertEqual(events, recorded)
+
+        trace.clear()
+
+        self.assertEqual([], trace.events())
+
+    # -------------------------------------------------------------------------
+
+    def test_export_jsonl(self):
+        trace = self.helper_login()
+
+        f = StringIO()
+        trace.export_jsonl(f)
+
+        # one JSON object per line
+        lines = f.getvalue().splitlines()
+
+        self.assertTrue(f.getvalue().endswith("\n"))
+        self.assertEqual(trace.events(), [json.loads(l) for l in lines])
+
+        # paths are appended to
+        directory = tempfile.mkdtemp()
+
+        try:
+            path = os.path.join(directory, "trace.jsonl")
+
+            trace.export_jsonl(path)
+            trace.export_jsonl(path)
+
+            with open(path) as f:
+                self.assertEqual(lines * 2, f.read().splitlines())
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+import sys
+import unittest
+
+from PySide.QtCore import QEventLoop
+from PySide.QtCore import QTimer
+from PySide.QtGui  import QApplication
+from PySide.QtGui  import QWidget
+
+from pyside_facebook import FBAuthDialog
+from pyside_facebook import FBAuthTimeoutException
+from pyside_facebook import FBAuthWatchdog
+
+from tests.fake_facebook import FakeFacebookServer
+from tests.fake_facebook import FakeFacebookUser
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBAuthWatchdogTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+        cls.parentWidget = QWidget()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parentWidget.destroy(True, True)
+        cls.parentWidget = None
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_dialog(self, **timeouts):
+        """
+        Return a dialog for the fake server whose watchdog has no deadlines
+        and never retries, except for the given keyword arguments.
+
+        @return (FBAuthDialog)
+        """
+
+        dialog = FBAuthDialog(FBAuthWatchdogTestCase.parentWidget,
+                use_shared_cache=False)
+        dialog.set_oauth_params(**self.server.oauth_params())
+
+        watchdog = dialog.watchdog
+        watchdog.form_load_timeout = None
+        watchdog.user_auth_timeout = None
+        watchdog.redirect_timeout = None
+        watchdog.stall_timeout = None
+
+        for name, value in timeouts.iteritems():
+            setattr(watchdog, name, value)
+
+        return dialog
+
+    # -------------------------------------------------------------------------
+
+    def helper_wait_for_signal(self, signal, start, timeout=10):
+        """
+        Call `start` and spin the event loop until `signal` is emitted.
+
+        @return (tuple/None) Arguments the signal was emitted with or None if
+                             it wasn't emitted in time.
+        """
+
+        received = []
+        loop = QEventLoop()
+
+        def slot(*args):
+            received.append(args)
+            loop.quit()
+
+        signal.connect(slot)
+        QTimer.singleShot(timeout * 1000, loop.quit)
+
+        start()
+
+        if not received:
+            loop.exec_()
+
+        signal.disconnect(slot)
+
+        return received[0] if received else None
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_form_load(self):
+        self.server.delay = 5
+
+        dialog = self.helper_dialog(form_load_timeout=1.5)
+        elapsed = []
+        dialog.signal_userAuthTimeout.connect(elapsed.append)
+
+        args = self.helper_wait_for_signal(dialog.watchdog.signal_timeout,
+                dialog.start_auth)
+
+        # the whole seconds elapsed since start_auth
+        self.assertEqual((1, FBAuthWatchdog.PHASE_FORM_LOAD), args)
+        self.assertEqual([1], elapsed)
+        self.assertIsNone(dialog.watchdog.phase)
+
+    # -------------------------------------------------------------------------
+
+    def test_user_input(self):
+        dialog = self.helper_dialog(user_auth_timeout=0.5)
+
+        args = self.helper_wait_for_signal(dialog.watchdog.signal_timeout,
+                dialog.start_auth)
+
+        self.assertEqual(FBAuthWatchdog.PHASE_USER_INPUT, args[1])
+        self.assertTrue(dialog.form_ready)
+
+    # -------------------------------------------------------------------------
+
+    def test_redirect(self):
+        dialog = self.helper_dialog(redirect_timeout=0.5)
+
+        # the permissions form is submitted, but its answer never comes
+        dialog.signal_authSuccess.connect(
+                lambda state: setattr(self.server, "delay", 5))
+
+        FakeFacebookUser(dialog)
+
+        args = self.helper_wait_for_signal(dialog.watchdog.signal_timeout,
+                dialog.start_auth)
+
+        self.assertEqual(FBAuthWatchdog.PHASE_REDIRECT, args[1])
+
+    # -------------------------------------------------------------------------
+
+    def test_permissions_page(self):
+        dialog = self.helper_dialog(redirect_timeout=0.5)
+
+        user = FakeFacebookUser(dialog)
+
+        # the user takes their time to answer the permissions page
+        dialog.signal_authSuccess.connect(
+                lambda state: setattr(user, "_script", None))
+
+        args = self.helper_wait_for_signal(dialog.watchdog.signal_timeout,
+                dialog.start_auth, timeout=2)
+
+        # the page is under the user input phase, which has no deadline here
+        self.assertIsNone(args)
+        self.assertEqual(FBAuthWatchdog.PHASE_USER_INPUT,
+                dialog.watchdog.phase)
+
+        # answering it starts the redirect phase
+        args = self.helper_wait_for_signal(
+                dialog.signal_permsAuthorizedAccessToken,
+                lambda: dialog.page().mainFrame().evaluateJavaScript(
+                    "document.getElementById('allow_form').submit();"))
+
+        self.assertIsNotNone(args)
+        self.assertIsNone(dialog.watchdog.phase)
+
+    # -------------------------------------------------------------------------
+
+    def test_future(self):
+        self.server.delay = 5
+
+        dialog = self.helper_dialog(form_load_timeout=0.5)
+
+        # a future without a timeout of its own fails with the watchdog
+        future = dialog.authenticate()
+
+        self.assertRaises(FBAuthTimeoutException, future.result)
+        self.assertFalse(future.cancelled())
+
+    # -------------------------------------------------------------------------
+
+    def test_stall_retry(self):
+        self.server.delay = 5
+
+        dialog = self.helper_dialog(stall_timeout=0.5, retry_delay=0.1,
+                max_retries=2)
+        watchdog = dialog.watchdog
+
+        delays = []
+        watchdog._retry_timer.timeout.connect(
+                lambda: delays.append(watchdog._retry_timer.interval()))
+
+        args = self.helper_wait_for_signal(watchdog.signal_timeout,
+                dialog.start_auth)
+
+        # the delay doubles with every retry, and the watchdog gives up once
+        # they are used up
+        self.assertEqual([100, 200], delays)
+        self.assertEqual(2, watchdog.retries)
+        self.assertEqual(FBAuthWatchdog.PHASE_FORM_LOAD, args[1])
+
+    # -------------------------------------------------------------------------
+
+    def test_stall_user_input(self):
+        dialog = self.helper_dialog(user_auth_timeout=3, stall_timeout=0.5,
+                retry_delay=0.1)
+
+        # the login form is submitted, but its answer never comes
+        dialog.signal_authFormReady.connect(
+                lambda state: setattr(self.server, "delay", 5))
+
+        FakeFacebookUser(dialog)
+
+        args = self.helper_wait_for_signal(dialog.watchdog.signal_timeout,
+                dialog.start_auth)
+
+        # form submissions aren't retried, the phase's deadline passes
+        self.assertEqual(FBAuthWatchdog.PHASE_USER_INPUT, args[1])
+        self.assertEqual(0, dialog.watchdog.retries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from PySide.QtCore    import QDateTime
+from PySide.QtCore    import QUrl
+from PySide.QtNetwork import QNetworkCookie
+
+from pyside_facebook import COOKIE_JAR_COMPACT_LINES
+from pyside_facebook import FBCookieJar
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS
+# -----------------------------------------------------------------------------
+
+URL = QUrl("http://www.example.com/")
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBCookieJarTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_cookie(self, name, value, days=1, domain=None):
+        """
+        Return a cookie expiring in `days` days, or a session cookie if
+        `days` is None.
+
+        @return (QNetworkCookie)
+        """
+
+        cookie = QNetworkCookie(name, value)
+
+        if days is not None:
+            cookie.setExpirationDate(
+                    QDateTime.currentDateTime().addDays(days))
+
+        if domain is not None:
+            cookie.setDomain(domain)
+
+        return cookie
+
+    # -------------------------------------------------------------------------
+
+    def helper_cookies(self, jar):
+        """
+        @return (dict) Name => value of the cookies in the jar.
+        """
+
+        return dict((str(c.name()), str(c.value())) for c in jar.allCookies())
+
+    # -------------------------------------------------------------------------
+
+    def helper_lines(self, jar):
+        with open(jar.path) as f:
+            return f.read().splitlines()
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_persistence(self):
+        jar = FBCookieJar(directory=self.directory)
+        jar.setCookiesFromUrl([self.helper_cookie("c_user", "1")], URL)
+
+        # readable by the user only
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(jar.path).st_mode))
+
+        jar = FBCookieJar(directory=self.directory)
+
+        self.assertEqual({"c_user": "1"}, self.helper_cookies(jar))
+
+        # profiles are kept apart
+        self.assertEqual({}, self.helper_cookies(
+                FBCookieJar(profile="other", directory=self.directory)))
+
+    # -------------------------------------------------------------------------
+
+    def test_replay(self):
+        jar = FBCookieJar(directory=self.directory)
+
+        for value in ("1", "2", "3"):
+            jar.setCookiesFromUrl([self.helper_cookie("c_user", value)], URL)
+
+        jar.setCookiesFromUrl([self.helper_cookie("xs", "A")], URL)
+
+        # every change is appended, later lines win
+        self.assertEqual(4, len(self.helper_lines(jar)))
+        self.assertEqual({"c_user": "3", "xs": "A"}, self.helper_cookies(
+                FBCookieJar(directory=self.directory)))
+
+        # setting a cookie again unchanged doesn't grow the file
+        jar.setCookiesFromUrl([jar.allCookies()[0]], URL)
+
+        self.assertEqual(4, len(self.helper_lines(jar)))
+
+    # -------------------------------------------------------------------------
+
+    def test_rejected_cookies(self):
+        jar = FBCookieJar(directory=self.directory)
+
+        # cookies for a foreign domain are refused by the jar
+        self.assertFalse(jar.setCookiesFromUrl([self.helper_cookie("evil",
+                "1", domain=".other.com")], URL))
+
+        self.assertFalse(os.path.exists(jar.path))
+
+        jar.setCookiesFromUrl([self.helper_cookie("c_user", "1"),
+                self.helper_cookie("evil", "1", domain=".other.com")], URL)
+
+        self.assertEqual(1, len(self.helper_lines(jar)))
+        self.assertEqual({"c_user": "1"}, self.helper_cookies(
+                FBCookieJar(directory=self.directory)))
+
+    # -------------------------------------------------------------------------
+
+    def test_session_cookies(self):
+        jar = FBCookieJar(directory=self.directory)
+        jar.setCookiesFromUrl([self.helper_cookie("c_user", "1")], URL)
+
+        # a session cookie replacing a persistent one is saved expired, so
+        # the persistent one isn't restored
+        jar.setCookiesFromUrl([self.helper_cookie("c_user", "2", None)], URL)
+
+        self.assertEqual({"c_user": "2"}, self.helper_cookies(jar))
+        self.assertEqual({}, self.helper_cookies(
+                FBCookieJar(directory=self.directory)))
+
+        # unless session cookies are kept
+        jar = FBCookieJar(directory=self.directory, keep_session_cookies=True)
+        jar.setCookiesFromUrl([self.helper_cookie("c_user", "3", None)], URL)
+
+        self.assertEqual({"c_user": "3"}, self.helper_cookies(
+                FBCookieJar(directory=self.directory)))
+
+    # -------------------------------------------------------------------------
+
+    def test_removed_cookies(self):
+        jar = FBCookieJar(directory=self.directory)
+        jar.setCookiesFromUrl([self.helper_cookie("c_user", "1")], URL)
+
+        # facebook logs users out by setting cookies already expired
+        jar.setCookiesFromUrl([self.helper_cookie("c_user", "deleted", -1)],
+                URL)
+
+        self.assertEqual({}, self.helper_cookies(jar))
+        self.assertEqual({}, self.helper_cookies(
+                FBCookieJar(directory=self.directory)))
+
+    # -------------------------------------------------------------------------
+
+    def test_expired_on_load(self):
+        jar = FBCookieJar(directory=self.directory)
+        jar.setCookiesFromUrl([self.helper_cookie("c_user", "1"),
+                self.helper_cookie("xs", "A")], URL)
+
+        # expire a cookie while the jar is closed
+        lines = self.helper_lines(jar)
+        cookie = QNetworkCookie.parseCookies(lines[1])[0]
+        cookie.setExpirationDate(QDateTime.currentDateTime().addSecs(-60))
+
+        with open(jar.path, "a") as f:
+            f.write(str(cookie.toRawForm(QNetworkCookie.Full)) + "\n")
+
+        jar = FBCookieJar(directory=self.directory)
+
+        self.assertEqual(1, len(jar.allCookies()))
+
+        # and the file is compacted right away
+        self.assertEqual(1, len(self.helper_lines(jar)))
+
+    # -------------------------------------------------------------------------
+
+    def test_compact(self):
+        jar = FBCookieJar(directory=self.directory)
+
+        for i in xrange(COOKIE_JAR_COMPACT_LINES * 2):
+            jar.setCookiesFromUrl([self.helper_cookie("c_user", str(i))],
+                    URL)
+
+        # the file is rewritten once it grows too long
+        self.assertTrue(len(self.helper_lines(jar)) <=
+                COOKIE_JAR_COMPACT_LINES)
+        self.assertEqual(len(self.helper_lines(jar)), jar._lines)
+
+        jar.setCookiesFromUrl([self.helper_cookie("xs", "A", None)], URL)
+        jar.compact()
+
+        # only persistent cookies are kept, and no temporary files are left
+        self.assertEqual(1, len(self.helper_lines(jar)))
+        self.assertEqual([os.path.basename(jar.path)],
+                os.listdir(self.directory))
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(jar.path).st_mode))
+
+        self.assertEqual({"c_user": str(COOKIE_JAR_COMPACT_LINES * 2 - 1)},
+                self.helper_cookies(FBCookieJar(directory=self.directory)))
+
+        jar.clear()
+
+        self.assertEqual([], self.helper_lines(jar))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,268 @@
+import sys
+import threading
+import unittest
+
+from PySide.QtCore import QEventLoop
+from PySide.QtCore import QTimer
+from PySide.QtGui  import QApplication
+
+from pyside_facebook import FBAsyncioBridge
+from pyside_facebook import FBFuture
+from pyside_facebook import PySideFacebookException
+
+from pyside_facebook.futures import asyncio
+
+
+# -----------------------------------------------------------------------------
+# CLASSES
+# -----------------------------------------------------------------------------
+
+class AbortableFuture(FBFuture):
+
+    """
+    A FBFuture counting how often its operation was stopped.
+    """
+
+    def __init__(self, parent=None):
+        super(AbortableFuture, self).__init__(parent)
+
+        self.aborted = 0
+
+    def _abort(self):
+        self.aborted += 1
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBFutureTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_asyncio_loop(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        return loop
+
+    # -------------------------------------------------------------------------
+
+    def helper_process_qt_events(self, msecs):
+        loop = QEventLoop()
+        QTimer.singleShot(msecs, loop.quit)
+        loop.exec_()
+
+    # -------------------------------------------------------------------------
+
+    def helper_run_once(self, loop):
+        """
+        Run the callbacks the asyncio loop has ready.
+        """
+
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_result(self):
+        future = FBFuture()
+
+        # resolved later from the Qt event loop
+        QTimer.singleShot(0, lambda: future._finish("RESULT"))
+
+        self.assertEqual("RESULT", future.result())
+        self.assertTrue(future.done())
+        self.assertFalse(future.cancelled())
+        self.assertIsNone(future.exception())
+
+        # a future is only resolved once
+        self.assertFalse(future._finish("OTHER"))
+        self.assertEqual("RESULT", future.result())
+
+    # -------------------------------------------------------------------------
+
+    def test_exception(self):
+        future = FBFuture()
+        future._finish(exception=ValueError("failed"))
+
+        self.assertRaises(ValueError, future.result)
+        self.assertIsInstance(future.exception(), ValueError)
+
+    # -------------------------------------------------------------------------
+
+    def test_add_done_callback(self):
+        future = FBFuture()
+        called = []
+
+        future.add_done_callback(called.append)
+
+        self.assertEqual([], called)
+
+        future._finish("RESULT")
+
+        self.assertEqual([future], called)
+
+        # callbacks added once the future is done are called right away
+        future.add_done_callback(called.append)
+
+        self.assertEqual([future, future], called)
+
+    # -------------------------------------------------------------------------
+
+    def test_cancel(self):
+        future = AbortableFuture()
+        done = []
+        future.signal_done.connect(done.append)
+
+        self.assertTrue(future.cancel())
+
+        self.assertEqual(1, future.aborted)
+        self.assertTrue(future.cancelled())
+        self.assertEqual([future], done)
+        self.assertRaises(PySideFacebookException, future.result)
+
+        # a future that's done can't be cancelled
+        self.assertFalse(future.cancel())
+        self.assertEqual(1, future.aborted)
+
+        future = AbortableFuture()
+        future._finish("RESULT")
+
+        self.assertFalse(future.cancel())
+        self.assertFalse(future.cancelled())
+        self.assertEqual(0, future.aborted)
+
+    # -------------------------------------------------------------------------
+
+    @unittest.skipIf(asyncio is None, "requires asyncio or trollius")
+    def test_to_asyncio(self):
+        loop = self.helper_asyncio_loop()
+
+        future = FBFuture()
+        asyncio_future = future.to_asyncio(loop)
+
+        self.assertFalse(asyncio_future.done())
+
+        future._finish("RESULT")
+
+        self.assertEqual("RESULT", loop.run_until_complete(asyncio_future))
+
+        # exceptions are passed on
+        future = FBFuture()
+        asyncio_future = future.to_asyncio(loop)
+
+        future._finish(exception=ValueError("failed"))
+
+        self.assertIsInstance(asyncio_future.exception(), ValueError)
+
+        # futures already done are linked as well
+        self.assertIsInstance(future.to_asyncio(loop).exception(), ValueError)
+
+    # -------------------------------------------------------------------------
+
+    @unittest.skipIf(asyncio is None, "requires asyncio or trollius")
+    def test_to_asyncio_cancel(self):
+        loop = self.helper_asyncio_loop()
+
+        # cancelling the Qt future cancels the asyncio future
+        future = AbortableFuture()
+        asyncio_future = future.to_asyncio(loop)
+
+        future.cancel()
+
+        self.assertTrue(asyncio_future.cancelled())
+
+        self.helper_run_once(loop)
+
+        self.assertEqual(1, future.aborted)
+
+        # and cancelling the asyncio future cancels the Qt future, once the
+        # asyncio loop has run its callbacks
+        future = AbortableFuture()
+        asyncio_future = future.to_asyncio(loop)
+
+        asyncio_future.cancel()
+
+        self.assertFalse(future.done())
+
+        self.helper_run_once(loop)
+
+        self.assertTrue(future.cancelled())
+        self.assertEqual(1, future.aborted)
+
+    # -------------------------------------------------------------------------
+
+    @unittest.skipIf(asyncio is None, "requires asyncio or trollius")
+    def test_asyncio_bridge(self):
+        loop = self.helper_asyncio_loop()
+
+        bridge = FBAsyncioBridge(loop=loop)
+        bridge.start()
+
+        future = FBFuture()
+        results = []
+
+        # asyncio runs done callbacks from its own loop, which the bridge
+        # runs from the Qt event loop
+        future.to_asyncio(loop).add_done_callback(
+                lambda f: results.append(f.result()))
+
+        QTimer.singleShot(0, lambda: future._finish("RESULT"))
+
+        self.helper_process_qt_events(200)
+
+        bridge.stop()
+
+        self.assertEqual(["RESULT"], results)
+
+    # -------------------------------------------------------------------------
+
+    @unittest.skipIf(asyncio is None, "requires asyncio or trollius")
+    def test_asyncio_bridge_idle(self):
+        loop = self.helper_asyncio_loop()
+
+        bridge = FBAsyncioBridge(loop=loop)
+        bridge.start()
+
+        self.helper_process_qt_events(50)
+
+        # an idle loop isn't woken up
+        self.assertFalse(bridge._timer.isActive())
+        self.assertTrue(bridge._notifiers)
+
+        results = []
+
+        # scheduled callbacks run once they're due, and the loop's self-pipe
+        # wakes it up for callbacks from other threads
+        loop.call_later(0.05, results.append, "LATER")
+
+        thread = threading.Thread(target=loop.call_soon_threadsafe,
+                args=(results.append, "THREAD"))
+        thread.start()
+        thread.join()
+
+        self.helper_process_qt_events(200)
+
+        self.assertEqual(["THREAD", "LATER"], results)
+        self.assertFalse(bridge._timer.isActive())
+
+        bridge.stop()
+
+        self.assertEqual({}, bridge._notifiers)
+
+
+if __name__ == '__main__':
+    unittest.main()
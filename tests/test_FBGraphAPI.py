@@ -0,0 +1,243 @@
+import sys
+import unittest
+
+from PySide.QtGui import QApplication
+
+from pyside_facebook import FBGraphAPI
+from pyside_facebook import FBGraphAPICancelledException
+from pyside_facebook import FBGraphAPIDecodeException
+from pyside_facebook import FBGraphCache
+from pyside_facebook import FBGraphAPIErrorException
+from pyside_facebook import GRAPH_BATCH_MAX_SIZE
+from pyside_facebook import FBGraphAPIOAuthException
+from pyside_facebook import FBGraphAPIRateLimitException
+
+from tests.fake_facebook import ACCESS_TOKEN
+from tests.fake_facebook import FRIENDS
+from tests.fake_facebook import ME
+from tests.fake_facebook import FakeFacebookServer
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBGraphAPITestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+        self.api = FBGraphAPI(access_token=ACCESS_TOKEN,
+                graph_url=self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_batch(self):
+        with self.api.batch():
+            requests = [self.api.get("me") for i in xrange(3)]
+            requests.append(self.api.get("missing"))
+
+            # nothing is sent before the block exits
+            self.assertEqual(0, self.server.graph_requests)
+
+        for request in requests[:3]:
+            self.assertEqual(ME, request.result())
+
+        # errors stay with the operation that failed
+        self.assertRaises(FBGraphAPIErrorException, requests[3].result)
+        self.assertEqual(404, requests[3].status)
+
+        self.assertEqual(1, self.server.graph_requests)
+
+    # -------------------------------------------------------------------------
+
+    def test_batch_window(self):
+        api = FBGraphAPI(access_token=ACCESS_TOKEN,
+                graph_url=self.server.url, batch_window=50)
+
+        requests = [api.get("me", {"call": i})
+                    for i in xrange(GRAPH_BATCH_MAX_SIZE + 1)]
+
+        for request in requests:
+            self.assertEqual(ME, request.result())
+
+        # a full batch is sent right away, the rest once the window closed
+        self.assertEqual(2, self.server.graph_requests)
+
+    # -------------------------------------------------------------------------
+
+    def test_cache(self):
+        cache = FBGraphCache(ttls={"me": 0})
+        self.api.cache = cache
+
+        self.assertEqual(ME, self.api.get("me").result())
+
+        # stale responses are revalidated and the 304 served from the cache
+        request = self.api.get("me")
+
+        self.assertEqual(ME, request.result())
+        self.assertEqual(304, request.status)
+
+        friends = self.api.get("me/friends", {"limit": 2}).result()
+
+        # fresh responses cost no request at all
+        self.assertEqual(friends,
+                self.api.get("me/friends", {"limit": 2}).result())
+
+        self.assertEqual(3, self.server.graph_requests)
+        self.assertEqual({"hits": 1, "misses": 2, "stale": 1,
+                "revalidations": 1}, cache.stats())
+
+    # -------------------------------------------------------------------------
+
+    def test_encode_params(self):
+        self.assertEqual(
+            sorted([("fields", "id,name"),
+                    ("targeting", '{"countries": ["US"]}'),
+                    ("name", "J\xc3\xb6rg"), ("limit", "5"),
+                    ("is_hidden", "false")]),
+            sorted(FBGraphAPI._encode_params({
+                "fields": ["id", "name"],
+                "targeting": {"countries": ["US"]},
+                "name": u"J\xf6rg",
+                "limit": 5,
+                "is_hidden": False,
+                "after": None,
+            })))
+
+    # -------------------------------------------------------------------------
+
+    def test_error_exception(self):
+        exception = FBGraphAPI._error_exception({"message": "Throttled",
+                "type": "OAuthException", "code": 4}, 400)
+
+        # rate limits win over the OAuthException type
+        self.assertIsInstance(exception, FBGraphAPIRateLimitException)
+        self.assertEqual((4, 400), (exception.code, exception.status))
+
+        self.assertIsInstance(FBGraphAPI._error_exception({"message": "",
+                "type": "OAuthException", "code": 190}),
+                FBGraphAPIOAuthException)
+
+        exception = FBGraphAPI._error_exception("Unknown error")
+
+        self.assertIs(FBGraphAPIErrorException, type(exception))
+        self.assertEqual("Unknown error", exception.message)
+
+    # -------------------------------------------------------------------------
+
+    def test_get(self):
+        self.assertEqual(ME, self.api.get("me").result())
+
+        request = FBGraphAPI(graph_url=self.server.url).get("me")
+
+        self.assertRaises(FBGraphAPIOAuthException, request.result)
+        self.assertEqual(400, request.status)
+
+    # -------------------------------------------------------------------------
+
+    def test_iterate(self):
+        self.assertEqual(FRIENDS, list(self.api.iterate("me/friends",
+                fields=["id", "name"])))
+
+        # the limit doubles as page size, so no extra page is requested
+        self.assertEqual(FRIENDS[:30], list(self.api.iterate("me/friends",
+                limit=30)))
+
+        self.assertEqual(4, self.server.graph_requests)
+
+    # -------------------------------------------------------------------------
+
+    def test_iterate_early_stop(self):
+        pager = self.api.iterate("me/friends", page_size=10)
+
+        for friend in pager:
+            if friend == FRIENDS[12]:
+                break
+
+        # the page prefetched while the second was consumed is cancelled
+        self.assertEqual(0, self.api.pending_count())
+        self.assertEqual([], pager.next_page().result())
+
+    # -------------------------------------------------------------------------
+
+    def test_max_requests_per_host(self):
+        self.api = FBGraphAPI(access_token=ACCESS_TOKEN,
+                graph_url=self.server.url, max_requests_per_host=2)
+
+        requests = [self.api.get("me", {"call": i}) for i in xrange(5)]
+
+        self.assertEqual(2, self.api.scheduler.active_count())
+        self.assertEqual(5, self.api.pending_count())
+
+        # cancelled requests leave the queue
+        requests[4].cancel()
+
+        self.assertEqual(4, self.api.pending_count())
+        self.assertRaises(FBGraphAPICancelledException, requests[4].result)
+
+        for request in requests[:4]:
+            self.assertEqual(ME, request.result())
+
+        self.assertEqual(0, self.api.pending_count())
+
+
+    # -------------------------------------------------------------------------
+
+    def test_single_flight(self):
+        requests = [self.api.get("me", {"fields": ["id", "name"]})
+                    for i in xrange(3)]
+
+        self.assertEqual(1, self.api.pending_count())
+
+        # the shared request outlives callers cancelling
+        requests[0].cancel()
+
+        self.assertEqual(ME, requests[1].result())
+        self.assertIs(requests[1].result(), requests[2].result())
+        self.assertTrue(requests[0].cancelled())
+
+        self.assertEqual(1, self.server.graph_requests)
+
+        # the shared request is cancelled along with its last caller
+        requests = [self.api.get("me") for i in xrange(2)]
+
+        for request in requests:
+            request.cancel()
+
+        self.assertEqual(0, self.api.pending_count())
+
+    # -------------------------------------------------------------------------
+
+    def test_stream(self):
+        items = []
+
+        request = self.api.stream("me/friends", {"limit": len(FRIENDS)})
+        request.signal_item.connect(items.append)
+
+        # items are emitted, not kept in the result
+        self.assertEqual({"data": [], "paging": {}}, request.result())
+        self.assertEqual(FRIENDS, items)
+
+        request = self.api.stream("me/friends", {"limit": len(FRIENDS)},
+                max_buffer=10)
+
+        self.assertRaises(FBGraphAPIDecodeException, request.result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pyside_facebook import FBGraphCache
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS
+# -----------------------------------------------------------------------------
+
+ME_URL = "https://graph.facebook.com/me?fields=id%2Cname&access_token=TOKEN"
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBGraphCacheTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_key(self):
+        key = FBGraphCache.key(ME_URL)
+
+        # param order doesn't matter, the token and the fields do
+        self.assertEqual(key, FBGraphCache.key(
+                "https://graph.facebook.com/me?access_token=TOKEN"
+                "&fields=id%2Cname"))
+
+        self.assertNotEqual(key, FBGraphCache.key(
+                ME_URL.replace("TOKEN", "OTHER")))
+        self.assertNotEqual(key, FBGraphCache.key(
+                ME_URL.replace("name", "email")))
+
+        self.assertNotIn("TOKEN", key)
+
+    # -------------------------------------------------------------------------
+
+    def test_lookup(self):
+        cache = FBGraphCache(ttls={"me": 60, "me/*": 0})
+        key = FBGraphCache.key(ME_URL)
+
+        self.assertEqual((None, None, False), cache.lookup(key))
+
+        cache.put(key, '{"id": "1"}', '"ETAG"')
+
+        self.assertEqual(('{"id": "1"}', '"ETAG"', True), cache.lookup(key))
+
+        # responses of paths with no TTL are stale right away
+        feed_key = FBGraphCache.key("https://graph.facebook.com/me/feed")
+        cache.put(feed_key, '{"data": []}', '"FEED"')
+
+        self.assertEqual(('{"data": []}', '"FEED"', False),
+                cache.lookup(feed_key))
+
+        self.assertEqual('{"data": []}', cache.revalidated(feed_key))
+
+        self.assertEqual({"hits": 1, "misses": 1, "stale": 1,
+                "revalidations": 1}, cache.stats())
+
+    # -------------------------------------------------------------------------
+
+    def test_max_size(self):
+        cache = FBGraphCache(max_size=25)
+
+        for i in xrange(3):
+            cache.put(FBGraphCache.key("/object/%d" % i), "x" * 10)
+
+        # least recently used response is evicted
+        self.assertEqual(20, cache.size())
+        self.assertEqual(None, cache.lookup(FBGraphCache.key("/object/0"))[0])
+        self.assertEqual("x" * 10,
+                cache.lookup(FBGraphCache.key("/object/2"))[0])
+
+    # -------------------------------------------------------------------------
+
+    def test_directory(self):
+        key = FBGraphCache.key(ME_URL)
+
+        FBGraphCache(directory=self.directory).put(key, '{"id": "1"}',
+                '"ETAG"')
+
+        # a new cache picks the response up from disk
+        cache = FBGraphCache(directory=self.directory)
+
+        self.assertEqual(('{"id": "1"}', '"ETAG"', True), cache.lookup(key))
+
+        cache.clear()
+
+        self.assertEqual([], os.listdir(self.directory))
+        self.assertEqual((None, None, False), cache.lookup(key))
+        self.assertEqual(0, cache.disk_size())
+
+    # -------------------------------------------------------------------------
+
+    def test_max_disk_size(self):
+        keys = [FBGraphCache.key("/object/%d" % i) for i in xrange(4)]
+
+        cache = FBGraphCache(directory=self.directory)
+        cache.put(keys[0], "x" * 10)
+
+        file_size = cache.disk_size()
+
+        # room for three files, whose sizes vary a little with their expiry
+        # times
+        max_disk_size = file_size * 3 + file_size / 2
+
+        cache = FBGraphCache(directory=self.directory,
+                max_disk_size=max_disk_size)
+
+        for key in keys[1:3]:
+            cache.put(key, "x" * 10)
+
+        # reading a file from disk makes it the most recently used
+        cache = FBGraphCache(directory=self.directory,
+                max_disk_size=max_disk_size)
+
+        self.assertEqual("x" * 10, cache.lookup(keys[0])[0])
+
+        cache.put(keys[3], "x" * 10)
+
+        self.assertEqual(3, len(os.listdir(self.directory)))
+        self.assertTrue(cache.disk_size() <= max_disk_size)
+
+        # the order is kept across runs
+        cache = FBGraphCache(directory=self.directory)
+
+        self.assertEqual(None, cache.lookup(keys[1])[0])
+
+        for key in (keys[0], keys[2], keys[3]):
+            self.assertEqual("x" * 10, cache.lookup(key)[0])
+
+    # -------------------------------------------------------------------------
+
+    def test_max_size_from_disk(self):
+        keys = [FBGraphCache.key("/object/%d" % i) for i in xrange(3)]
+
+        cache = FBGraphCache(directory=self.directory)
+
+        for key in keys:
+            cache.put(key, "x" * 10)
+
+        # responses read from disk count towards the memory limit
+        cache = FBGraphCache(max_size=25, directory=self.directory)
+
+        for key in keys:
+            self.assertEqual("x" * 10, cache.lookup(key)[0])
+
+        self.assertEqual(20, cache.size())
+        self.assertNotIn(keys[0], cache._entries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import json
+import sys
+import time
+import unittest
+
+from PySide.QtGui import QApplication
+
+from pyside_facebook import FBGraphAPIRateLimitException
+from pyside_facebook import FBGraphScheduler
+
+
+# -----------------------------------------------------------------------------
+# TEST HELPERS
+# -----------------------------------------------------------------------------
+
+class FakeAPI(object):
+
+    def __init__(self):
+        self.sent = []
+
+    def _send(self, request):
+        self.sent.append(request)
+
+
+# -----------------------------------------------------------------------------
+
+class FakeRequest(object):
+
+    def __init__(self, api, priority=FBGraphScheduler.PRIORITY_NORMAL):
+        self.host = "graph.facebook.com"
+        self.priority = priority
+        self.headers = {}
+        self.attempts = 0
+
+        self._api = api
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBGraphSchedulerTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.api = FakeAPI()
+        self.scheduler = FBGraphScheduler(max_requests_per_host=2)
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_priority(self):
+        background = [FakeRequest(self.api,
+                FBGraphScheduler.PRIORITY_BACKGROUND) for i in xrange(3)]
+        interactive = FakeRequest(self.api,
+                FBGraphScheduler.PRIORITY_INTERACTIVE)
+
+        for request in background:
+            self.scheduler.submit(request)
+
+        self.scheduler.submit(interactive)
+
+        self.assertEqual(background[:2], self.api.sent)
+        self.assertEqual(2, self.scheduler.queue_depth())
+
+        # interactive requests jump the queue
+        self.scheduler.finished(background[0])
+
+        self.assertIs(interactive, self.api.sent[-1])
+
+        self.assertTrue(self.scheduler.remove(background[2]))
+        self.assertEqual(0, self.scheduler.queue_depth())
+
+    # -------------------------------------------------------------------------
+
+    def test_usage(self):
+        request = FakeRequest(self.api)
+        request.headers = {
+            "x-app-usage": json.dumps({"call_count": 20, "total_time": 40,
+                    "total_cputime": 10}),
+            "x-page-usage": json.dumps({"call_count": 85}),
+        }
+
+        self.scheduler.submit(request)
+        self.scheduler.finished(request)
+
+        # the closest limit counts
+        metrics = self.scheduler.metrics()
+
+        self.assertEqual(85, metrics["usage"])
+        self.assertEqual(10, metrics["budget"])
+        self.assertEqual(1, metrics["concurrency"])
+        self.assertEqual(0.5, metrics["interval"])
+        self.assertEqual(0, metrics["paused"])
+
+        # business use case usage tells how long the limit lasts
+        request.headers = {"x-business-use-case-usage": json.dumps({
+            "1234": [{"type": "pages", "call_count": 100,
+                      "estimated_time_to_regain_access": 5}],
+        })}
+
+        self.scheduler.submit(request)
+        self.scheduler.finished(request)
+
+        self.assertAlmostEqual(300, self.scheduler.metrics()["paused"],
+                delta=5)
+        self.assertEqual(1, self.scheduler.metrics()["throttled"])
+
+    # -------------------------------------------------------------------------
+
+    def test_retry(self):
+        self.scheduler.max_retries = 1
+        self.scheduler.retry_delay = 60
+
+        request = FakeRequest(self.api)
+        self.scheduler.submit(request)
+
+        error = FBGraphAPIRateLimitException("Application request limit "
+                "reached", 4)
+
+        # retried once, held back by the backoff
+        self.assertTrue(self.scheduler.finished(request, error))
+        self.assertEqual(1, self.scheduler.queue_depth())
+        self.assertGreater(self.scheduler.metrics()["paused"], 25)
+
+        self.scheduler._paused_until = time.time()
+        self.scheduler._dispatch()
+
+        self.assertEqual([request, request], self.api.sent)
+        self.assertFalse(self.scheduler.finished(request, error))
+        self.assertEqual(1, self.scheduler.metrics()["retries"])
+
+
+if __name__ == '__main__':
+    unittest.main()
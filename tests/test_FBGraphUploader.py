@@ -0,0 +1,122 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from PySide.QtGui import QApplication
+
+from pyside_facebook import FBGraphAPI
+from pyside_facebook import FBGraphAPIErrorException
+from pyside_facebook import FBGraphUploader
+
+from tests.fake_facebook import ACCESS_TOKEN
+from tests.fake_facebook import FakeFacebookServer
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBGraphUploaderTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+        self.directory = tempfile.mkdtemp()
+
+        self.api = FBGraphAPI(access_token=ACCESS_TOKEN,
+                graph_url=self.server.url)
+        self.uploader = FBGraphUploader(self.api, chunked_size=100 * 1024,
+                video_url=self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+        shutil.rmtree(self.directory)
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_file(self, name, size):
+        """
+        Create a file of random bytes.
+
+        @return (tuple) (path, data)
+        """
+
+        data = os.urandom(size)
+        path = os.path.join(self.directory, name)
+
+        with open(path, "wb") as f:
+            f.write(data)
+
+        return path, data
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_upload_photo(self):
+        uploads = [self.uploader.upload_photo(self.helper_file(
+                "photo%d.jpg" % i, 1024)[0]) for i in xrange(3)]
+
+        # only max_uploads run at once
+        self.assertEqual(1, len(self.uploader._queue))
+
+        self.assertEqual(set(["PHOTO_1", "PHOTO_2", "PHOTO_3"]),
+                set(upload.result()["id"] for upload in uploads))
+
+    # -------------------------------------------------------------------------
+
+    def test_upload_video_chunked(self):
+        path, data = self.helper_file("video.mp4", 300 * 1024)
+
+        progress = []
+
+        upload = self.uploader.upload_video(path, params={"title": "Test"})
+        upload.signal_progress.connect(
+                lambda sent, total: progress.append(sent))
+
+        self.assertEqual({"id": "VIDEO_1", "success": True}, upload.result())
+        self.assertEqual([data], self.server.uploads)
+
+        self.assertEqual(len(data), progress[-1])
+        self.assertEqual(sorted(progress), progress)
+
+    # -------------------------------------------------------------------------
+
+    def test_resume(self):
+        path, data = self.helper_file("video.mp4", 300 * 1024)
+
+        self.server.fail_transfers = 1
+        self.server.video_chunk_size = 128 * 1024
+
+        upload = self.uploader.upload_video(path)
+
+        self.assertRaises(FBGraphAPIErrorException, upload.result)
+
+        # the session survives the failure, and a restart
+        state = upload.state()
+
+        self.assertEqual("1", state["session_id"])
+        self.assertEqual(0, state["offset"])
+
+        upload = self.uploader.resume(state)
+
+        self.assertTrue(upload.result()["success"])
+        self.assertEqual([data], self.server.uploads)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import sys
+import unittest
+
+from PySide.QtGui import QApplication
+
+from pyside_facebook import FBAuthLoginFailedException
+from pyside_facebook import FBAuthResult
+from pyside_facebook import FBHeadlessAuth
+from pyside_facebook import FBHeadlessAuthBatch
+
+from tests.fake_facebook import ACCESS_TOKEN
+from tests.fake_facebook import EMAIL
+from tests.fake_facebook import PASSWORD
+from tests.fake_facebook import FakeFacebookServer
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBHeadlessAuthTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_authenticate(self):
+        flow = FBHeadlessAuth(email=EMAIL, password=PASSWORD,
+                **self.server.oauth_params())
+
+        result = flow.authenticate("TEST", timeout=10).result()
+
+        self.assertEqual(FBAuthResult.KIND_TOKEN, result.kind)
+        self.assertEqual(ACCESS_TOKEN, result.access_token)
+        self.assertEqual("TEST", result.state)
+
+    # -------------------------------------------------------------------------
+
+    def test_authenticate_bad_password(self):
+        flow = FBHeadlessAuth(email=EMAIL, password="wrong",
+                **self.server.oauth_params())
+
+        self.assertRaises(FBAuthLoginFailedException,
+                flow.authenticate(timeout=10).result)
+
+    # -------------------------------------------------------------------------
+
+    def test_batch(self):
+        batch = FBHeadlessAuthBatch(max_concurrent=2, timeout=10,
+                **self.server.oauth_params())
+
+        futures = batch.authenticate_all([(EMAIL, PASSWORD)] * 4 +
+                [(EMAIL, "wrong")])
+
+        # only max_concurrent flows run at once
+        self.assertEqual(2, batch._running)
+        self.assertEqual(5, batch.pending_count())
+
+        for future in futures[:4]:
+            self.assertEqual(ACCESS_TOKEN, future.result().access_token)
+
+        self.assertRaises(FBAuthLoginFailedException, futures[4].result)
+
+        report = batch.report()
+
+        self.assertEqual((5, 4, 1), (report["started"], report["succeeded"],
+            report["failed"]))
+        self.assertTrue(report["per_minute"] > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
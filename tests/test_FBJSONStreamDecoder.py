@@ -0,0 +1,127 @@
+import json
+import unittest
+
+from pyside_facebook import FBGraphAPIDecodeException
+from pyside_facebook import FBJSONStreamDecoder
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS
+# -----------------------------------------------------------------------------
+
+FEED = {
+    "data": [
+        {
+            "id": str(i),
+            "message": u"Post \"%d\" with [brackets], {braces}, \\ and \xe9"
+                    % i,
+            "comments": {"data": [{"id": "c%d" % i, "tags": [1, 2]}]},
+        }
+        for i in xrange(20)
+    ],
+    "paging": {"next": "https://graph.facebook.com/me/feed?after=20"},
+}
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBJSONStreamDecoderTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_decode(self, text, chunk_size, **kwargs):
+        """
+        Feed text to a new decoder in chunks.
+
+        @return (tuple) (items, envelope)
+        """
+
+        decoder = FBJSONStreamDecoder(**kwargs)
+        items = []
+
+        for i in xrange(0, len(text), chunk_size):
+            items.extend(decoder.feed(text[i:i + chunk_size]))
+
+        return items, json.loads(decoder.close())
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_feed(self):
+        text = json.dumps(FEED)
+
+        # chunks split strings, escapes and items at every possible byte
+        for chunk_size in (1, 2, 3, 7, 64, len(text)):
+            items, envelope = self.helper_decode(text, chunk_size)
+
+            self.assertEqual(FEED["data"], items)
+            self.assertEqual({"data": [], "paging": FEED["paging"]},
+                    envelope)
+
+    # -------------------------------------------------------------------------
+
+    def test_feed_items_as_they_complete(self):
+        decoder = FBJSONStreamDecoder()
+
+        self.assertEqual([], decoder.feed('{"data": [{"id": "1"'))
+        self.assertEqual([{"id": "1"}], decoder.feed('}, {"id"'))
+        self.assertEqual([{"id": "2"}], decoder.feed(': "2"}, '))
+        self.assertEqual([], decoder.feed(']}'))
+
+    # -------------------------------------------------------------------------
+
+    def test_envelope(self):
+        # "data" keys outside of the top level and string values don't count
+        text = ('{"paging": {"data": ["x"]}, "key": "data", '
+                '"data": [{"a": 1}]}')
+
+        items, envelope = self.helper_decode(text, 5)
+
+        self.assertEqual([{"a": 1}], items)
+        self.assertEqual({"paging": {"data": ["x"]}, "key": "data",
+                "data": []}, envelope)
+
+        # error responses are all envelope
+        items, envelope = self.helper_decode('{"error": {"code": 1}}', 4)
+
+        self.assertEqual([], items)
+        self.assertEqual({"error": {"code": 1}}, envelope)
+
+    # -------------------------------------------------------------------------
+
+    def test_max_buffer(self):
+        text = json.dumps(FEED)
+
+        # the largest item fits, so a small buffer is enough
+        largest = max(len(json.dumps(item)) for item in FEED["data"])
+
+        items, envelope = self.helper_decode(text, 16,
+                max_buffer=largest + 16)
+
+        self.assertEqual(FEED["data"], items)
+
+        self.assertRaises(FBGraphAPIDecodeException, self.helper_decode,
+                text, 16, max_buffer=largest // 2)
+
+    # -------------------------------------------------------------------------
+
+    def test_invalid(self):
+        decoder = FBJSONStreamDecoder()
+        decoder.feed('{"data": [{"id": "1"}')
+
+        self.assertRaises(FBGraphAPIDecodeException, decoder.close)
+
+        self.assertRaises(FBGraphAPIDecodeException,
+                FBJSONStreamDecoder().feed, '{"data": [{"id": nul}]}')
+
+        self.assertRaises(FBGraphAPIDecodeException,
+                FBJSONStreamDecoder().feed, '{}}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,229 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from PySide.QtGui import QApplication
+
+from pyside_facebook import FBGraphAPI
+from pyside_facebook import FBMediaFetcher
+
+from tests.fake_facebook import ACCESS_TOKEN
+from tests.fake_facebook import FRIENDS
+from tests.fake_facebook import FakeFacebookServer
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBMediaFetcherTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+        self.directory = tempfile.mkdtemp()
+
+        self.api = FBGraphAPI(access_token=ACCESS_TOKEN,
+                graph_url=self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+        shutil.rmtree(self.directory)
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_fetch(self):
+        fetcher = FBMediaFetcher(self.api, max_downloads=2)
+
+        ready = []
+        fetcher.signal_imageReady.connect(
+                lambda key, image: ready.append(key))
+
+        requests = [fetcher.fetch(friend["id"], "square")
+                for friend in FRIENDS[:5]]
+
+        # only max_downloads run at once
+        self.assertEqual(3, len(fetcher._queue))
+
+        for request in requests:
+            self.assertEqual((50, 50), (request.result().width(),
+                request.result().height()))
+
+        self.assertEqual(set(request.key for request in requests),
+                set(ready))
+
+        image = fetcher.fetch(FRIENDS[0]["id"], (30, 20)).result()
+
+        self.assertEqual((30, 20), (image.width(), image.height()))
+
+    # -------------------------------------------------------------------------
+
+    def test_fetch_dedup(self):
+        fetcher = FBMediaFetcher(self.api)
+
+        # identical pending fetches share one download
+        requests = [fetcher.fetch(FRIENDS[0]["id"]) for i in xrange(3)]
+
+        images = [request.result() for request in requests]
+
+        self.assertEqual(1, self.server.image_requests)
+        self.assertTrue(all(image is images[0] for image in images))
+
+        # and later ones are served from memory
+        self.assertIs(images[0], fetcher.fetch(FRIENDS[0]["id"]).result())
+        self.assertEqual(1, self.server.image_requests)
+        self.assertEqual(1, fetcher.stats()["hits"])
+
+    # -------------------------------------------------------------------------
+
+    def test_fetch_lru(self):
+        # room for two 100x100 images
+        fetcher = FBMediaFetcher(self.api, max_size=2 * 100 * 100 * 4)
+
+        for friend in FRIENDS[:3]:
+            fetcher.fetch(friend["id"]).result()
+
+        self.assertIsNone(fetcher.image(FRIENDS[0]["id"]))
+        self.assertIsNotNone(fetcher.image(FRIENDS[2]["id"]))
+        self.assertTrue(fetcher.size() <= fetcher.max_size)
+
+    # -------------------------------------------------------------------------
+
+    def test_fetch_disk(self):
+        fetcher = FBMediaFetcher(self.api, directory=self.directory)
+        fetcher.fetch(FRIENDS[0]["id"]).result()
+
+        # a new fetcher, as after a restart, reads the image from disk
+        fetcher = FBMediaFetcher(self.api, directory=self.directory)
+        image = fetcher.fetch(FRIENDS[0]["id"]).result()
+
+        self.assertEqual(100, image.width())
+        self.assertEqual(1, self.server.image_requests)
+        self.assertEqual(1, fetcher.stats()["disk_hits"])
+
+        fetcher.clear()
+
+        self.assertEqual([], os.listdir(self.directory))
+
+    # -------------------------------------------------------------------------
+
+    def test_fetch_disk_max_age(self):
+        fetcher = FBMediaFetcher(self.api, directory=self.directory)
+        fetcher.fetch(FRIENDS[0]["id"]).result()
+
+        # files older than max_age are downloaded again
+        path = os.path.join(self.directory, os.listdir(self.directory)[0])
+        downloaded = time.time() - 120
+        os.utime(path, (downloaded, downloaded))
+
+        fetcher = FBMediaFetcher(self.api, directory=self.directory,
+                max_age=60)
+        fetcher.fetch(FRIENDS[0]["id"]).result()
+
+        self.assertEqual(2, self.server.image_requests)
+        self.assertEqual(0, fetcher.stats()["disk_hits"])
+        self.assertTrue(os.path.getmtime(path) > downloaded)
+
+    # -------------------------------------------------------------------------
+
+    def test_fetch_disk_max_size(self):
+        fetcher = FBMediaFetcher(self.api, directory=self.directory)
+        fetcher.fetch(FRIENDS[0]["id"]).result()
+
+        file_size = os.path.getsize(os.path.join(self.directory,
+                os.listdir(self.directory)[0]))
+
+        # room for two files
+        fetcher = FBMediaFetcher(self.api, directory=self.directory,
+                max_disk_size=file_size * 2)
+        fetcher.fetch(FRIENDS[1]["id"]).result()
+
+        # reading a file from disk makes it the most recently used
+        fetcher = FBMediaFetcher(self.api, directory=self.directory,
+                max_disk_size=file_size * 2)
+        fetcher.fetch(FRIENDS[0]["id"]).result()
+        fetcher.fetch(FRIENDS[2]["id"]).result()
+
+        self.assertEqual(2, len(os.listdir(self.directory)))
+
+        fetcher = FBMediaFetcher(self.api, directory=self.directory)
+
+        for friend in (FRIENDS[0], FRIENDS[2]):
+            fetcher.fetch(friend["id"]).result()
+
+        self.assertEqual(2, fetcher.stats()["disk_hits"])
+
+        fetcher.fetch(FRIENDS[1]["id"]).result()
+
+        self.assertEqual(2, fetcher.stats()["disk_hits"])
+        self.assertEqual(4, self.server.image_requests)
+
+    # -------------------------------------------------------------------------
+
+    def test_fetch_disk_error(self):
+        directory = os.path.join(self.directory, "media")
+        os.mkdir(directory)
+
+        fetcher = FBMediaFetcher(self.api, directory=directory)
+
+        # images that can't be written to disk are still decoded
+        os.rmdir(directory)
+
+        image = fetcher.fetch(FRIENDS[0]["id"]).result()
+
+        self.assertEqual(100, image.width())
+        self.assertEqual(1, fetcher.stats()["downloads"])
+
+        fetcher.clear()
+
+    # -------------------------------------------------------------------------
+
+    def test_clear(self):
+        fetcher = FBMediaFetcher(self.api, directory=self.directory)
+        fetcher.fetch(FRIENDS[0]["id"]).result()
+
+        # files being written and directories are left alone
+        open(os.path.join(self.directory, "download.part"), "w").close()
+        os.mkdir(os.path.join(self.directory, "other"))
+
+        fetcher = FBMediaFetcher(self.api, directory=self.directory)
+        fetcher.clear()
+
+        self.assertEqual(["download.part", "other"],
+                sorted(os.listdir(self.directory)))
+        self.assertEqual(0, fetcher._disk_size)
+
+    # -------------------------------------------------------------------------
+
+    def test_cancel(self):
+        fetcher = FBMediaFetcher(self.api)
+
+        request = fetcher.fetch(FRIENDS[0]["id"])
+
+        self.assertEqual(1, len(fetcher._replies))
+
+        # the download stops with the last request waiting on it
+        request.cancel()
+
+        self.assertEqual({}, fetcher._replies)
+        self.assertEqual({}, fetcher._pending)
+        self.assertEqual(0, fetcher._active)
+
+
+if __name__ == '__main__':
+    unittest.main()
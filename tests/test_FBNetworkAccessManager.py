@@ -0,0 +1,199 @@
+import sys
+import unittest
+
+from PySide.QtCore    import QEventLoop
+from PySide.QtCore    import QObject
+from PySide.QtCore    import QTimer
+from PySide.QtCore    import QUrl
+from PySide.QtCore    import SIGNAL
+from PySide.QtGui     import QApplication
+from PySide.QtNetwork import QNetworkReply
+from PySide.QtNetwork import QNetworkRequest
+
+from pyside_facebook import FBAuthDialogInvalidParamException
+from pyside_facebook import FBNetworkAccessManager
+from pyside_facebook import FBResourceRule
+from pyside_facebook import FBStubReply
+from pyside_facebook import RESOURCE_RULES_LEAN
+
+from tests.fake_facebook import FakeFacebookServer
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBResourceRuleTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_matches(self):
+        rule = FBResourceRule("test", hosts=["*.fbcdn.net"],
+                paths=["*.png", "/static/*"])
+
+        self.assertTrue(rule.matches("static.ak.fbcdn.net", "/rsrc/a.png"))
+        self.assertTrue(rule.matches("STATIC.AK.FBCDN.NET", "/static/a.js"))
+
+        # every criteria given must match
+        self.assertFalse(rule.matches("www.facebook.com", "/rsrc/a.png"))
+        self.assertFalse(rule.matches("static.ak.fbcdn.net", "/rsrc/a.js"))
+
+        # criteria left out match anything
+        rule = FBResourceRule("test")
+
+        self.assertTrue(rule.matches("www.facebook.com", "/login.php"))
+        self.assertFalse(rule.checks_mime_type())
+
+    # -------------------------------------------------------------------------
+
+    def test_matches_mime_type(self):
+        rule = FBResourceRule("test", mime_types=["image/*", "font/woff"])
+
+        self.assertTrue(rule.checks_mime_type())
+
+        self.assertTrue(rule.matches("a", "/", "image/png"))
+        self.assertTrue(rule.matches("a", "/", "font/woff; charset=binary"))
+        self.assertFalse(rule.matches("a", "/", "text/html"))
+
+        # not matched until the MIME type is known
+        self.assertFalse(rule.matches("a", "/"))
+
+    # -------------------------------------------------------------------------
+
+    def test_action(self):
+        self.assertRaises(FBAuthDialogInvalidParamException, FBResourceRule,
+                "test", "drop")
+
+
+# -----------------------------------------------------------------------------
+
+class FBNetworkAccessManagerTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+        self.nam = FBNetworkAccessManager(rules=RESOURCE_RULES_LEAN)
+
+    def tearDown(self):
+        self.server.stop()
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_get(self, path, timeout=10):
+        """
+        Get a path of the fake server and wait for the reply to finish.
+
+        @return (tuple) (reply, names of the signals emitted in order)
+        """
+
+        signals = []
+        loop = QEventLoop()
+
+        reply = self.nam.get(QNetworkRequest(QUrl(self.server.url + path)))
+
+        QObject.connect(reply, SIGNAL("error(QNetworkReply::NetworkError)"),
+                lambda code: signals.append("error"))
+        reply.finished.connect(lambda: signals.append("finished"))
+        reply.finished.connect(loop.quit)
+
+        QTimer.singleShot(timeout * 1000, loop.quit)
+
+        if not reply.isFinished():
+            loop.exec_()
+
+        return reply, signals
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_stub_reply(self):
+        reply, signals = self.helper_get("/images/1_50x50.png")
+
+        # answered locally
+        self.assertIsInstance(reply, FBStubReply)
+        self.assertEqual(0, self.server.image_requests)
+
+        self.assertEqual(["finished"], signals)
+        self.assertEqual(QNetworkReply.NoError, reply.error())
+        self.assertEqual(200, reply.attribute(
+                QNetworkRequest.HttpStatusCodeAttribute))
+        self.assertEqual("", str(reply.readAll()))
+
+    # -------------------------------------------------------------------------
+
+    def test_blocked_reply(self):
+        reply, signals = self.helper_get("/fonts/a.woff")
+
+        self.assertIsInstance(reply, FBStubReply)
+
+        # error() is emitted, and before finished()
+        self.assertEqual(["error", "finished"], signals)
+        self.assertEqual(QNetworkReply.ContentAccessDenied, reply.error())
+
+    # -------------------------------------------------------------------------
+
+    def test_mime_type_rule(self):
+        # only the MIME type is checked, so the image reaches the network
+        self.nam.set_rules([{"name": "media", "mime_types": ["image/*"]}])
+
+        reply, signals = self.helper_get("/images/1_50x50.png")
+
+        self.assertNotIsInstance(reply, FBStubReply)
+        self.assertEqual(QNetworkReply.OperationCanceledError, reply.error())
+        self.assertEqual({"media": 1}, self.nam.hits())
+
+        # other MIME types pass
+        reply, signals = self.helper_get("/login.php")
+
+        self.assertEqual(QNetworkReply.NoError, reply.error())
+        self.assertEqual({"media": 1}, self.nam.hits())
+
+    # -------------------------------------------------------------------------
+
+    def test_hits(self):
+        replies = []
+        self.nam.signal_replyCreated.connect(replies.append)
+
+        self.helper_get("/images/1_50x50.png")
+        self.helper_get("/images/2_50x50.gif")
+        self.helper_get("/fonts/a.woff")
+        self.helper_get("/login.php")
+
+        hits = self.nam.hits()
+
+        self.assertEqual(2, hits["images"])
+        self.assertEqual(1, hits["fonts"])
+        self.assertEqual(0, hits["tracking"])
+
+        # every reply is announced, filtered or not
+        self.assertEqual(4, len(replies))
+
+        self.nam.reset_hits()
+
+        self.assertEqual([0], list(set(self.nam.hits().values())))
+
+    # -------------------------------------------------------------------------
+
+    def test_no_rules(self):
+        nam = FBNetworkAccessManager()
+
+        self.assertEqual({}, nam.hits())
+        self.assertEqual([], nam.rules)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,281 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from PySide.QtCore    import QUrl
+from PySide.QtGui     import QApplication
+from PySide.QtNetwork import QNetworkCacheMetaData
+
+from pyside_facebook import FBNetworkCache
+from pyside_facebook import FBStaticCache
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS
+# -----------------------------------------------------------------------------
+
+# named so they sort in the order they're inserted
+URLS = ["http://static.example.com/%s.js" % name for name in "abcd"]
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBNetworkCacheTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_insert(self, cache, url, size):
+        """
+        Insert an entry of `size` bytes the way QNetworkAccessManager does.
+        """
+
+        meta = QNetworkCacheMetaData()
+        meta.setUrl(QUrl(url))
+        meta.setSaveToDisk(True)
+
+        device = cache.prepare(meta)
+        device.write("x" * size)
+
+        cache.insert(device)
+
+    # -------------------------------------------------------------------------
+
+    def helper_cached(self, cache, url):
+        return cache.metaData(QUrl(url)).isValid()
+
+    # -------------------------------------------------------------------------
+
+    def helper_disk_entries(self, cache):
+        """
+        @return (tuple) (URLs of the entries in the cache directory, sum of
+                        their file sizes)
+        """
+
+        urls = set()
+        size = 0
+
+        for root, dirs, names in os.walk(self.directory):
+            if "prepared" in dirs:
+                dirs.remove("prepared")
+
+            for name in names:
+                path = os.path.join(root, name)
+
+                urls.add(str(cache.fileMetaData(path).url().toEncoded()))
+                size += os.path.getsize(path)
+
+        return urls, size
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_evict(self):
+        cache = FBNetworkCache(directory=self.directory, max_size=10 * 1024)
+
+        for url in URLS[:3]:
+            self.helper_insert(cache, url, 2500)
+
+        # using an entry makes it the most recently used
+        self.assertTrue(self.helper_cached(cache, URLS[0]))
+
+        # entries are evicted to stay within 90% of the maximum size
+        self.helper_insert(cache, URLS[3], 2500)
+
+        self.assertFalse(self.helper_cached(cache, URLS[1]))
+
+        for url in (URLS[0], URLS[2], URLS[3]):
+            self.assertTrue(self.helper_cached(cache, url))
+
+        self.assertEqual((set(cache._lru), cache._lru_size),
+                self.helper_disk_entries(cache))
+        self.assertEqual(cache._lru_size, cache.cacheSize())
+        self.assertTrue(cache.cacheSize() <= cache.maximumCacheSize())
+
+    # -------------------------------------------------------------------------
+
+    def test_expire(self):
+        cache = FBNetworkCache(directory=self.directory, max_size=20 * 1024)
+
+        for url in URLS:
+            self.helper_insert(cache, url, 3000)
+
+        # QNetworkDiskCache expires entries itself once it's over its
+        # maximum size, which has to keep the index in step
+        cache.setMaximumCacheSize(9 * 1024)
+
+        self.assertEqual(cache._lru_size, cache.expire())
+
+        self.assertEqual(URLS[2:], list(cache._lru))
+        self.assertEqual((set(cache._lru), cache._lru_size),
+                self.helper_disk_entries(cache))
+
+        # and so does the next insert
+        self.helper_insert(cache, URLS[0], 1000)
+
+        self.assertEqual(URLS[2:] + URLS[:1], list(cache._lru))
+        self.assertEqual((set(cache._lru), cache._lru_size),
+                self.helper_disk_entries(cache))
+
+    # -------------------------------------------------------------------------
+
+    def test_load_lru(self):
+        cache = FBNetworkCache(directory=self.directory, max_size=10 * 1024)
+
+        for url in URLS[:3]:
+            self.helper_insert(cache, url, 2000)
+
+        # the index is rebuilt from the cache directory, oldest first
+        cache = FBNetworkCache(directory=self.directory, max_size=10 * 1024)
+
+        self.assertIsNone(cache._lru)
+
+        cache._load_lru()
+
+        self.assertEqual(URLS[:3], list(cache._lru))
+        self.assertTrue(cache._lru_size >= 3 * 2000)
+
+        # so the entry of the earlier run is evicted first
+        self.helper_insert(cache, URLS[3], 4000)
+
+        self.assertFalse(self.helper_cached(cache, URLS[0]))
+        self.assertTrue(self.helper_cached(cache, URLS[1]))
+        self.assertTrue(self.helper_cached(cache, URLS[3]))
+
+    # -------------------------------------------------------------------------
+
+    def test_stats(self):
+        cache = FBNetworkCache(directory=self.directory, max_size=10 * 1024)
+
+        self.assertFalse(self.helper_cached(cache, URLS[0]))
+
+        self.helper_insert(cache, URLS[0], 1000)
+
+        self.assertTrue(self.helper_cached(cache, URLS[0]))
+        self.assertTrue(self.helper_cached(cache, URLS[0]))
+
+        stats = cache.stats()
+
+        self.assertEqual((2, 1), (stats["hits"], stats["misses"]))
+        self.assertAlmostEqual(2 / 3.0, stats["hit_ratio"])
+        self.assertEqual(10 * 1024, stats["max_size"])
+        self.assertTrue(stats["size"] >= 1000)
+
+        cache.reset_stats()
+
+        stats = cache.stats()
+
+        self.assertEqual((0, 0, 0.0), (stats["hits"], stats["misses"],
+            stats["hit_ratio"]))
+
+    # -------------------------------------------------------------------------
+
+    def test_purge(self):
+        cache = FBNetworkCache(directory=self.directory, max_size=10 * 1024)
+
+        for url in URLS:
+            self.helper_insert(cache, url, 1000)
+
+        cache.purge()
+
+        self.assertEqual(0, cache.cacheSize())
+        self.assertEqual(0, cache._lru_size)
+        self.assertFalse(any(self.helper_cached(cache, url) for url in URLS))
+
+        # the cache is usable after a purge
+        self.helper_insert(cache, URLS[0], 1000)
+
+        self.assertTrue(self.helper_cached(cache, URLS[0]))
+        self.assertEqual([URLS[0]], list(cache._lru))
+
+
+# -----------------------------------------------------------------------------
+
+class FBStaticCacheTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        self.cache = FBStaticCache(directory=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_prepare(self, url, headers):
+        """
+        @return (bool) True if the cache takes the response.
+        """
+
+        meta = QNetworkCacheMetaData()
+        meta.setUrl(QUrl(url))
+        meta.setSaveToDisk(True)
+        meta.setRawHeaders(headers)
+
+        return self.cache.prepare(meta) is not None
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_prepare(self):
+        # static assets
+        self.assertTrue(self.helper_prepare(
+                "https://static.xx.fbcdn.net/rsrc.php/a.js",
+                [("Content-Type", "application/javascript; charset=utf-8")]))
+        self.assertTrue(self.helper_prepare(
+                "https://scontent.xx.fbcdn.net/a.png",
+                [("content-type", "image/png")]))
+
+        # pages, which may be made for a logged in user
+        self.assertFalse(self.helper_prepare(
+                "https://www.facebook.com/login.php",
+                [("Content-Type", "text/html")]))
+        self.assertFalse(self.helper_prepare(
+                "https://www.facebook.com/a.png",
+                [("Content-Type", "image/png")]))
+        self.assertFalse(self.helper_prepare(
+                "https://static.xx.fbcdn.net/a.html",
+                [("Content-Type", "text/html")]))
+
+        # responses of unknown type or setting cookies
+        self.assertFalse(self.helper_prepare(
+                "https://static.xx.fbcdn.net/a.png", []))
+        self.assertFalse(self.helper_prepare(
+                "https://static.xx.fbcdn.net/a.png",
+                [("Content-Type", "image/png"), ("Set-Cookie", "c_user=1")]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import urlparse
+
+from pyside_facebook import FBAuthDialogInvalidParamException
+from pyside_facebook import FBOAuthURLBuilder
+from pyside_facebook import OAUTH_URL
+from pyside_facebook import REDIRECT_URI
+from pyside_facebook import build_oauth_url
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBOAuthURLBuilderTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_url(self):
+        builder = FBOAuthURLBuilder("TEST_APP_ID")
+
+        self.assertEqual("%s?%s" % (OAUTH_URL, "&".join([
+            "client_id=TEST_APP_ID",
+            "redirect_uri=http://www.facebook.com/connect/login_success.html",
+            "response_type=token",
+            "display=popup"])), builder.url())
+
+        builder = FBOAuthURLBuilder("TEST_APP_ID", scope=["email",
+                "user_photos"], response_type="code")
+
+        url = builder.url(u"a b&c")
+        base, query = url.split("?", 1)
+
+        self.assertEqual(OAUTH_URL, base)
+        self.assertEqual([
+            ("client_id", "TEST_APP_ID"),
+            ("redirect_uri", REDIRECT_URI),
+            ("response_type", "code"),
+            ("display", "popup"),
+            ("scope", "email,user_photos"),
+            ("state", "a b&c"),
+        ], urlparse.parse_qsl(query))
+
+    # -------------------------------------------------------------------------
+
+    def test_invalid_params(self):
+        with self.assertRaises(FBAuthDialogInvalidParamException):
+            FBOAuthURLBuilder(None)
+
+        # falsy states are checked as well
+        for state in (1, 0, []):
+            with self.assertRaises(FBAuthDialogInvalidParamException):
+                FBOAuthURLBuilder("TEST_APP_ID").url(state)
+
+        # unhashable params are rejected before they're used as a key
+        with self.assertRaises(FBAuthDialogInvalidParamException):
+            build_oauth_url("TEST_APP_ID", display=[])
+
+        with self.assertRaises(FBAuthDialogInvalidParamException):
+            build_oauth_url("TEST_APP_ID", state={})
+
+    # -------------------------------------------------------------------------
+
+    def test_build_oauth_url(self):
+        self.assertEqual(FBOAuthURLBuilder("TEST_APP_ID").url("S1"),
+                build_oauth_url("TEST_APP_ID", state="S1"))
+
+        # the builder is reused for the same params
+        self.assertEqual(build_oauth_url("TEST_APP_ID", state="S1"),
+                build_oauth_url("TEST_APP_ID", state="S1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
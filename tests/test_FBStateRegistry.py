@@ -0,0 +1,69 @@
+import unittest
+
+from pyside_facebook import FBStateRegistry
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBStateRegistryTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    def setUp(self):
+        self.registry = FBStateRegistry()
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_validate(self):
+        state = self.registry.issue()
+
+        self.assertNotEqual(state, self.registry.issue())
+
+        self.assertTrue(self.registry.validate(state))
+
+        # states are single use
+        self.assertFalse(self.registry.validate(state))
+        self.assertFalse(self.registry.validate("FORGED"))
+
+    # -------------------------------------------------------------------------
+
+    def test_pop(self):
+        state = self.registry.issue({"session": 1})
+
+        self.assertEqual({"session": 1}, self.registry.pop(state))
+        self.assertEqual("missing", self.registry.pop(state, "missing"))
+
+    # -------------------------------------------------------------------------
+
+    def test_expiry(self):
+        registry = FBStateRegistry(ttl=-1)
+
+        state = registry.issue()
+
+        self.assertFalse(registry.validate(state))
+
+        # expired states are dropped as new ones are issued
+        registry.issue()
+
+        self.assertEqual(0, len(registry))
+
+    # -------------------------------------------------------------------------
+
+    def test_max_size(self):
+        registry = FBStateRegistry(max_size=2)
+
+        states = [registry.issue() for i in xrange(3)]
+
+        self.assertEqual(2, len(registry))
+        self.assertFalse(registry.validate(states[0]))
+        self.assertTrue(registry.validate(states[2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
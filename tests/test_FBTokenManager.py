@@ -0,0 +1,188 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from PySide.QtCore import QEventLoop
+from PySide.QtCore import QTimer
+from PySide.QtGui  import QApplication
+
+from pyside_facebook import FBGraphAPI
+from pyside_facebook import FBGraphAPIOAuthException
+from pyside_facebook import FBTokenManager
+from pyside_facebook import FBTokenStore
+
+from tests.fake_facebook import ACCESS_TOKEN
+from tests.fake_facebook import APP_ID
+from tests.fake_facebook import APP_SECRET
+from tests.fake_facebook import LONG_LIVED_ACCESS_TOKEN
+from tests.fake_facebook import LONG_LIVED_EXPIRES_IN
+from tests.fake_facebook import OAUTH_CODE
+from tests.fake_facebook import FakeFacebookServer
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBTokenManagerTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        self.server = FakeFacebookServer()
+        self.server.start()
+
+        self.directory = tempfile.mkdtemp()
+
+        self.store = FBTokenStore(os.path.join(self.directory, "tokens.json"))
+
+        self.api = FBGraphAPI(graph_url=self.server.url)
+        self.manager = FBTokenManager(self.api, APP_ID, APP_SECRET,
+                store=self.store)
+
+    def tearDown(self):
+        self.server.stop()
+
+        shutil.rmtree(self.directory)
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_wait_for_failures(self, manager, count, timeout=10):
+        """
+        Spin the event loop until `count` refreshes failed.
+
+        @return (int) Refreshes failed in time.
+        """
+
+        failures = []
+        loop = QEventLoop()
+
+        def slot(exception):
+            failures.append(exception)
+
+            if len(failures) == count:
+                loop.quit()
+
+        manager.signal_refreshFailed.connect(slot)
+        QTimer.singleShot(timeout * 1000, loop.quit)
+
+        loop.exec_()
+
+        manager.signal_refreshFailed.disconnect(slot)
+
+        return len(failures)
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_exchange_code(self):
+        self.assertEqual((LONG_LIVED_ACCESS_TOKEN, LONG_LIVED_EXPIRES_IN),
+                self.manager.exchange_code(OAUTH_CODE).result())
+
+        self.assertEqual(LONG_LIVED_ACCESS_TOKEN, self.api.access_token)
+        self.assertEqual(LONG_LIVED_ACCESS_TOKEN,
+                self.store.get(APP_ID)[0])
+
+        self.assertRaises(FBGraphAPIOAuthException,
+                self.manager.exchange_code("BAD_CODE").result)
+
+    # -------------------------------------------------------------------------
+
+    def test_refresh(self):
+        self.manager.set_token(ACCESS_TOKEN, LONG_LIVED_EXPIRES_IN)
+
+        # concurrent callers share one refresh
+        futures = [self.manager.refresh() for i in xrange(3)]
+
+        for future in futures:
+            self.assertEqual(LONG_LIVED_ACCESS_TOKEN, future.result()[0])
+
+        self.assertEqual(1, self.server.token_exchanges)
+
+        # the exchange is authenticated by the app secret alone
+        self.assertNotIn("access_token", self.server.token_exchange_params)
+
+        # valid tokens are handed out without a refresh
+        self.assertEqual(LONG_LIVED_ACCESS_TOKEN,
+                self.manager.token().result()[0])
+        self.assertEqual(1, self.server.token_exchanges)
+
+    # -------------------------------------------------------------------------
+
+    def test_upgrade(self):
+        changed = []
+        loop = QEventLoop()
+
+        def slot(access_token, expires_in):
+            changed.append(access_token)
+
+            if len(changed) == 2:
+                loop.quit()
+
+        self.manager.signal_tokenChanged.connect(slot)
+        QTimer.singleShot(10000, loop.quit)
+
+        # short lived tokens are upgraded right away
+        self.manager.set_token(ACCESS_TOKEN, 3600)
+
+        loop.exec_()
+
+        self.assertEqual([ACCESS_TOKEN, LONG_LIVED_ACCESS_TOKEN], changed)
+
+        # and the long lived token is refreshed before it expires
+        self.assertTrue(self.manager._refresh_timer.isActive())
+
+        # a restarted manager picks the token up from the store
+        manager = FBTokenManager(FBGraphAPI(graph_url=self.server.url),
+                APP_ID, APP_SECRET, store=self.store)
+
+        self.assertEqual(LONG_LIVED_ACCESS_TOKEN, manager.api.access_token)
+
+    # -------------------------------------------------------------------------
+
+    def test_refresh_retry(self):
+        manager = FBTokenManager(self.api, APP_ID, APP_SECRET,
+                retry_delay=0.1)
+
+        # the token is refused, so its upgrade keeps failing
+        manager.set_token("BAD_TOKEN", 3600)
+
+        self.assertEqual(3, self.helper_wait_for_failures(manager, 3))
+
+        # retried with the delay doubled after every failure
+        self.assertEqual(3, self.server.token_exchanges)
+        self.assertTrue(manager._refresh_timer.isActive())
+        self.assertTrue(300 < manager._refresh_timer.interval() <= 400)
+
+        # a new token starts over
+        manager.set_token(LONG_LIVED_ACCESS_TOKEN, LONG_LIVED_EXPIRES_IN)
+
+        self.assertEqual(0, manager._refresh_failures)
+
+    # -------------------------------------------------------------------------
+
+    def test_refresh_retry_expiry(self):
+        manager = FBTokenManager(self.api, APP_ID, APP_SECRET)
+
+        # the retry is brought forward to just before the token expires,
+        # and not made after
+        manager.set_token("BAD_TOKEN", 2)
+
+        self.assertEqual(2, self.helper_wait_for_failures(manager, 3,
+                timeout=4))
+        self.assertFalse(manager._refresh_timer.isActive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyside_facebook import FBTokenStore
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBTokenStoreTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "tokens.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_get(self):
+        store = FBTokenStore(self.path)
+
+        self.assertIsNone(store.get("APP"))
+
+        store.put("APP", ["email"], "TOKEN_EMAIL", 3600)
+        store.put("APP", ["email", "publish_stream"], "TOKEN_BOTH", 7200)
+
+        # token with the longest life that covers the scope wins
+        self.assertEqual("TOKEN_BOTH", store.get("APP", ["email"])[0])
+        self.assertEqual("TOKEN_BOTH", store.get("APP")[0])
+        self.assertEqual("TOKEN_BOTH",
+                store.get("APP", ["publish_stream"])[0])
+
+        # no token covers the scope
+        self.assertIsNone(store.get("APP", ["user_photos"]))
+
+        # tokens are kept apart per app
+        self.assertIsNone(store.get("OTHER_APP"))
+
+        # tokens that never expire beat all others
+        store.put("APP", ["email"], "TOKEN_FOREVER", 0)
+
+        self.assertEqual(("TOKEN_FOREVER", 0), store.get("APP", ["email"]))
+
+    # -------------------------------------------------------------------------
+
+    def test_expiry(self):
+        store = FBTokenStore(self.path, min_ttl=60)
+
+        # tokens expiring within min_ttl are never handed out
+        store.put("APP", ["email"], "TOKEN", 30)
+
+        self.assertIsNone(store.get("APP", ["email"]))
+
+        store.put("APP", ["email"], "TOKEN", 3600)
+
+        access_token, expires_in = store.get("APP", ["email"])
+
+        self.assertEqual("TOKEN", access_token)
+        self.assertTrue(3590 < expires_in <= 3600)
+
+    # -------------------------------------------------------------------------
+
+    def test_persistence(self):
+        store = FBTokenStore(self.path)
+        store.put("APP", ["email"], "TOKEN", 3600)
+        store.put("APP", ["user_photos"], "TOKEN_PHOTOS", 3600)
+
+        # file isn't read until the store is first used
+        store = FBTokenStore(self.path)
+
+        self.assertIsNone(store._tokens)
+        self.assertEqual("TOKEN", store.get("APP", ["email"])[0])
+
+        store.remove("APP", ["email"])
+
+        self.assertEqual(1, len(json.load(open(self.path))))
+
+        store.remove("APP")
+
+        self.assertEqual([], json.load(open(self.path)))
+
+        # no temporary files are left behind
+        self.assertEqual(["tokens.json"], os.listdir(self.directory))
+
+    # -------------------------------------------------------------------------
+
+    def test_corrupt_file(self):
+        with open(self.path, "w") as f:
+            f.write("{not json")
+
+        store = FBTokenStore(self.path)
+
+        self.assertIsNone(store.get("APP"))
+
+        store.put("APP", [], "TOKEN", 0)
+
+        self.assertEqual(("TOKEN", 0), FBTokenStore(self.path).get("APP"))
+
+
+if __name__ == '__main__':
+    unittest.main()
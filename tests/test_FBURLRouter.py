@@ -0,0 +1,121 @@
+import unittest
+
+from pyside_facebook import FBURLRouter
+from pyside_facebook import REDIRECT_URI
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS
+# -----------------------------------------------------------------------------
+
+LOGIN_URL = "https://www.facebook.com/login.php"
+PERMS_URL = "https://www.facebook.com/dialog/permissions.request"
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class FBURLRouterTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # FIXTURES
+    # -------------------------------------------------------------------------
+
+    def setUp(self):
+        self.router = FBURLRouter()
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_route_login(self):
+        # initial load of the login form
+        self.assertEqual(("signal_authFormReady", ("TEST",)),
+                self.router.route(LOGIN_URL +
+                    "?api_key=1&skip_api_login=1&state=TEST"))
+
+        # bad login details
+        self.assertEqual(("signal_authFail", ("",)),
+                self.router.route(LOGIN_URL + "?login_attempt=1&popup=1"))
+
+        # login.php without a trigger key doesn't route
+        self.assertIsNone(self.router.route(LOGIN_URL + "?popup=1"))
+
+    # -------------------------------------------------------------------------
+
+    def test_route_permissions(self):
+        self.assertEqual(("signal_authSuccess", ("",)),
+                self.router.route(PERMS_URL + "?app_id=1&from_login=1"))
+
+        self.assertIsNone(self.router.route(PERMS_URL))
+
+    # -------------------------------------------------------------------------
+
+    def test_route_redirect(self):
+        # access token and state are read from the fragment
+        self.assertEqual(
+            ("signal_permsAuthorizedAccessToken", ("TOKEN", 3600, "TEST")),
+            self.router.route(REDIRECT_URI +
+                "#access_token=TOKEN&expires_in=3600&state=TEST"))
+
+        # tokens that never expire have no expires_in
+        self.assertEqual(
+            ("signal_permsAuthorizedAccessToken", ("TOKEN", 0, "")),
+            self.router.route(REDIRECT_URI + "#access_token=TOKEN"))
+
+        self.assertEqual(
+            ("signal_permsAuthorizedOAuthCode", ("CODE", "TEST")),
+            self.router.route(REDIRECT_URI + "?code=CODE&state=TEST"))
+
+        # user clicked cancel
+        self.assertEqual(
+            ("signal_permsNotAuthorized", ("access_denied", "user_denied",
+                "The user denied your request.", "")),
+            self.router.route(REDIRECT_URI + "?error_reason=user_denied"
+                "&error=access_denied"
+                "&error_description=The+user+denied+your+request."))
+
+    # -------------------------------------------------------------------------
+
+    def test_route_custom_redirect(self):
+        router = FBURLRouter("http://localhost:8000/oauth/done")
+
+        self.assertEqual(
+            ("signal_permsAuthorizedOAuthCode", ("CODE", "")),
+            router.route("http://localhost:8000/oauth/done?code=CODE"))
+
+        # the default redirect URI no longer routes
+        self.assertIsNone(router.route(REDIRECT_URI + "?code=CODE"))
+
+    # -------------------------------------------------------------------------
+
+    def test_route_body(self):
+        self.assertEqual(
+            ("signal_errorOAuthException", ("Invalid application ID.", 101)),
+            self.router.route_body('{"error": {"message": '
+                '"Invalid application ID.", "type": "OAuthException", '
+                '"code": 101}}'))
+
+        # only OAuthExceptions route
+        self.assertIsNone(self.router.route_body('{"error": "other"}'))
+        self.assertIsNone(self.router.route_body("<html></html>"))
+        self.assertIsNone(self.router.route_body("{not json"))
+
+    # -------------------------------------------------------------------------
+
+    def test_route_cache(self):
+        url = LOGIN_URL + "?login_attempt=1"
+
+        # repeated URLs are served from the cache
+        self.assertIs(self.router.route(url), self.router.route(url))
+
+        # a router without a cache still routes
+        router = FBURLRouter(cache_size=0)
+
+        self.assertEqual(("signal_authFail", ("",)), router.route(url))
+        self.assertEqual({}, router._cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
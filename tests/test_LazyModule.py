@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import pyside_facebook
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS
+# -----------------------------------------------------------------------------
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+# -----------------------------------------------------------------------------
+# TEST CASES
+# -----------------------------------------------------------------------------
+
+class LazyModuleTestCase(unittest.TestCase):
+
+    # -------------------------------------------------------------------------
+    # TEST HELPERS
+    # -------------------------------------------------------------------------
+
+    def helper_loaded_modules(self, statement):
+        """
+        Run `statement` in a fresh interpreter.
+
+        @return (set) Names of the PySide and pyside_facebook modules it
+                      loaded.
+        """
+
+        output = subprocess.check_output([sys.executable, "-c",
+            "import sys\n%s\nprint ' '.join(sorted(name for name in "
+            "sys.modules if sys.modules[name] is not None))" % statement],
+            cwd=ROOT)
+
+        return set(name for name in output.split()
+                   if name.startswith(("PySide.", "pyside_facebook.")))
+
+    # -------------------------------------------------------------------------
+    # TESTS
+    # -------------------------------------------------------------------------
+
+    def test_import(self):
+        self.assertEqual(set(), self.helper_loaded_modules(
+                "import pyside_facebook"))
+
+        # neither the Graph API client nor the URL and token helpers need
+        # QtWebKit
+        modules = self.helper_loaded_modules("from pyside_facebook import "
+                "FBGraphAPI, FBTokenStore, build_oauth_url, REDIRECT_URI")
+
+        self.assertIn("pyside_facebook.graph", modules)
+        self.assertNotIn("pyside_facebook.auth", modules)
+        self.assertNotIn("PySide.QtWebKit", modules)
+
+        # the URL, routing and state helpers don't need Qt at all
+        modules = self.helper_loaded_modules("from pyside_facebook import "
+                "FBStateRegistry, FBURLRouter, build_oauth_url")
+
+        self.assertIn("pyside_facebook.oauth", modules)
+        self.assertNotIn("PySide.QtCore", modules)
+        self.assertNotIn("PySide.QtGui", modules)
+
+        self.assertIn("PySide.QtWebKit", self.helper_loaded_modules(
+                "from pyside_facebook import FBAuthDialog"))
+
+    # -------------------------------------------------------------------------
+
+    def test_getattr(self):
+        from pyside_facebook.graph import FBGraphAPI
+
+        self.assertIs(FBGraphAPI, pyside_facebook.FBGraphAPI)
+        self.assertIn("FBAuthDialog", dir(pyside_facebook))
+
+        with self.assertRaises(AttributeError):
+            pyside_facebook.FBNoSuchClass
+
+
+if __name__ == '__main__':
+    unittest.main()